@@ -0,0 +1,181 @@
+"""
+Offline benchmarks of both backends against the in-process stand-in servers
+from ``servers.py``.
+
+Scenarios:
+
+* ``stat`` - many ``stat`` calls, ``--concurrency`` of them at a time
+* ``small-read`` - many reads of ``--small-size`` byte files
+* ``large-read`` - a single read of a ``--large-size`` byte file
+
+Each scenario runs in a fresh process, so its peak RSS is measured apart
+from the servers and the other scenarios. The file content is consumed and
+discarded, so the numbers exclude the local output.
+
+    python benchmarks/run.py --large-size 4294967296 --json results.json
+"""
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from servers import (SyntheticFiles, start_grpc_server,  # noqa: E402
+                     start_http_server)
+
+
+def peak_rss_mib():
+    # Linux reports kilobytes, macOS bytes.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_scenario(backend, endpoint, scenario, options):
+    """
+    Runs one scenario against a running server, in the current process.
+    """
+    from file_client.backend_clients.batch import run_batch
+    from file_client.cli import Context, get_client
+
+    context = Context()
+    context.backend = backend
+    context.grpc_server = endpoint if backend == 'grpc' else None
+    context.base_url = endpoint if backend == 'rest' else None
+    context.output = os.devnull
+    context.chunk_size = options['chunk_size']
+    context.http_pool_size = options['concurrency']
+    client = get_client(context)
+    rss_before = peak_rss_mib()
+
+    def timed(function):
+        def call(uuid):
+            started = time.perf_counter()
+            result = function(uuid)
+            return time.perf_counter() - started, result
+        return call
+
+    def read(uuid):
+        size = 0
+        for chunk in client.read_stream(uuid).chunks:
+            size += len(chunk)
+        return size
+
+    if scenario == 'stat':
+        function, uuids = timed(client.stat), ['uuid'] * options['requests']
+    elif scenario == 'small-read':
+        function = timed(read)
+        uuids = [f'bytes-{options["small_size"]}'] * options['requests']
+    else:
+        function, uuids = timed(read), [f'bytes-{options["large_size"]}']
+
+    started = time.perf_counter()
+    latencies, transferred, errors = [], 0, 0
+    for _, result, exception in run_batch(
+            function, uuids, options['concurrency']):
+        if exception is not None:
+            errors += 1
+            continue
+        latency, value = result
+        latencies.append(latency)
+        transferred += value if isinstance(value, int) else 0
+    elapsed = time.perf_counter() - started
+    client.close()
+    return {
+        'backend': backend,
+        'scenario': scenario,
+        'calls': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'calls_per_second': len(latencies) / elapsed,
+        'mib_per_second': transferred / elapsed / 1024 / 1024,
+        'p50_ms': percentile(latencies, 0.5) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 0.99) * 1000 if latencies else None,
+        'rss_before_mib': rss_before,
+        'peak_rss_mib': peak_rss_mib(),
+    }
+
+
+@click.command()
+@click.option('--backend', 'backends', multiple=True,
+              type=click.Choice(['grpc', 'rest']),
+              help='Benchmark the backend, may be repeated. Default is both.')
+@click.option('--scenario', 'scenarios', multiple=True,
+              type=click.Choice(['stat', 'small-read', 'large-read']),
+              help='Run the scenario, may be repeated. Default is all.')
+@click.option('--requests', default=2000, type=click.IntRange(min=1),
+              help='Set the number of calls of the stat and small-read'
+                   ' scenarios. Default is 2000.')
+@click.option('--concurrency', default=16, type=click.IntRange(min=1),
+              help='Set the number of concurrent calls. Default is 16.')
+@click.option('--small-size', default=1024, type=click.IntRange(min=0),
+              help='Set the size of the small files. Default is 1024.')
+@click.option('--large-size', default=1024 ** 3, type=click.IntRange(min=0),
+              help='Set the size of the large file. Default is 1 GiB.')
+@click.option('--chunk-size', default=64 * 1024, type=click.IntRange(min=1),
+              help='Set the read chunk size. Default is 65536.')
+@click.option('--latency', default=0.0, type=click.FloatRange(min=0),
+              help='Set the latency of the servers in milliseconds.')
+@click.option('--compress', is_flag=True,
+              help='Let the servers compress the file content.')
+@click.option('--json', 'json_file', type=click.File('w'),
+              help='Store the results into a JSON file too.')
+def main(backends, scenarios, requests, concurrency, small_size, large_size,
+         chunk_size, latency, compress, json_file):
+    'Benchmarks both backends against local stand-in servers.'
+    files = SyntheticFiles(default_size=small_size, latency=latency / 1000)
+    grpc_server, grpc_target = start_grpc_server(
+        files, workers=concurrency, compress=compress)
+    http_server, base_url = start_http_server(files, compress=compress)
+    endpoints = {'grpc': grpc_target, 'rest': base_url}
+    options = {
+        'requests': requests,
+        'concurrency': concurrency,
+        'small_size': small_size,
+        'large_size': large_size,
+        'chunk_size': chunk_size,
+    }
+    # Spawned, not forked, processes: gRPC does not support fork and the
+    # peak RSS must not include the servers.
+    processes = multiprocessing.get_context('spawn')
+    results = []
+    click.echo(
+        f'{"backend":<8}{"scenario":<12}{"calls/s":>10}{"MiB/s":>10}'
+        f'{"p50 ms":>9}{"p99 ms":>9}{"RSS MiB":>9}{"errors":>8}')
+    try:
+        for backend in backends or ('grpc', 'rest'):
+            for scenario in scenarios or ('stat', 'small-read', 'large-read'):
+                with processes.Pool(1) as pool:
+                    result = pool.apply(run_scenario, (
+                        backend, endpoints[backend], scenario, options))
+                results.append(result)
+                click.echo(
+                    f'{backend:<8}{scenario:<12}'
+                    f'{result["calls_per_second"]:>10.1f}'
+                    f'{result["mib_per_second"]:>10.1f}'
+                    f'{result["p50_ms"] or 0:>9.2f}'
+                    f'{result["p99_ms"] or 0:>9.2f}'
+                    f'{result["peak_rss_mib"]:>9.1f}'
+                    f'{result["errors"]:>8}'
+                )
+    finally:
+        grpc_server.stop(None)
+        http_server.shutdown()
+    if json_file is not None:
+        json.dump({'options': options, 'results': results}, json_file,
+                  indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+In-process stand-in file servers for the benchmarks.
+
+Both servers serve synthetic files generated on the fly, so files of any
+size cost no memory nor disk. A file UUID may encode its size as
+``bytes-<size>``, any other UUID is a file of the server's default size.
+Every request is delayed by the configured latency. With compression on,
+the gRPC server gzips its replies and the HTTP server the read responses of
+clients accepting gzip.
+"""
+import json
+import re
+import threading
+import time
+import zlib
+from concurrent import futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import grpc
+from file_client.backend_clients.grpc_client.service_file_pb2 import (
+    ReadReply, StatReply)
+from file_client.backend_clients.grpc_client.service_file_pb2_grpc import (
+    FileServicer, add_FileServicer_to_server)
+
+
+BLOCK = bytes(range(256)) * 256
+MAX_GRPC_CHUNK_SIZE = 1024 * 1024
+CREATE_DATETIME = '2020-01-01T00:00:00Z'
+
+
+class SyntheticFiles(object):
+    """
+    Generates the content of the synthetic files.
+    """
+
+    def __init__(self, default_size=1024, latency=0.0):
+        self.default_size = default_size
+        self.latency = latency
+
+    def size(self, uuid):
+        match = re.fullmatch(r'bytes-(\d+)', uuid)
+        return int(match.group(1)) if match else self.default_size
+
+    def stat(self, uuid):
+        return {
+            'create_datetime': CREATE_DATETIME,
+            'size': self.size(uuid),
+            'mimetype': 'application/octet-stream',
+            'name': f'{uuid}.bin',
+        }
+
+    def iter_chunks(self, uuid, chunk_size, start=0, end=None):
+        end = self.size(uuid) if end is None else end
+        view = memoryview(BLOCK * (chunk_size // len(BLOCK) + 2))
+        offset = start
+        while offset < end:
+            length = min(chunk_size, end - offset)
+            skew = offset % len(BLOCK)
+            yield view[skew:skew + length]
+            offset += length
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class StandInFileServicer(FileServicer):
+
+    def __init__(self, files):
+        self.files = files
+
+    def stat(self, request, context):
+        self.files.wait()
+        attributes = self.files.stat(request.uuid.value)
+        reply = StatReply(data=StatReply.Data(
+            size=attributes['size'],
+            mimetype=attributes['mimetype'],
+            name=attributes['name'],
+        ))
+        reply.data.create_datetime.FromJsonString(CREATE_DATETIME)
+        return reply
+
+    def read(self, request, context):
+        self.files.wait()
+        chunk_size = min(request.size or MAX_GRPC_CHUNK_SIZE,
+                         MAX_GRPC_CHUNK_SIZE)
+        for chunk in self.files.iter_chunks(request.uuid.value, chunk_size):
+            yield ReadReply(data=ReadReply.Data(data=bytes(chunk)))
+
+
+def start_grpc_server(files, workers=32, compress=False):
+    """
+    Starts the gRPC server on a free local port and returns it together with
+    its target.
+    """
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=workers),
+        compression=grpc.Compression.Gzip if compress else None)
+    add_FileServicer_to_server(StandInFileServicer(files), server)
+    port = server.add_insecure_port('localhost:0')
+    server.start()
+    return server, f'localhost:{port}'
+
+
+class StandInHTTPRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    files = None
+    compress = False
+
+    def do_GET(self):
+        match = re.fullmatch(r'/file/([^/]+)/(stat|read)/', self.path)
+        if match is None:
+            self.send_error(404)
+            return
+        self.files.wait()
+        uuid, method = match.groups()
+        if method == 'stat':
+            body = json.dumps(self.files.stat(uuid)).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        size = self.files.size(uuid)
+        start, end = 0, size
+        byte_range = re.fullmatch(
+            r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if byte_range:
+            start = int(byte_range.group(1))
+            end = min(int(byte_range.group(2) or size - 1) + 1, size)
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end - 1}/{size}')
+        elif (
+            self.compress
+            and 'gzip' in self.headers.get('Accept-Encoding', '')
+        ):
+            self.send_gzipped(uuid, size)
+            return
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start))
+        self.send_header('ETag', f'"{uuid}-{size}"')
+        self.end_headers()
+        for chunk in self.files.iter_chunks(uuid, 256 * 1024, start, end):
+            self.wfile.write(chunk)
+
+    def send_gzipped(self, uuid, size):
+        # The compressed size is not known upfront, so the body is chunked.
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        compressor = zlib.compressobj(wbits=31)
+        for chunk in self.files.iter_chunks(uuid, 256 * 1024):
+            self.write_chunk(compressor.compress(chunk))
+        self.write_chunk(compressor.flush())
+        self.wfile.write(b'0\r\n\r\n')
+
+    def write_chunk(self, data):
+        if data:
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(files, compress=False):
+    """
+    Starts the HTTP server on a free local port in a background thread and
+    returns it together with its base URL.
+    """
+    handler = type('Handler', (StandInHTTPRequestHandler, ), {
+        'files': files, 'compress': compress})
+    server = ThreadingHTTPServer(('localhost', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://localhost:{server.server_port}/'
@@ -0,0 +1,74 @@
+"""
+Measures the cold start time of the CLI per subcommand.
+
+Every command line is run as a fresh ``python -m file_client`` process the
+given number of times, the minimum and median wall clock times are printed
+along with the heavy modules the process imported. Commands which need a
+backend are pointed at a closed port, so they measure the startup and the
+failed connection attempt only.
+
+    python benchmarks/startup.py --repeat 20
+"""
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import click
+
+
+HEAVY_MODULES = ('grpc', 'google.protobuf', 'requests', 'httpx', 'sqlite3',
+                 'asyncio', 'concurrent.futures')
+UNREACHABLE = ['--grpc-server', 'localhost:1', '--base-url',
+               'http://localhost:1/', '--connect-timeout', '0.1']
+COMMANDS = {
+    '--help': ['--help'],
+    'stat --help': ['stat', '--help'],
+    'read --help': ['read', '--help'],
+    'mirror --help': ['mirror', '--help'],
+    'grpc stat': [*UNREACHABLE, '--backend', 'grpc', 'stat', 'uuid'],
+    'rest stat': [*UNREACHABLE, '--backend', 'rest', 'stat', 'uuid'],
+    'rest read': [*UNREACHABLE, '--backend', 'rest', 'read', 'uuid'],
+}
+# Reports the modules imported by the CLI run in the same process.
+RUNNER = '''
+import atexit, json, sys
+atexit.register(lambda: sys.stderr.write(
+    '\\nIMPORTED ' + json.dumps(sorted(sys.modules)) + '\\n'))
+sys.argv = ['file-client'] + sys.argv[1:]
+from file_client.cli import cli
+cli()
+'''
+
+
+def run(arguments):
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-c', RUNNER, *arguments],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - started
+    imported = set()
+    for line in process.stderr.splitlines():
+        if line.startswith('IMPORTED '):
+            imported = set(json.loads(line[len('IMPORTED '):]))
+    return elapsed, [module for module in HEAVY_MODULES if module in imported]
+
+
+@click.command()
+@click.option('--repeat', default=10, type=click.IntRange(min=1),
+              help='Set how many times every command is run.')
+def main(repeat):
+    'Prints the cold start time of the CLI per subcommand.'
+    click.echo(f'{"command":<16}{"min ms":>9}{"median ms":>11}  imports')
+    for name, arguments in COMMANDS.items():
+        results = [run(arguments) for _ in range(repeat)]
+        times = [elapsed * 1000 for elapsed, _ in results]
+        click.echo(
+            f'{name:<16}{min(times):>9.1f}{statistics.median(times):>11.1f}'
+            f'  {", ".join(results[-1][1]) or "-"}'
+        )
+
+
+if __name__ == '__main__':
+    main()
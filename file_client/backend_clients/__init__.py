@@ -1,7 +1,30 @@
 from .client_exceptions import (ClientException,
                                 ClientExceptionFailedPrecondition,
                                 ClientExceptionFileNotFound,
-                                ClientExceptionInvalidArgument)
-from .grpc_client.grpc_client import GRPCClient
-from .rest_client.rest_client import RESTClient
-from .client import DEFAULT_STDOUT_PRINT_MARKER
+                                ClientExceptionIntegrity,
+                                ClientExceptionInvalidArgument,
+                                ClientExceptionUnavailable)
+from .batch import DEFAULT_BATCH_WORKERS
+from .cache import (DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL,
+                    DEFAULT_CONTENT_CACHE_SIZE)
+from .client import (DEFAULT_CONNECT_TIMEOUT, DEFAULT_HTTP_POOL_SIZE,
+                     DEFAULT_READ_CHUNK_SIZE, DEFAULT_READ_TIMEOUT,
+                     DEFAULT_STDOUT_PRINT_MARKER)
+from .retry import DEFAULT_RETRIES
+
+# The backends are imported on first use only, so that using one of them
+# does not pay for importing the dependencies (grpc, requests, ...) of the
+# others.
+BACKEND_CLIENTS = {
+    'GRPCClient': '.grpc_client.grpc_client',
+    'AsyncGRPCClient': '.grpc_client.async_grpc_client',
+    'RESTClient': '.rest_client.rest_client',
+    'AsyncRESTClient': '.rest_client.async_rest_client',
+}
+
+
+def __getattr__(name):
+    if name not in BACKEND_CLIENTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    from importlib import import_module
+    return getattr(import_module(BACKEND_CLIENTS[name], __name__), name)
@@ -0,0 +1,207 @@
+import asyncio
+import sys
+import time
+from abc import abstractmethod
+from typing import Any, AsyncIterator, Dict, Iterable
+
+from .batch import DEFAULT_BATCH_WORKERS, BatchReport, describe_exception
+from .cache import NOT_FOUND, StatCache
+from .client import BaseClient, ReadStream
+from .client_exceptions import ClientExceptionFileNotFound, silenced_messages
+from .formats import TEXT, get_formatter
+from .limiter import AdaptiveLimiter, is_overload
+from .metrics import CallMetrics
+from .retry import RetryPolicy
+
+
+_END = object()
+
+
+class AsyncClient(BaseClient):
+    """
+    asyncio variant of ``Client``. A single event loop keeps many requests
+    in flight over one backend connection instead of a thread per request.
+    The calls are retried by the ``retry_policy`` and the stats go through
+    the ``stat_cache`` as in ``Client``.
+    """
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.stat_cache = None
+        if context.cache:
+            self.stat_cache = StatCache(
+                ttl=context.cache_ttl, max_entries=context.cache_size)
+        self.refresh_cache = context.refresh_cache
+        self.retry_policy = RetryPolicy(
+            retries=context.retries, deadline=context.deadline)
+        self.connect_timeout = context.connect_timeout
+        self.read_timeout = context.read_timeout
+
+    @abstractmethod
+    async def read_stream(self, uuid) -> ReadStream:
+        """
+        Returns the file content as an asynchronous iterator of chunks.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stat(self, uuid) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def open(self):
+        """
+        Sets up what is bound to the running event loop, awaited before the
+        first call.
+        """
+        pass
+
+    async def aclose(self):
+        pass
+
+    async def read(self, uuid) -> (bytes, str, str):
+        stream = await self.read_stream(uuid)
+        return (
+            b''.join([chunk async for chunk in stream.chunks]),
+            stream.content_disposition,
+            stream.content_type
+        )
+
+    async def stat_many(
+            self, uuids: Iterable[str],
+            concurrency: int = DEFAULT_BATCH_WORKERS,
+            limiter=None) -> AsyncIterator:
+        """
+        Stats the files with at most ``concurrency`` requests in flight and
+        yields ``(uuid, result, exception)`` tuples in the order the requests
+        finish. ``uuids`` is consumed lazily, off the event loop, as it may
+        block reading a pipe. With an ``AdaptiveLimiter`` its limit caps the
+        requests in flight too. Duplicate UUIDs in flight at the same time
+        share one request.
+        """
+        uuids = iter(uuids)
+        loop = asyncio.get_running_loop()
+        pending = {}
+        in_flight = {}
+        next_uuid = None
+        exhausted = False
+
+        async def shared_stat(uuid):
+            if uuid in in_flight:
+                return await asyncio.shield(in_flight[uuid])
+            in_flight[uuid] = asyncio.ensure_future(self.cached_stat(uuid))
+            try:
+                return await in_flight[uuid]
+            finally:
+                del in_flight[uuid]
+
+        while True:
+            limit = (concurrency if limiter is None
+                     else min(limiter.limit, concurrency))
+            if next_uuid is None and not exhausted and len(pending) < limit:
+                next_uuid = loop.run_in_executor(None, next, uuids, _END)
+            if next_uuid is None and not pending:
+                return
+            waiting = set(pending)
+            if next_uuid is not None:
+                waiting.add(next_uuid)
+            done, _ = await asyncio.wait(
+                waiting, return_when=asyncio.FIRST_COMPLETED)
+            if next_uuid in done:
+                uuid = next_uuid.result()
+                next_uuid = None
+                if uuid is _END:
+                    exhausted = True
+                else:
+                    pending[asyncio.ensure_future(shared_stat(uuid))] = (
+                        uuid, time.monotonic())
+            for task in done:
+                if task not in pending:
+                    continue
+                uuid, started = pending.pop(task)
+                exception = task.exception()
+                if limiter is not None:
+                    limiter.record(started, time.monotonic() - started,
+                                   is_overload(exception))
+                if exception is None:
+                    yield uuid, task.result(), None
+                else:
+                    yield uuid, None, exception
+
+    async def cached_stat(self, uuid) -> Dict[str, Any]:
+        """
+        Same as ``Client.cached_stat``, the SQLite cache is queried on the
+        default executor, so it does not block the event loop.
+        """
+        if self.stat_cache is None:
+            return await self._measured_stat(uuid)
+        loop = asyncio.get_running_loop()
+        key = f'{self.backend}:{self.endpoint}:{uuid}'
+        if not self.refresh_cache:
+            attributes = await loop.run_in_executor(
+                None, self.stat_cache.get, key)
+            if attributes is NOT_FOUND:
+                raise ClientExceptionFileNotFound()
+            elif attributes is not None:
+                return attributes
+        try:
+            attributes = await self._measured_stat(uuid)
+        except ClientExceptionFileNotFound:
+            await loop.run_in_executor(
+                None, self.stat_cache.set_not_found, key)
+            raise
+        await loop.run_in_executor(None, self.stat_cache.set, key, attributes)
+        return attributes
+
+    async def _measured_stat(self, uuid):
+        """
+        ``stat`` measured for the hooks as in ``Client``, the connection
+        times and retries are not known on the event loop.
+        """
+        metrics = CallMetrics('stat', self.backend, uuid)
+        error = None
+        try:
+            attributes = await self.stat(uuid)
+            metrics.time_to_first_byte = (
+                time.perf_counter() - metrics.started)
+            return attributes
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            metrics.backend_wait = time.perf_counter() - metrics.started
+            metrics.finish()
+            if error is not None:
+                metrics.error = describe_exception(error)
+            for hook in self.hooks:
+                hook(metrics)
+
+    def stat_many_and_output(
+            self, uuids: Iterable[str],
+            concurrency: int = DEFAULT_BATCH_WORKERS,
+            output_format: str = TEXT,
+            adaptive: bool = False) -> BatchReport:
+        """
+        Same as ``Client.stat_many_and_output``, run on a new event loop.
+        """
+        limiter = AdaptiveLimiter(max_limit=concurrency) if adaptive else None
+        return asyncio.run(self._stat_many_and_output(
+            uuids, concurrency, output_format, limiter))
+
+    async def _stat_many_and_output(self, uuids, concurrency, output_format,
+                                    limiter=None):
+        report = BatchReport(limiter)
+        formatter = get_formatter(output_format)
+        try:
+            await self.open()
+            with silenced_messages(), self._open_binary_output() as file:
+                file.write(formatter.header())
+                file.flush()
+                async for result in self.stat_many(
+                        uuids, concurrency, limiter):
+                    self._output_batch_result(
+                        file, report, formatter, *result)
+                    file.flush()
+        finally:
+            await self.aclose()
+        print(report.summary(), file=sys.stderr)
+        return report
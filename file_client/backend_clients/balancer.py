@@ -0,0 +1,104 @@
+import itertools
+import threading
+import time
+
+
+ROUND_ROBIN = 'round-robin'
+LEAST_OUTSTANDING = 'least-outstanding'
+BALANCING_POLICIES = (ROUND_ROBIN, LEAST_OUTSTANDING)
+DEFAULT_EJECT_AFTER = 3
+DEFAULT_EJECT_FOR = 30.0
+
+
+def split_endpoints(value):
+    """
+    Returns the endpoints of a comma-separated list.
+    """
+    return [endpoint.strip() for endpoint in value.split(',')
+            if endpoint.strip()]
+
+
+class Endpoint(object):
+    """
+    A backend server, the ``target`` is whatever the client talks to it
+    through, with its load and health as seen by the balancer.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.outstanding = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def __repr__(self):
+        return f'Endpoint({self.target!r})'
+
+
+class EndpointBalancer(object):
+    """
+    Spreads the calls over the endpoints either round-robin or to the one
+    with the least outstanding calls. An endpoint failing ``eject_after``
+    times in a row is ejected, it gets no calls for ``eject_for`` seconds
+    unless all the others are ejected too.
+    """
+
+    def __init__(self, targets, policy=ROUND_ROBIN,
+                 eject_after=DEFAULT_EJECT_AFTER,
+                 eject_for=DEFAULT_EJECT_FOR):
+        if policy not in BALANCING_POLICIES:
+            raise ValueError(f'Unknown balancing policy {policy!r}')
+        self.endpoints = [Endpoint(target) for target in targets]
+        self.policy = policy
+        self.eject_after = eject_after
+        self.eject_for = eject_for
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def acquire(self, tried=()):
+        """
+        Returns the endpoint for the next call, preferring the healthy ones
+        not ``tried`` by the call yet, so a retry fails over to another
+        server. The endpoint has to be given back by ``release``.
+        """
+        with self._lock:
+            now = time.monotonic()
+            healthy = [endpoint for endpoint in self.endpoints
+                       if endpoint.ejected_until <= now]
+            candidates = (
+                [endpoint for endpoint in healthy if endpoint not in tried]
+                or healthy
+                or [min(self.endpoints,
+                        key=lambda endpoint: endpoint.ejected_until)]
+            )
+            start = next(self._counter) % len(candidates)
+            candidates = candidates[start:] + candidates[:start]
+            if self.policy == LEAST_OUTSTANDING:
+                endpoint = min(
+                    candidates, key=lambda endpoint: endpoint.outstanding)
+            else:
+                endpoint = candidates[0]
+            endpoint.outstanding += 1
+            return endpoint
+
+    def release(self, endpoint, failed=False):
+        """
+        Gives back an endpoint of a finished call, ``failed`` if the server
+        was unavailable or did not answer.
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if not failed:
+                endpoint.failures = 0
+                return
+            endpoint.failures += 1
+            if endpoint.failures >= self.eject_after:
+                endpoint.failures = 0
+                endpoint.ejected_until = time.monotonic() + self.eject_for
+
+    def has_untried(self, tried):
+        """
+        Returns whether a healthy endpoint not ``tried`` yet is left.
+        """
+        now = time.monotonic()
+        return any(endpoint.ejected_until <= now and endpoint not in tried
+                   for endpoint in self.endpoints)
@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+
+from .limiter import is_overload
+
+
+DEFAULT_BATCH_WORKERS = 16
+# How often a batch waiting for its calls looks for newly read items.
+REFILL_INTERVAL = 0.05
+_END = object()
+
+
+def run_batch(function, items, workers=DEFAULT_BATCH_WORKERS, limiter=None):
+    """
+    Calls ``function`` for every item from ``items`` on a pool of
+    ``workers`` threads and yields ``(item, result, exception)`` tuples in
+    the order the calls finish.
+
+    ``items`` is consumed lazily by a feeder thread and at most twice as
+    many items as there are workers are read ahead and queued at a time,
+    so arbitrarily long inputs (e.g. read from the stdin) are processed in
+    constant memory. A slow input does not hold back the results of the
+    calls in flight. A failing call does not stop the batch, its exception
+    is yielded instead of the result.
+
+    With an ``AdaptiveLimiter`` only as many calls as its limit are in
+    flight, at most ``workers``, and every finished call adjusts the limit.
+    """
+    # Imported here, the CLI imports this module for DEFAULT_BATCH_WORKERS
+    # and concurrent.futures would slow down the start of every command.
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    inputs = queue.Queue(maxsize=workers * 2)
+    stopped = threading.Event()
+    # A daemon, the input (e.g. the stdin) may block it forever.
+    threading.Thread(target=_feed, args=(items, inputs, stopped),
+                     daemon=True).start()
+    exhausted = False
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            while True:
+                limit = (workers * 2 if limiter is None
+                         else min(limiter.limit, workers))
+                while not exhausted and len(pending) < limit:
+                    try:
+                        item, error = inputs.get(block=not pending)
+                    except queue.Empty:
+                        break
+                    if error is not None:
+                        raise error
+                    if item is _END:
+                        exhausted = True
+                    else:
+                        pending[executor.submit(function, item)] = (
+                            item, time.monotonic())
+                if not pending:
+                    return
+                done, _ = wait(
+                    pending, None if exhausted else REFILL_INTERVAL,
+                    FIRST_COMPLETED)
+                for future in done:
+                    item, started = pending.pop(future)
+                    exception = future.exception()
+                    if limiter is not None:
+                        limiter.record(started, time.monotonic() - started,
+                                       is_overload(exception))
+                    if exception is None:
+                        yield item, future.result(), None
+                    else:
+                        yield item, None, exception
+    finally:
+        stopped.set()
+        # Unblocks the feeder waiting for room in the queue.
+        while not exhausted:
+            try:
+                item, error = inputs.get_nowait()
+            except queue.Empty:
+                break
+            exhausted = item is _END or error is not None
+
+
+def _feed(items, inputs, stopped):
+    try:
+        for item in items:
+            inputs.put((item, None))
+            if stopped.is_set():
+                return
+    except Exception as e:
+        inputs.put((_END, e))
+        return
+    inputs.put((_END, None))
+
+
+class BatchReport(object):
+    """
+    Counts finished and failed items of a batch run and its throughput,
+    and the concurrency the ``limiter`` of an adaptive run reached.
+    """
+
+    def __init__(self, limiter=None):
+        self.succeeded = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.limiter = limiter
+
+    @property
+    def total(self):
+        return self.succeeded + self.failed
+
+    def record(self, exception=None):
+        if exception is None:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        throughput = self.total / elapsed if elapsed > 0 else 0.0
+        summary = (
+            f'Processed {self.total} files in {elapsed:.2f} s'
+            f' ({throughput:.1f} files/s), {self.failed} failed.'
+        )
+        if self.limiter is not None:
+            summary += (
+                f' Concurrency ended at {self.limiter.limit}'
+                f' (peak {int(self.limiter.peak)}).'
+            )
+        return summary
+
+
+def describe_exception(exception):
+    """
+    Returns a one-line description of an exception raised by a batch item.
+    """
+    header = getattr(exception, 'header_message', type(exception).__name__)
+    return f'{header} {exception}'.strip()
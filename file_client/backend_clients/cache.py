@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+DEFAULT_CACHE_TTL = 24 * 60 * 60
+DEFAULT_CACHE_SIZE = 100000
+NOT_FOUND_CACHE_TTL = 60
+NOT_FOUND = object()
+
+
+def default_cache_dir():
+    """
+    Returns the ``file-client`` directory in the XDG cache directory.
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'file-client')
+
+
+class StatCache(object):
+    """
+    Persistent cache of file metadata in an SQLite database.
+
+    Entries expire after ``ttl`` seconds, entries for files which were not
+    found after ``not_found_ttl`` seconds. The least recently used entries
+    are evicted once there are more than ``max_entries`` of them. SQLite
+    locking makes the cache safe to share by concurrent CLI processes, every
+    thread uses a connection of its own.
+    """
+    EVICTION_INTERVAL = 256
+
+    def __init__(self, path=None, ttl=DEFAULT_CACHE_TTL,
+                 max_entries=DEFAULT_CACHE_SIZE,
+                 not_found_ttl=NOT_FOUND_CACHE_TTL):
+        self.path = path or os.path.join(default_cache_dir(), 'stat.sqlite3')
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.not_found_ttl = not_found_ttl
+        self._local = threading.local()
+        self._sets = 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS stat_cache ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT,'
+            ' expires REAL NOT NULL,'
+            ' accessed REAL NOT NULL)'
+        )
+        self._connection().execute(
+            'CREATE INDEX IF NOT EXISTS stat_cache_accessed'
+            ' ON stat_cache (accessed)'
+        )
+
+    def get(self, key):
+        """
+        Returns the cached metadata, ``NOT_FOUND`` for a cached missing file
+        or ``None`` if there is no valid entry.
+        """
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT value, expires FROM stat_cache WHERE key = ?', (key, )
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        if expires <= now:
+            connection.execute(
+                'DELETE FROM stat_cache WHERE key = ? AND expires <= ?',
+                (key, now))
+            return None
+        connection.execute(
+            'UPDATE stat_cache SET accessed = ? WHERE key = ?', (now, key))
+        return NOT_FOUND if value is None else json.loads(value)
+
+    def set(self, key, attributes):
+        self._store(key, json.dumps(attributes), self.ttl)
+
+    def set_not_found(self, key):
+        self._store(key, None, self.not_found_ttl)
+
+    def evict(self):
+        """
+        Removes the expired entries and the least recently used ones over
+        ``max_entries``.
+        """
+        connection = self._connection()
+        connection.execute(
+            'DELETE FROM stat_cache WHERE expires <= ?', (time.time(), ))
+        connection.execute(
+            'DELETE FROM stat_cache WHERE key IN ('
+            ' SELECT key FROM stat_cache ORDER BY accessed DESC'
+            ' LIMIT -1 OFFSET ?)',
+            (self.max_entries, )
+        )
+
+    def _store(self, key, value, ttl):
+        now = time.time()
+        self._connection().execute(
+            'INSERT OR REPLACE INTO stat_cache (key, value, expires, accessed)'
+            ' VALUES (?, ?, ?, ?)',
+            (key, value, now + ttl, now)
+        )
+        self._sets += 1
+        if self._sets % self.EVICTION_INTERVAL == 0:
+            self.evict()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Imported here, as only --cache needs it and every command
+            # imports this module for the defaults of the options.
+            import sqlite3
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+
+DEFAULT_CONTENT_CACHE_SIZE = 1024 ** 3
+
+
+class ContentCache(object):
+    """
+    Size-capped store of file contents in a directory, each entry is a data
+    file plus a JSON file with its metadata and the validators used to check
+    with the backend whether the content has changed.
+
+    Files are written under temporary names and renamed into place, so
+    concurrent processes never see a partial entry. The least recently used
+    entries are removed once the total size exceeds ``max_size`` bytes.
+    """
+
+    def __init__(self, path=None, max_size=DEFAULT_CONTENT_CACHE_SIZE):
+        self.path = path or os.path.join(default_cache_dir(), 'content')
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+
+    def get(self, key):
+        """
+        Returns the metadata of the cached content, or ``None``.
+        """
+        metadata_path, data_path = self._paths(key)
+        try:
+            with open(metadata_path, 'rt') as file:
+                metadata = json.load(file)
+            if os.path.getsize(data_path) != metadata['size']:
+                return None
+        except (OSError, ValueError, KeyError):
+            return None
+        os.utime(metadata_path)
+        return metadata
+
+    def iter_chunks(self, key, chunk_size):
+        _, data_path = self._paths(key)
+        with open(data_path, 'rb') as file:
+            yield from iter(lambda: file.read(chunk_size), b'')
+
+    def store_chunks(self, key, chunks, metadata):
+        """
+        Passes the chunks through while copying them into the cache. The
+        entry is only stored once all the chunks went through.
+        """
+        metadata_path, data_path = self._paths(key)
+        suffix = f'{os.getpid()}.{threading.get_ident()}'
+        temporary_path = f'{data_path}.{suffix}'
+        size = 0
+        file = open(temporary_path, 'wb')
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                if file is not None and size > self.max_size:
+                    file.close()
+                    file = None
+                    os.remove(temporary_path)
+                if file is not None:
+                    file.write(chunk)
+                yield chunk
+            if file is None:
+                return
+            file.close()
+            os.replace(temporary_path, data_path)
+            with open(f'{metadata_path}.{suffix}', 'wt') as file:
+                json.dump({**metadata, 'size': size}, file)
+            os.replace(f'{metadata_path}.{suffix}', metadata_path)
+            self.evict()
+        finally:
+            if file is not None and not file.closed:
+                file.close()
+                os.remove(temporary_path)
+
+    def evict(self):
+        """
+        Removes the least recently used entries over ``max_size``.
+        """
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.json'):
+                continue
+            metadata_path = os.path.join(self.path, name)
+            data_path = metadata_path[:-len('.json')] + '.data'
+            try:
+                entries.append((
+                    os.path.getmtime(metadata_path),
+                    os.path.getsize(data_path),
+                    metadata_path,
+                    data_path,
+                ))
+            except OSError:
+                continue
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, metadata_path, data_path in sorted(entries):
+            if total <= self.max_size:
+                break
+            for path in (metadata_path, data_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+    def _paths(self, key):
+        name = hashlib.sha256(key.encode()).hexdigest()
+        return (
+            os.path.join(self.path, f'{name}.json'),
+            os.path.join(self.path, f'{name}.data'),
+        )
@@ -1,51 +1,139 @@
+import os
+import sys
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional
+
+from .balancer import EndpointBalancer
+from .batch import (DEFAULT_BATCH_WORKERS, BatchReport, describe_exception,
+                    run_batch)
+from .cache import NOT_FOUND, ContentCache, StatCache
+from .client_exceptions import (ClientExceptionFileNotFound,
+                                ClientExceptionIntegrity,
+                                ClientExceptionInvalidArgument,
+                                silenced_messages)
+from .coalesce import SingleFlight
+from .formats import TEXT, format_text, get_formatter
+from .integrity import (DEFAULT_CHECKSUM_ALGORITHM, ChunkHasher,
+                        check_integrity)
+from .limiter import AdaptiveLimiter
+from .metrics import CallMetrics
+from .planner import AUTO, BUFFERED, RANGES, STREAM, TransferPlanner
+from .retry import Hedger, RetryPolicy
+from .sink import atomic_output_file, open_sink, write_at
 
 
 DEFAULT_STDOUT_PRINT_MARKER = '-'
+DEFAULT_READ_CHUNK_SIZE = 64 * 1024
+DEFAULT_HTTP_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 60.0
+DEFAULT_RANGE_SIZE = 8 * 1024 * 1024
+
+
+class ReadStream(NamedTuple):
+    """
+    File content as an iterator of chunks, plus the metadata the backend
+    returned along with it.
+    """
+    chunks: Iterator[bytes]
+    content_disposition: Optional[str] = None
+    content_type: Optional[str] = None
+
+
+def window_chunks(chunks, offset=0, length=None):
+    """
+    Yields the bytes of the ``chunks`` from the ``offset`` on, at most
+    ``length`` of them, and closes the ``chunks`` as soon as the last one
+    is there, so the rest of a stream is not transferred.
+    """
+    remaining = length
+    try:
+        if remaining == 0:
+            return
+        for chunk in chunks:
+            if offset >= len(chunk):
+                offset -= len(chunk)
+                continue
+            if offset:
+                chunk = chunk[offset:]
+                offset = 0
+            if remaining is not None:
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+            yield chunk
+            if remaining == 0:
+                return
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
 
 
-class Client(ABC):
+class BaseClient(ABC):
+    """
+    Configuration and output handling shared by the synchronous ``Client``
+    and the asyncio ``AsyncClient`` backends.
+    """
 
     def __init__(self, context):
         self.backend = context.backend
         self.grpc_server = context.grpc_server
         self.base_url = context.base_url
         self.output = context.output
+        self.chunk_size = context.chunk_size
+        self.balance = context.balance
+        self.eject_after = context.eject_after
+        self.eject_for = context.eject_for
+        self.hooks = []
 
-    @abstractmethod
-    def read(self, uuid) -> (bytes, str, str):
-        raise NotImplementedError
+    def add_hook(self, hook):
+        """
+        Registers a callable called with the ``CallMetrics`` of every backend
+        call once it has finished. Hooks may be called from several threads
+        at once.
+        """
+        self.hooks.append(hook)
 
-    @abstractmethod
-    def stat(self, uuid) -> Dict[str, Any]:
-        raise NotImplementedError
+    @property
+    def endpoint(self):
+        return self.grpc_server if self.backend == 'grpc' else self.base_url
 
-    def read_and_output(self, uuid):
-        content, _, content_type = self.read(uuid)
-        self.output_result(self._print_content(content, content_type), content)
-
-    def stat_and_output(self, uuid):
-        resulting_text = self._process_dict_for_display(self.stat(uuid))
-        self.output_result(resulting_text, resulting_text, file_flags='wt')
+    def _create_balancer(self, targets):
+        return EndpointBalancer(targets, self.balance, self.eject_after,
+                                self.eject_for)
 
-    def output_result(self, print_output, file_output, file_flags='wb'):
+    def output_result(self, print_output, file_output=None):
+        """
+        Writes the ``print_output`` followed by a new line to the stdout,
+        or the ``file_output`` (by default the ``print_output``) to the
+        output file. Both are either ``str`` or bytes-like.
+        """
         if self.output == DEFAULT_STDOUT_PRINT_MARKER:
-            print(print_output)
+            data = print_output
+            newline = b'\n'
         else:
-            with open(self.output, file_flags) as file:
-                file.write(file_output)
-
-    def _print_content(self, content, content_type=None):
-        # This is quite a hack. It would probably by better to just print
-        # the content in bytes in every case.
-        if (
-            content_type
-            and ('text/' in content_type or 'json/' in content_type)
-        ):
-                return content.decode()
-        else:
-            return content
+            data = print_output if file_output is None else file_output
+            newline = b''
+        if isinstance(data, str):
+            data = data.encode()
+        with self._open_binary_output() as sink:
+            sink.write(data)
+            sink.write(newline)
+
+    def output_stream(self, chunks):
+        """
+        Writes the chunks, ``bytes`` or ``memoryview`` objects, to the
+        output unchanged as they arrive, so only a few of them are held in
+        memory at a time.
+        """
+        with self._open_binary_output() as sink:
+            for chunk in chunks:
+                sink.write(chunk)
+
+    def _open_binary_output(self):
+        return open_sink(self.output)
 
     def _process_dict_for_display(self, attributes_dict):
         # This displays present json keys. If displaying even missing keys
@@ -60,6 +148,480 @@ class Client(ABC):
         #         (key, attributes_dict.get(key, 'Not present'))
         #         for key in keys]]
         # )
-        return '\n'.join(
-            [f'{key}: {value}' for key, value in attributes_dict.items()]
+        return format_text(attributes_dict)
+
+    def _output_batch_result(self, file, report, formatter, uuid, attributes,
+                             exception):
+        report.record(exception)
+        if exception is not None:
+            print(f'{uuid}: {describe_exception(exception)}', file=sys.stderr)
+            return
+        file.write(formatter.record(uuid, attributes))
+
+
+class Client(BaseClient):
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.stat_cache = None
+        self.content_cache = None
+        if context.cache:
+            self.stat_cache = StatCache(
+                ttl=context.cache_ttl, max_entries=context.cache_size)
+            self.content_cache = ContentCache(
+                max_size=context.content_cache_size)
+        self.refresh_cache = context.refresh_cache
+        self.retry_policy = RetryPolicy(
+            retries=context.retries, deadline=context.deadline)
+        self.hedger = None
+        if context.hedge:
+            self.hedger = Hedger(
+                delay=context.hedge_after,
+                workers=max(32, 2 * context.http_pool_size))
+        self.planner = TransferPlanner(
+            context.strategy, context.buffered_max_size,
+            context.ranges_min_size)
+        self.range_connections = context.range_connections
+        self.output_path = context.output_path
+        self.compression = context.compression
+        self.flights = SingleFlight()
+        self._retries = threading.local()
+
+    def close(self):
+        """
+        Releases the connections held by the client.
+        """
+        if self.hedger is not None:
+            self.hedger.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @abstractmethod
+    def read(self, uuid) -> (bytes, str, str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def stat(self, uuid) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def read_stream(self, uuid) -> ReadStream:
+        """
+        Returns the file content as an iterator of chunks.
+
+        Backends able to stream the content should override this, the default
+        falls back to a single chunk holding the whole ``read`` result.
+        """
+        content, content_disposition, content_type = self.read(uuid)
+        return ReadStream(iter((content, )), content_disposition, content_type)
+
+    def read_window_stream(self, uuid, offset=0, length=None) -> ReadStream:
+        """
+        Returns ``length`` bytes of the file content from the ``offset`` on,
+        or all of them up to the end if ``length`` is ``None``. A negative
+        ``offset`` counts from the end of the file, its size is taken from
+        ``stat``.
+
+        The default streams the content from its start, skips the bytes
+        before the ``offset`` and stops the stream once the window is
+        complete. Backends supporting ranges should override this.
+        """
+        if offset < 0:
+            offset = max(0, self.cached_stat(uuid).get('size', 0) + offset)
+        stream = self.read_stream(uuid)
+        return stream._replace(
+            chunks=window_chunks(stream.chunks, offset, length))
+
+    def read_stream_if_modified(self, uuid, validators=None):
+        """
+        Returns a ``(stream, validators)`` tuple, where the ``stream`` is
+        ``None`` if the content still matches the given ``validators`` of a
+        cached copy.
+
+        The default validators are the file size and creation date from
+        ``stat``. Backends supporting conditional requests should override
+        this. The ``stat`` bypasses the stat cache, whose entry would always
+        match, but is measured and shared like any other.
+        """
+        attributes = self.flights.call(
+            ('stat', uuid), self._measured_stat, uuid)
+        current_validators = {
+            'size': attributes.get('size'),
+            'create_datetime': attributes.get('create_datetime'),
+        }
+        if validators == current_validators:
+            return None, validators
+        return self.read_stream(uuid), current_validators
+
+    def cached_read_stream(self, uuid) -> ReadStream:
+        """
+        ``read_stream`` going through the content cache, if it is enabled.
+        A cached copy is served from the local disk as long as the backend
+        confirms it has not changed, otherwise the content is streamed from
+        the backend and stored on the way.
+        """
+        if self.content_cache is None:
+            return self.read_stream(uuid)
+        key = f'{self.backend}:{self.endpoint}:{uuid}'
+        cached = None if self.refresh_cache else self.content_cache.get(key)
+        stream, validators = self.read_stream_if_modified(
+            uuid, cached['validators'] if cached else None)
+        if stream is None:
+            return ReadStream(
+                self.content_cache.iter_chunks(key, self.chunk_size),
+                cached['content_disposition'],
+                cached['content_type']
+            )
+        if not any(validators.values()):
+            return stream
+        return stream._replace(chunks=self.content_cache.store_chunks(
+            key, stream.chunks, {
+                'validators': validators,
+                'content_disposition': stream.content_disposition,
+                'content_type': stream.content_type,
+            }
+        ))
+
+    def measured_read_stream(self, uuid, offset=0, length=None,
+                             strategy=STREAM) -> ReadStream:
+        """
+        ``cached_read_stream`` measured for the hooks, the metrics are
+        emitted once the chunks are consumed. A window of the content given
+        by the ``offset`` and ``length`` is read by ``read_window_stream``,
+        bypassing the content cache, and so is a ``buffered`` one read by
+        ``read``, which concurrent calls for the same file share.
+        """
+        metrics = CallMetrics('read', self.backend, uuid)
+        try:
+            if offset or length is not None:
+                stream = self.read_window_stream(uuid, offset, length)
+            elif strategy == BUFFERED:
+                metrics.strategy = strategy
+                content, content_disposition, content_type = (
+                    self.flights.call(('read', uuid), self.read, uuid))
+                stream = ReadStream(
+                    iter((content, )), content_disposition, content_type)
+            else:
+                metrics.strategy = strategy
+                stream = self.cached_read_stream(uuid)
+        except BaseException as e:
+            self._finish_metrics(metrics, e)
+            raise
+        metrics.backend_wait = time.perf_counter() - metrics.started
+        return stream._replace(
+            chunks=self._measure_chunks(metrics, stream.chunks))
+
+    def read_and_output(self, uuid, checksum=None, verify=None, offset=0,
+                        length=None):
+        """
+        Outputs the file content, or its window of ``length`` bytes from the
+        ``offset`` on. With a ``checksum`` algorithm, or a ``verify`` digest
+        to check (SHA-256 unless another ``checksum`` is given), the whole
+        content is hashed as it streams through and its size is checked
+        against ``stat``. The digest of a ``checksum`` is printed on the
+        stderr in the ``sha256sum`` format.
+
+        An output to a regular file is written by ``write_to_file``, so it
+        appears complete or not at all.
+        """
+        if offset or length is not None:
+            self._output_chunks(
+                self.measured_read_stream(uuid, offset, length).chunks)
+            return
+        hashing = checksum is not None or verify is not None
+        attributes, strategy = self.plan_read(uuid, hashing)
+        if strategy == RANGES:
+            self.read_ranges_to_file(
+                uuid, self.output_path, self.range_connections,
+                size=attributes.get('size'))
+            return
+        stream = self.measured_read_stream(uuid, strategy=strategy)
+        expected_size = attributes.get('size')
+        if not hashing:
+            self._output_chunks(stream.chunks, expected_size)
+            return
+        hasher = ChunkHasher(checksum or DEFAULT_CHECKSUM_ALGORITHM)
+
+        def check():
+            check_integrity(uuid, hasher.size, expected_size,
+                            hasher.hexdigest(), verify)
+
+        self._output_chunks(hasher.tee(stream.chunks), expected_size, check)
+        if checksum is not None:
+            print(f'{hasher.hexdigest()}  {uuid}', file=sys.stderr)
+
+    def _output_chunks(self, chunks, size=None, check=None):
+        """
+        Outputs the chunks by ``output_stream``, or by ``write_to_file`` if
+        the output is a regular file. The ``check`` is called once all of
+        them are there, before the file is renamed into place.
+        """
+        path = self._output_file_path()
+        if path is None:
+            self.output_stream(chunks)
+            if check is not None:
+                check()
+            return
+        self.write_to_file(chunks, path, size, check)
+
+    def _output_file_path(self):
+        """
+        Returns the ``output_path`` if it is a regular file or does not
+        exist yet, ``None`` for the stdout and special files.
+        """
+        path = self.output_path
+        if path is None or (
+                os.path.exists(path) and not os.path.isfile(path)):
+            return None
+        return path
+
+    def plan_read(self, uuid, hashing=False):
+        """
+        Returns the ``(attributes, strategy)`` of the file, with the strategy
+        chosen by the ``planner``. The metadata are asked for only if the
+        planner, the ``hashing`` of the content or an output file needs
+        them, otherwise they are an empty dict. Ranges are used only if the
+        backend supports them, the output is a regular file and the content
+        is not hashed.
+        """
+        auto = self.planner.strategy == AUTO
+        path = self._output_file_path()
+        attributes = (
+            self.cached_stat(uuid) if auto or hashing or path is not None
+            else {}
         )
+        ranges = (
+            not hashing
+            and path is not None
+            and type(self).read_ranges_to_file
+            is not Client.read_ranges_to_file
+        )
+        strategy = self.planner.choose(
+            attributes, cached=auto and self._has_cached_content(uuid),
+            ranges=ranges, compression=self.compression)
+        if strategy == RANGES and not ranges:
+            strategy = STREAM
+        return attributes, strategy
+
+    def _has_cached_content(self, uuid):
+        if self.content_cache is None or self.refresh_cache:
+            return False
+        key = f'{self.backend}:{self.endpoint}:{uuid}'
+        return self.content_cache.get(key) is not None
+
+    def cached_stat(self, uuid) -> Dict[str, Any]:
+        """
+        ``stat`` going through the persistent stat cache, if it is enabled.
+        The file metadata never change, so valid entries are returned
+        without asking the backend unless a refresh was requested. Missing
+        files are cached for a short time too. Concurrent calls for the
+        same file share one backend request.
+        """
+        if self.stat_cache is None:
+            return self.flights.call(('stat', uuid), self._measured_stat, uuid)
+        key = f'{self.backend}:{self.endpoint}:{uuid}'
+        if not self.refresh_cache:
+            attributes = self.stat_cache.get(key)
+            if attributes is NOT_FOUND:
+                raise ClientExceptionFileNotFound()
+            elif attributes is not None:
+                return attributes
+        return self.flights.call(
+            ('stat', uuid), self._stat_into_cache, key, uuid)
+
+    def _stat_into_cache(self, key, uuid):
+        try:
+            attributes = self._measured_stat(uuid)
+        except ClientExceptionFileNotFound:
+            self.stat_cache.set_not_found(key)
+            raise
+        self.stat_cache.set(key, attributes)
+        return attributes
+
+    def stat_and_output(self, uuid):
+        resulting_text = self._process_dict_for_display(
+            self.cached_stat(uuid))
+        self.output_result(resulting_text)
+
+    def stat_many_and_output(
+            self, uuids: Iterable[str],
+            workers: int = DEFAULT_BATCH_WORKERS,
+            output_format: str = TEXT,
+            adaptive: bool = False) -> BatchReport:
+        """
+        Stats the files concurrently on a pool of ``workers`` threads and
+        outputs every result as soon as it is available, with its UUID, in
+        the ``output_format`` (``text``, ``ndjson`` or ``csv``), flushed
+        record by record, so a consumer of a pipe gets them right away.
+        Failed items are reported on the stderr and do not stop the run, a
+        summary with the throughput is printed there at the end. If
+        ``adaptive``, ``workers`` is the most calls in flight an
+        ``AdaptiveLimiter`` grows to.
+        """
+        limiter = AdaptiveLimiter(max_limit=workers) if adaptive else None
+        report = BatchReport(limiter)
+        formatter = get_formatter(output_format)
+        with silenced_messages(), self._open_binary_output() as file:
+            file.write(formatter.header())
+            file.flush()
+            for result in run_batch(self.cached_stat, uuids, workers,
+                                    limiter):
+                self._output_batch_result(file, report, formatter, *result)
+                file.flush()
+        print(report.summary(), file=sys.stderr)
+        return report
+
+    def read_to_file(self, uuid, path, size=None):
+        """
+        Streams the file content into ``path`` by ``write_to_file``.
+        Concurrent calls for the same file and ``path``, e.g. for duplicate
+        UUIDs of a batch, share one transfer.
+        """
+        return self.flights.call(
+            ('read_to_file', uuid, path), self._read_to_file, uuid, path,
+            size)
+
+    def _read_to_file(self, uuid, path, size):
+        return self.write_to_file(
+            self.measured_read_stream(uuid).chunks, path, size)
+
+    def write_to_file(self, chunks, path, size=None, check=None):
+        """
+        Writes the ``chunks`` into ``path`` by positional writes into a
+        temporary ``.part`` file, preallocated to the ``size`` if it is
+        known, which is renamed when complete, so an interrupted transfer
+        never leaves a truncated file at ``path``. Other bytes than the
+        ``size`` arriving fail the transfer with ``ClientExceptionIntegrity``.
+        The ``check`` is called before the rename, it may fail it too.
+        """
+        with atomic_output_file(path, size) as fd:
+            offset = 0
+            for chunk in chunks:
+                offset = write_at(fd, chunk, offset)
+            if size is not None and offset != size:
+                raise ClientExceptionIntegrity(
+                    f'{path}: read {offset} bytes, the file has {size}.')
+            if check is not None:
+                check()
+        return path
+
+    @contextmanager
+    def _measure(self, operation, uuid):
+        """
+        Measures the wrapped backend call for the hooks.
+        """
+        metrics = CallMetrics(operation, self.backend, uuid)
+        error = None
+        try:
+            yield metrics
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            metrics.backend_wait = time.perf_counter() - metrics.started
+            self._finish_metrics(metrics, error)
+
+    def _measured_stat(self, uuid):
+        with self._measure('stat', uuid) as metrics:
+            if self.hedger is None:
+                attributes = self.stat(uuid)
+            else:
+                attributes, retries = self.hedger.call(
+                    self._counted_stat, uuid)
+                self._retries.count = (
+                    getattr(self._retries, 'count', 0) + retries)
+            metrics.time_to_first_byte = (
+                time.perf_counter() - metrics.started)
+            return attributes
+
+    def _measure_chunks(self, metrics, chunks):
+        chunks = iter(chunks)
+        error = None
+        try:
+            while True:
+                waiting_since = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    break
+                finally:
+                    metrics.backend_wait += (
+                        time.perf_counter() - waiting_since)
+                if metrics.time_to_first_byte is None:
+                    metrics.time_to_first_byte = (
+                        time.perf_counter() - metrics.started)
+                metrics.chunks += 1
+                metrics.bytes += len(chunk)
+                yield chunk
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._finish_metrics(metrics, error)
+
+    def _finish_metrics(self, metrics, error=None):
+        metrics.finish()
+        metrics.connect = self._pop_connect_time()
+        metrics.retries = getattr(self._retries, 'count', 0)
+        self._retries.count = 0
+        if error is not None:
+            metrics.error = describe_exception(error)
+        for hook in self.hooks:
+            hook(metrics)
+
+    def _counted_stat(self, uuid):
+        # The hedged calls run on other threads, so their retries are
+        # returned to be counted on the calling one.
+        self._retries.count = 0
+        return self.stat(uuid), self._retries.count
+
+    def _count_retry(self):
+        self._retries.count = getattr(self._retries, 'count', 0) + 1
+
+    def _pop_connect_time(self):
+        """
+        Returns the time spent opening new connections since the last call
+        in this thread, or ``None``. Backends override this.
+        """
+        return None
+
+    def read_ranges_to_file(self, uuid, path, connections=1, size=None):
+        """
+        Downloads the file into ``path`` over several ``connections`` at once.
+        The ``size`` of the file is asked for by ``stat`` unless it is given.
+        Backends without support for partial reads fall back to a single
+        ``read_to_file`` stream.
+        """
+        return self.read_to_file(uuid, path, size)
+
+    def read_many_to_directory(
+            self, uuids: Iterable[str], directory,
+            workers: int = DEFAULT_BATCH_WORKERS,
+            adaptive: bool = False) -> BatchReport:
+        """
+        Downloads the files into ``directory``, each named by its UUID, on a
+        pool of ``workers`` threads sharing this client and so its backend
+        connections. Failed items are reported on the stderr and do not stop
+        the run, a summary with the throughput is printed there at the end.
+        ``adaptive`` works as in ``stat_many_and_output``.
+        """
+        def download(uuid):
+            if os.path.basename(uuid) != uuid or uuid in ('', '.', '..'):
+                raise ClientExceptionInvalidArgument(uuid)
+            return self.read_to_file(uuid, os.path.join(directory, uuid))
+
+        limiter = AdaptiveLimiter(max_limit=workers) if adaptive else None
+        report = BatchReport(limiter)
+        for uuid, _, exception in run_batch(download, uuids, workers,
+                                            limiter):
+            report.record(exception)
+            if exception is not None:
+                print(f'{uuid}: {describe_exception(exception)}',
+                      file=sys.stderr)
+        print(report.summary(), file=sys.stderr)
+        return report
@@ -1,15 +1,35 @@
+from contextlib import contextmanager
+
+
 class ClientException(Exception):
     """
     Base class of all Client exceptions.
     """
     header_message = 'An unexpected client exception occured. More details:'
+    print_message = True
 
     def __init__(self, message='', *args, **kwargs):
         super().__init__(message, *args, **kwargs)
-        print(f'{self.header_message} {message}')
+        if ClientException.print_message:
+            print(f'{self.header_message} {message}')
         raise self
 
 
+@contextmanager
+def silenced_messages():
+    """
+    Stops the exceptions raised meanwhile, in any thread, from printing
+    their messages to the stdout, e.g. while it carries the records of a
+    batch, which reports the failures on the stderr itself.
+    """
+    previous = ClientException.print_message
+    ClientException.print_message = False
+    try:
+        yield
+    finally:
+        ClientException.print_message = previous
+
+
 class ClientExceptionInvalidArgument(ClientException):
     """
     Invalid argument.
@@ -31,6 +51,20 @@ class ClientExceptionFailedPrecondition(ClientException):
     header_message = 'The remote service failed.'
 
 
+class ClientExceptionUnavailable(ClientException):
+    """
+    The remote service is unavailable, even after retrying.
+    """
+    header_message = 'The remote service is unavailable.'
+
+
+class ClientExceptionIntegrity(ClientException):
+    """
+    The content read does not match the file size or the expected checksum.
+    """
+    header_message = 'The file content failed the integrity check.'
+
+
 class ClientExceptionInvalidURL(ClientException):
     """
     Invalid URL.
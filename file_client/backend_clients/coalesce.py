@@ -0,0 +1,47 @@
+import threading
+
+
+class _Flight(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class SingleFlight(object):
+    """
+    Shares one call among the concurrent callers asking for the same key:
+    the first one makes the call, the others wait for it and get its result
+    or its exception. Once the call has finished, the next caller makes a
+    new one, nothing is cached. ``shared`` counts the calls saved.
+    """
+
+    def __init__(self):
+        self.shared = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def call(self, key, function, *args):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.shared += 1
+        if not leader:
+            flight.done.wait()
+            if flight.exception is not None:
+                raise flight.exception
+            return flight.result
+        try:
+            flight.result = function(*args)
+            return flight.result
+        except BaseException as e:
+            flight.exception = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+
+TEXT = 'text'
+NDJSON = 'ndjson'
+CSV = 'csv'
+OUTPUT_FORMATS = (TEXT, NDJSON, CSV)
+CSV_FIELDS = ('uuid', 'name', 'size', 'mimetype', 'create_datetime')
+
+
+def normalize_datetime(value):
+    """
+    Returns an ISO 8601 date and time in UTC with a ``Z`` suffix, whether it
+    comes as an ISO string with any offset, with none (taken as UTC) or as a
+    date only, the way the REST server sends it, or as the RFC 3339 string
+    of a gRPC ``Timestamp`` with up to nanoseconds. Values which are not
+    dates are returned unchanged.
+    """
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    if text[-1:] in ('Z', 'z'):
+        text = text[:-1] + '+00:00'
+    time_start = text.find('T') + 1
+    fraction_start = text.find('.', time_start) if time_start else -1
+    if fraction_start != -1:
+        # Python parses at most microseconds.
+        fraction_end = fraction_start + 1
+        while fraction_end < len(text) and text[fraction_end].isdigit():
+            fraction_end += 1
+        fraction = text[fraction_start + 1:fraction_end][:6].ljust(6, '0')
+        text = f'{text[:fraction_start]}.{fraction}{text[fraction_end:]}'
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    parsed = parsed.astimezone(timezone.utc)
+    timespec = 'microseconds' if parsed.microsecond else 'seconds'
+    return parsed.replace(tzinfo=None).isoformat(timespec=timespec) + 'Z'
+
+
+def normalize_attributes(attributes):
+    """
+    Returns a copy of the file metadata with the ``create_datetime``
+    normalized by ``normalize_datetime``.
+    """
+    if 'create_datetime' not in attributes:
+        return attributes
+    return {
+        **attributes,
+        'create_datetime': normalize_datetime(attributes['create_datetime']),
+    }
+
+
+def format_text(attributes):
+    """
+    Returns the file metadata as human-readable ``key: value`` lines, with
+    the values as the backend sent them. Only the machine-readable formats
+    normalize the ``create_datetime``.
+    """
+    return '\n'.join(f'{key}: {value}' for key, value in attributes.items())
+
+
+class StatFormatter(object):
+    """
+    Formats the file metadata of a ``stat`` of many files, one record at a
+    time, so the output is written as the results arrive.
+    """
+
+    def header(self):
+        return b''
+
+    def record(self, uuid, attributes):
+        raise NotImplementedError
+
+
+class TextFormatter(StatFormatter):
+
+    def record(self, uuid, attributes):
+        return f'uuid: {uuid}\n{format_text(attributes)}\n\n'.encode()
+
+
+class NDJSONFormatter(StatFormatter):
+
+    def record(self, uuid, attributes):
+        return json.dumps(
+            {'uuid': uuid, **normalize_attributes(attributes)},
+            ensure_ascii=False,
+            separators=(',', ':'),
+        ).encode() + b'\n'
+
+
+class CSVFormatter(StatFormatter):
+    """
+    One row per file with the ``CSV_FIELDS`` columns, other keys are left
+    out.
+    """
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.DictWriter(
+            self.buffer, CSV_FIELDS, extrasaction='ignore',
+            lineterminator='\n')
+
+    def header(self):
+        self.writer.writeheader()
+        return self._take()
+
+    def record(self, uuid, attributes):
+        self.writer.writerow(
+            {'uuid': uuid, **normalize_attributes(attributes)})
+        return self._take()
+
+    def _take(self):
+        row = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return row
+
+
+FORMATTERS = {
+    TEXT: TextFormatter,
+    NDJSON: NDJSONFormatter,
+    CSV: CSVFormatter,
+}
+
+
+def get_formatter(output_format):
+    if output_format not in FORMATTERS:
+        raise ValueError(f'Unknown output format {output_format!r}')
+    return FORMATTERS[output_format]()
@@ -0,0 +1,119 @@
+import asyncio
+
+import grpc
+
+from ..async_client import AsyncClient
+from ..balancer import split_endpoints
+from ..client import ReadStream
+from .channel_pool import COMPRESSION_ALGORITHMS, channel_options
+from .grpc_client import RETRYABLE_STATUS_CODES, process_rpc_error
+from .service_file_pb2 import ReadRequest, StatRequest, Uuid
+from .service_file_pb2_grpc import FileStub
+
+
+class AsyncGRPCClient(AsyncClient):
+    """
+    ``GRPCClient`` on ``grpc.aio`` channels, one per server. All the calls
+    to a server are multiplexed as HTTP/2 streams over its channel. The
+    channels are bound to the event loop they are created in, so they are
+    created by ``open`` in the running one.
+    """
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.channel_options = channel_options(context)
+        self.grpc_compression = COMPRESSION_ALGORITHMS[
+            context.grpc_compression]
+        self.channels = []
+        self.balancer = None
+        self.call_options = {'wait_for_ready': context.grpc_wait_for_ready}
+
+    async def open(self):
+        self.channels = [
+            grpc.aio.insecure_channel(
+                target,
+                options=self.channel_options,
+                compression=self.grpc_compression,
+            )
+            for target in split_endpoints(self.grpc_server)
+        ]
+        self.balancer = self._create_balancer(
+            [FileStub(channel) for channel in self.channels])
+
+    async def aclose(self):
+        for channel in self.channels:
+            await channel.close()
+        self.channels = []
+
+    async def read_stream(self, uuid):
+        return ReadStream(self._iter_chunks(uuid))
+
+    async def stat(self, uuid):
+        """
+        Same as ``GRPCClient.stat``, the retries wait on the event loop.
+        """
+        retry = self.retry_policy.start()
+        tried = []
+        while True:
+            endpoint = self.balancer.acquire(tried)
+            try:
+                reply = await endpoint.target.stat(
+                    StatRequest(uuid=Uuid(value=uuid)),
+                    timeout=retry.remaining(self.read_timeout),
+                    **self.call_options
+                )
+                self.balancer.release(endpoint)
+                break
+            except grpc.RpcError as e:
+                retryable = e.code() in RETRYABLE_STATUS_CODES
+                self.balancer.release(endpoint, failed=retryable)
+                tried.append(endpoint)
+                delay = retry.next_delay(
+                    retryable, not self.balancer.has_untried(tried))
+                if delay is None:
+                    process_rpc_error(e)
+                await asyncio.sleep(delay)
+        return {
+            'create_datetime': reply.data.create_datetime.ToJsonString(),
+            'size': reply.data.size,
+            'mimetype': reply.data.mimetype,
+            'name': reply.data.name,
+        }
+
+    async def _iter_chunks(self, uuid):
+        """
+        Same as ``GRPCClient._iter_chunks``, retried until the first reply
+        only, with the deadline covering the whole stream, which is
+        cancelled if it is closed before its end.
+        """
+        request = ReadRequest(uuid=Uuid(value=uuid), size=self.chunk_size)
+        retry = self.retry_policy.start()
+        tried = []
+        started = False
+        while True:
+            endpoint = self.balancer.acquire(tried)
+            call = None
+            try:
+                call = endpoint.target.read(
+                    request, timeout=retry.remaining(), **self.call_options)
+                async for reply in call:
+                    started = True
+                    yield reply.data.data
+            except grpc.RpcError as e:
+                retryable = e.code() in RETRYABLE_STATUS_CODES
+                self.balancer.release(endpoint, failed=retryable)
+                tried.append(endpoint)
+                delay = None if started else retry.next_delay(
+                    retryable, not self.balancer.has_untried(tried))
+                if delay is None:
+                    process_rpc_error(e)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Also a stream closed before its end by the consumer.
+                if call is not None:
+                    call.cancel()
+                self.balancer.release(endpoint)
+                raise
+            self.balancer.release(endpoint)
+            return
@@ -0,0 +1,101 @@
+import collections
+import itertools
+import time
+
+import grpc
+
+from .service_file_pb2_grpc import FileStub
+
+
+COMPRESSION_ALGORITHMS = {
+    'none': grpc.Compression.NoCompression,
+    'deflate': grpc.Compression.Deflate,
+    'gzip': grpc.Compression.Gzip,
+}
+
+
+def channel_options(context):
+    """
+    Returns gRPC channel arguments for the tuning options in the context.
+    """
+    options = []
+    if context.grpc_keepalive_ms is not None:
+        options += [
+            ('grpc.keepalive_time_ms', context.grpc_keepalive_ms),
+            ('grpc.keepalive_permit_without_calls', 1),
+        ]
+    if context.grpc_max_message_size is not None:
+        options.append(
+            ('grpc.max_receive_message_length', context.grpc_max_message_size))
+    if not context.compression:
+        # The server compresses the replies only with the algorithms the
+        # client announces, keep just the one it sends with, if any.
+        algorithm = COMPRESSION_ALGORITHMS[context.grpc_compression]
+        options.append(('grpc.compression_enabled_algorithms_bitset',
+                        1 | 1 << int(algorithm)))
+    if context.grpc_initial_window is not None:
+        # The BDP probing would resize the window on its own.
+        options += [
+            ('grpc.http2.lookahead_bytes', context.grpc_initial_window),
+            ('grpc.http2.bdp_probe', 0),
+        ]
+    return options
+
+
+class ChannelPool(object):
+    """
+    A fixed number of gRPC channels to one server, each with a connection of
+    its own. Stubs are handed out round-robin, so the calls are spread over
+    several HTTP/2 connections instead of being capped by the concurrent
+    streams limit of a single one.
+    """
+
+    def __init__(self, target, size=1, options=(), compression=None):
+        if size > 1:
+            # Channels with the same arguments share their connections
+            # through the global subchannel pool otherwise.
+            options = [*options, ('grpc.use_local_subchannel_pool', 1)]
+        self.channels = [
+            grpc.insecure_channel(
+                target, options=options, compression=compression)
+            for _ in range(size)
+        ]
+        self.stubs = [FileStub(channel) for channel in self.channels]
+        self._counter = itertools.count()
+        self.connect_times = collections.deque()
+        for channel in self.channels:
+            channel.subscribe(
+                self._connectivity_watcher(), try_to_connect=False)
+
+    def _connectivity_watcher(self):
+        connecting_since = None
+
+        def watch(state):
+            nonlocal connecting_since
+            if state == grpc.ChannelConnectivity.CONNECTING:
+                connecting_since = time.perf_counter()
+            elif (
+                state == grpc.ChannelConnectivity.READY
+                and connecting_since is not None
+            ):
+                self.connect_times.append(
+                    time.perf_counter() - connecting_since)
+                connecting_since = None
+        return watch
+
+    def pop_connect_time(self):
+        """
+        Returns the time spent by connecting channels since the last call,
+        or ``None``.
+        """
+        connect_time = None
+        while self.connect_times:
+            connect_time = (connect_time or 0.0) + self.connect_times.popleft()
+        return connect_time
+
+    def next_stub(self):
+        return self.stubs[next(self._counter) % len(self.stubs)]
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
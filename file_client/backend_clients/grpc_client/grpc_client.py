@@ -1,16 +1,189 @@
-from ..client import Client
-from .service_file_pb2_grpc import FileStub
 import grpc
 
+from ..balancer import split_endpoints
+from ..client import Client, ReadStream, window_chunks
+from ..client_exceptions import (ClientException,
+                                 ClientExceptionFailedPrecondition,
+                                 ClientExceptionFileNotFound,
+                                 ClientExceptionInvalidArgument,
+                                 ClientExceptionUnavailable)
+from .channel_pool import COMPRESSION_ALGORITHMS, ChannelPool, channel_options
+from .service_file_pb2 import ReadRequest, StatRequest, Uuid
+
+# Status codes of failures which are worth retrying, the call either did not
+# reach the server or the server refused it before doing any work. An
+# attempt timed out on a stuck server is retried on another one as well,
+# while the deadline of the whole call leaves time for it.
+RETRYABLE_STATUS_CODES = frozenset([
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.ABORTED,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+])
+
+
+def process_rpc_error(exception):
+    """
+    Raises the ``ClientException`` matching the gRPC status code.
+    """
+    code = exception.code()
+    if code == grpc.StatusCode.INVALID_ARGUMENT:
+        raise ClientExceptionInvalidArgument(exception.details())
+    elif code == grpc.StatusCode.NOT_FOUND:
+        raise ClientExceptionFileNotFound()
+    elif code == grpc.StatusCode.FAILED_PRECONDITION:
+        raise ClientExceptionFailedPrecondition(exception.details())
+    elif code in (grpc.StatusCode.UNAVAILABLE,
+                  grpc.StatusCode.RESOURCE_EXHAUSTED,
+                  grpc.StatusCode.DEADLINE_EXCEEDED):
+        raise ClientExceptionUnavailable(exception.details())
+    else:
+        raise ClientException(exception.details())
+
 
 class GRPCClient(Client):
+    """
+    The ``grpc_server`` is a comma-separated list of servers, each gets a
+    pool of channels of its own. The calls are spread over the servers by
+    the balancer and fail over to another one when a server is unavailable.
+    """
 
     def __init__(self, context):
         super().__init__(context)
-        self.stub = FileStub(grpc.insecure_channel(self.grpc_server))
+        self.channel_pools = [
+            ChannelPool(
+                target,
+                size=context.grpc_channels,
+                options=channel_options(context),
+                compression=COMPRESSION_ALGORITHMS[context.grpc_compression],
+            )
+            for target in split_endpoints(self.grpc_server)
+        ]
+        self.balancer = self._create_balancer(self.channel_pools)
+        self.call_options = {'wait_for_ready': context.grpc_wait_for_ready}
+        self.read_timeout = context.read_timeout
+
+    def close(self):
+        super().close()
+        for channel_pool in self.channel_pools:
+            channel_pool.close()
 
     def read(self, uuid):
-        raise NotImplemented
+        stream = self.read_stream(uuid)
+        return (
+            b''.join(stream.chunks),
+            stream.content_disposition,
+            stream.content_type
+        )
+
+    def read_stream(self, uuid):
+        """
+        ``rpc read (ReadRequest) returns (stream ReadReply)``
+        =====================================================
+        Streams the file content in chunks of at most ``chunk_size`` bytes.
+        The reply carries no display name nor MIME type of the file, these
+        are available through ``stat`` only.
+        """
+        return ReadStream(self._iter_chunks(uuid))
+
+    def read_window_stream(self, uuid, offset=0, length=None):
+        """
+        The ``read`` stream has no offset, it is read from the start of the
+        file and cancelled as soon as the window is complete. A window
+        ending within the first chunk is asked for as a single reply.
+        """
+        end = None if offset < 0 or length is None else offset + length
+        if end is None or end >= self.chunk_size:
+            return super().read_window_stream(uuid, offset, length)
+        return ReadStream(window_chunks(
+            self._iter_chunks(uuid, max(1, end)), offset, length))
 
     def stat(self, uuid):
-        raise NotImplemented
+        """
+        ``rpc stat (StatRequest) returns (StatReply)``
+        ==============================================
+        Returns file metadata with the same keys as the REST backend. The
+        ``create_datetime`` is converted to an RFC 3339 string.
+
+        Each attempt times out after ``read_timeout`` seconds or at the
+        deadline, whichever comes first.
+        """
+        retry = self.retry_policy.start()
+        tried = []
+        while True:
+            endpoint = self.balancer.acquire(tried)
+            try:
+                reply = endpoint.target.next_stub().stat(
+                    StatRequest(uuid=Uuid(value=uuid)),
+                    timeout=retry.remaining(self.read_timeout),
+                    **self.call_options
+                )
+                self.balancer.release(endpoint)
+                break
+            except grpc.RpcError as e:
+                retryable = e.code() in RETRYABLE_STATUS_CODES
+                self.balancer.release(endpoint, failed=retryable)
+                tried.append(endpoint)
+                if not retry.backoff(
+                        retryable, not self.balancer.has_untried(tried)):
+                    self._process_rpc_error(e)
+                    raise
+                self._count_retry()
+        return {
+            'create_datetime': reply.data.create_datetime.ToJsonString(),
+            'size': reply.data.size,
+            'mimetype': reply.data.mimetype,
+            'name': reply.data.name,
+        }
+
+    def _pop_connect_time(self):
+        connect_times = [
+            connect_time for connect_time in (
+                channel_pool.pop_connect_time()
+                for channel_pool in self.channel_pools)
+            if connect_time is not None
+        ]
+        return sum(connect_times) if connect_times else None
+
+    def _iter_chunks(self, uuid, chunk_size=None):
+        """
+        The stream is retried only until its first reply, once some data
+        have been yielded a failure is final. The deadline, if any, covers
+        the whole stream, which is cancelled if it is closed before its end.
+        """
+        request = ReadRequest(uuid=Uuid(value=uuid),
+                              size=chunk_size or self.chunk_size)
+        retry = self.retry_policy.start()
+        tried = []
+        started = False
+        while True:
+            endpoint = self.balancer.acquire(tried)
+            call = None
+            try:
+                stub = endpoint.target.next_stub()
+                call = stub.read(request, timeout=retry.remaining(),
+                                 **self.call_options)
+                for reply in call:
+                    started = True
+                    yield reply.data.data
+            except grpc.RpcError as e:
+                retryable = e.code() in RETRYABLE_STATUS_CODES
+                self.balancer.release(endpoint, failed=retryable)
+                tried.append(endpoint)
+                if started or not retry.backoff(
+                        retryable, not self.balancer.has_untried(tried)):
+                    self._process_rpc_error(e)
+                    return
+                self._count_retry()
+                continue
+            except BaseException:
+                # Also a stream closed before its end by the consumer.
+                if call is not None:
+                    call.cancel()
+                self.balancer.release(endpoint)
+                raise
+            self.balancer.release(endpoint)
+            return
+
+    def _process_rpc_error(self, exception):
+        process_rpc_error(exception)
@@ -0,0 +1,71 @@
+import hashlib
+import queue
+import threading
+
+from .client_exceptions import ClientExceptionIntegrity
+
+
+DEFAULT_CHECKSUM_ALGORITHM = 'sha256'
+# Listed here, so the CLI does not have to import hashlib to offer them.
+CHECKSUM_ALGORITHMS = (
+    'blake2b', 'md5', 'sha1', 'sha256', 'sha3_256', 'sha512')
+
+
+class ChunkHasher(object):
+    """
+    Hashes the chunks of a stream on a worker thread while they are passed
+    on, so the hashing overlaps with the network and output I/O (hashlib
+    releases the GIL for larger chunks). At most ``queue_size`` chunks wait
+    to be hashed at a time.
+    """
+
+    def __init__(self, algorithm=DEFAULT_CHECKSUM_ALGORITHM, queue_size=64):
+        self.hash = hashlib.new(algorithm)
+        self.size = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def tee(self, chunks):
+        """
+        Yields the ``chunks`` and queues each of them for hashing.
+        """
+        try:
+            for chunk in chunks:
+                self._queue.put(chunk)
+                self.size += len(chunk)
+                yield chunk
+        finally:
+            self.close()
+
+    def hexdigest(self):
+        self.close()
+        return self.hash.hexdigest()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            self.hash.update(chunk)
+
+
+def check_integrity(uuid, size, expected_size, digest, expected_digest):
+    """
+    Raises ``ClientExceptionIntegrity`` if the number of bytes read differs
+    from the size reported by ``stat``, or the digest from the expected one.
+    """
+    if expected_size is not None and size != expected_size:
+        raise ClientExceptionIntegrity(
+            f'{uuid}: read {size} bytes, the file has {expected_size}.')
+    if (
+        expected_digest is not None
+        and digest.lower() != expected_digest.strip().lower()
+    ):
+        raise ClientExceptionIntegrity(
+            f'{uuid}: the checksum is {digest}, expected {expected_digest}.')
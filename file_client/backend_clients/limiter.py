@@ -0,0 +1,91 @@
+import threading
+import time
+
+from .client_exceptions import (ClientExceptionFailedPrecondition,
+                                ClientExceptionUnavailable)
+
+
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MAX_LIMIT = 128
+DEFAULT_LATENCY_TOLERANCE = 1.5
+DEFAULT_BACKOFF_RATIO = 0.5
+# The weight of a new sample in the smoothed latency.
+LATENCY_SMOOTHING = 0.1
+# How fast the baseline latency follows a lasting rise, so a server that
+# became slower for good does not stop the growth forever.
+BASELINE_DRIFT = 0.01
+
+
+def is_overload(exception):
+    """
+    Returns whether the ``exception`` of a call tells the backend is
+    overloaded: its database failed (``FAILED_PRECONDITION``) or it is
+    unavailable (``UNAVAILABLE``, ``RESOURCE_EXHAUSTED``, HTTP 429 or 503,
+    timeouts) even after retrying.
+    """
+    return isinstance(
+        exception,
+        (ClientExceptionFailedPrecondition, ClientExceptionUnavailable))
+
+
+class AdaptiveLimiter(object):
+    """
+    An AIMD limit of the calls in flight of a batch. The limit starts at
+    ``initial_limit`` and doubles every round trip while the smoothed
+    latency stays within ``latency_tolerance`` times the lowest one seen,
+    then it grows by one per round trip only. It is cut by the
+    ``backoff_ratio`` when a call fails on an overloaded backend, at most
+    once per round trip, as the calls started before the cut fail the same
+    way. A rising latency stops the growth.
+    """
+
+    def __init__(self, initial_limit=DEFAULT_INITIAL_LIMIT,
+                 max_limit=DEFAULT_MAX_LIMIT,
+                 latency_tolerance=DEFAULT_LATENCY_TOLERANCE,
+                 backoff_ratio=DEFAULT_BACKOFF_RATIO):
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.peak = self._limit = float(min(initial_limit, max_limit))
+        self.slow_start = True
+        self.baseline = None
+        self.smoothed = None
+        self._backed_off_at = float('-inf')
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self):
+        return max(1, int(self._limit))
+
+    def record(self, started, latency, overloaded=False):
+        """
+        Adjusts the limit by a call finished after ``latency`` seconds,
+        which was ``started`` at the ``time.monotonic()`` given.
+        """
+        with self._lock:
+            if overloaded:
+                if started >= self._backed_off_at:
+                    self._backed_off_at = time.monotonic()
+                    self._limit = max(1.0, self._limit * self.backoff_ratio)
+                    self.slow_start = False
+                return
+            self._sample(latency)
+            if self.smoothed > self.baseline * self.latency_tolerance:
+                self.slow_start = False
+                return
+            if self.slow_start:
+                self._limit += 1
+            else:
+                self._limit += 1 / self._limit
+            self._limit = min(self._limit, float(self.max_limit))
+            self.peak = max(self.peak, self._limit)
+
+    def _sample(self, latency):
+        if self.baseline is None:
+            self.baseline = self.smoothed = latency
+            return
+        self.smoothed += (latency - self.smoothed) * LATENCY_SMOOTHING
+        if latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += (self.smoothed - self.baseline) * BASELINE_DRIFT
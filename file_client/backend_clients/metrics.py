@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+
+
+class CallMetrics(object):
+    """
+    Measurements of a single backend call, all the times are in seconds.
+
+    * ``connect`` - opening new connections (DNS, TCP and TLS) made for the
+      call, ``None`` if an existing connection was reused
+    * ``time_to_first_byte`` - from the start until the first content chunk
+    * ``total`` - from the start until the whole reply was consumed
+    * ``backend_wait`` - the part of ``total`` spent waiting on the backend,
+      the rest was spent by the caller, e.g. writing the output
+
+    The ``strategy`` is the transfer strategy of a read, if it was planned.
+    """
+
+    def __init__(self, operation, backend, uuid):
+        self.operation = operation
+        self.backend = backend
+        self.uuid = uuid
+        self.started = time.perf_counter()
+        self.connect = None
+        self.time_to_first_byte = None
+        self.total = None
+        self.backend_wait = 0.0
+        self.bytes = 0
+        self.chunks = 0
+        self.retries = 0
+        self.error = None
+        self.strategy = None
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class Histogram(object):
+    """
+    Histogram of durations in exponential buckets, from 0.1 ms doubling up
+    to about 30 minutes. Percentiles are estimated by bucket upper bounds,
+    so memory stays constant however many values are added.
+    """
+    BOUNDS_MS = [0.1 * 2 ** exponent for exponent in range(25)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds):
+        milliseconds = seconds * 1000
+        index = 0
+        while (
+            index < len(self.BOUNDS_MS)
+            and milliseconds > self.BOUNDS_MS[index]
+        ):
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += milliseconds
+        self.min = milliseconds if self.min is None else min(
+            self.min, milliseconds)
+        self.max = milliseconds if self.max is None else max(
+            self.max, milliseconds)
+
+    def percentile(self, fraction):
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index == len(self.BOUNDS_MS):
+                    return self.max
+                return min(self.BOUNDS_MS[index], self.max)
+        return self.max
+
+    def as_dict(self):
+        buckets = {}
+        for index, count in enumerate(self.counts):
+            if count:
+                bound = (
+                    f'<={self.BOUNDS_MS[index]:g}'
+                    if index < len(self.BOUNDS_MS) else 'inf'
+                )
+                buckets[bound] = count
+        return {
+            'count': self.count,
+            'min_ms': self.min,
+            'max_ms': self.max,
+            'mean_ms': self.sum / self.count if self.count else None,
+            'p50_ms': self.percentile(0.5),
+            'p90_ms': self.percentile(0.9),
+            'p99_ms': self.percentile(0.99),
+            'buckets_ms': buckets,
+        }
+
+
+class MetricsRecorder(object):
+    """
+    A client hook aggregating the ``CallMetrics`` per operation into counters
+    and histograms. It is thread-safe.
+    """
+    TIMES = ('connect', 'time_to_first_byte', 'total', 'backend_wait')
+    COUNTERS = ('bytes', 'chunks', 'retries')
+
+    def __init__(self):
+        self.operations = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, metrics):
+        with self._lock:
+            operation = self.operations.setdefault(metrics.operation, {
+                'calls': 0,
+                'errors': 0,
+                **{counter: 0 for counter in self.COUNTERS},
+                **{name: Histogram() for name in self.TIMES},
+            })
+            operation['calls'] += 1
+            operation['errors'] += metrics.error is not None
+            for counter in self.COUNTERS:
+                operation[counter] += getattr(metrics, counter)
+            if metrics.strategy is not None:
+                strategies = operation.setdefault('strategies', {})
+                strategies[metrics.strategy] = (
+                    strategies.get(metrics.strategy, 0) + 1)
+            for name in self.TIMES:
+                value = getattr(metrics, name)
+                if value is not None:
+                    operation[name].add(value)
+
+    def summary(self):
+        with self._lock:
+            return {
+                name: {
+                    key: value.as_dict() if isinstance(value, Histogram)
+                    else value
+                    for key, value in operation.items()
+                }
+                for name, operation in self.operations.items()
+            }
+
+    def write_json(self, file):
+        json.dump({'operations': self.summary()}, file, indent=2)
+        file.write('\n')
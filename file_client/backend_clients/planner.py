@@ -0,0 +1,77 @@
+AUTO = 'auto'
+STREAM = 'stream'
+BUFFERED = 'buffered'
+RANGES = 'ranges'
+CACHED = 'cached'
+# The strategies to choose from, the cached one is chosen by the planner.
+TRANSFER_STRATEGIES = (AUTO, STREAM, BUFFERED, RANGES)
+DEFAULT_BUFFERED_MAX_SIZE = 256 * 1024
+DEFAULT_RANGES_MIN_SIZE = 64 * 1024 * 1024
+DEFAULT_RANGE_CONNECTIONS = 4
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/javascript', 'application/xml',
+    'application/x-ndjson', 'image/svg+xml')
+
+
+def is_compressible(mimetype):
+    """
+    Returns whether content of the ``mimetype`` is text, which compresses
+    well in transfer.
+    """
+    if not mimetype:
+        return False
+    mimetype = mimetype.split(';')[0].strip().lower()
+    return (
+        mimetype.startswith('text/')
+        or mimetype in COMPRESSIBLE_MIMETYPES
+        or mimetype.endswith(('+json', '+xml'))
+    )
+
+
+class TransferPlanner(object):
+    """
+    Chooses how to read a file, by its ``stat`` metadata, unless the
+    ``strategy`` is given:
+
+    * ``cached`` - a copy in the content cache, revalidated with the backend
+    * ``buffered`` - files of at most ``buffered_max_size`` bytes in a
+      single request read at once
+    * ``ranges`` - files of at least ``ranges_min_size`` bytes over several
+      connections as byte ranges, written in place into the output file
+    * ``stream`` - the content streamed in chunks over one connection
+    """
+
+    def __init__(self, strategy=STREAM,
+                 buffered_max_size=DEFAULT_BUFFERED_MAX_SIZE,
+                 ranges_min_size=DEFAULT_RANGES_MIN_SIZE):
+        if strategy not in TRANSFER_STRATEGIES:
+            raise ValueError(f'Unknown transfer strategy {strategy!r}')
+        self.strategy = strategy
+        self.buffered_max_size = buffered_max_size
+        self.ranges_min_size = ranges_min_size
+
+    def choose(self, attributes, cached=False, ranges=False,
+               compression=False):
+        """
+        Returns the strategy for a file with the ``attributes``. ``cached``
+        tells there is a cached copy and ``ranges`` whether they can be
+        used at all. Ranges are not compressed in transfer, so text is
+        streamed compressed instead while ``compression`` is on.
+        """
+        if self.strategy != AUTO:
+            return self.strategy
+        if cached:
+            return CACHED
+        size = attributes.get('size')
+        if size is None:
+            return STREAM
+        if size <= self.buffered_max_size:
+            return BUFFERED
+        if (
+            ranges
+            and size >= self.ranges_min_size
+            and not (compression
+                     and is_compressible(attributes.get('mimetype')))
+        ):
+            return RANGES
+        return STREAM
@@ -0,0 +1,141 @@
+import asyncio
+
+from ..async_client import AsyncClient
+from ..balancer import split_endpoints
+from ..client import ReadStream
+from ..client_exceptions import (ClientException, ClientExceptionFileNotFound,
+                                 ClientExceptionInvalidURL,
+                                 ClientExceptionUnavailable)
+from .rest_client import RETRYABLE_STATUS_CODES, sanitize_url
+
+
+class AsyncRESTClient(AsyncClient):
+    """
+    ``RESTClient`` on an ``httpx.AsyncClient``, which multiplexes requests
+    over HTTP/2 when the server supports it. Requires the optional ``httpx``
+    dependency, ``pip install 'file-client[async]'``.
+    """
+
+    def __init__(self, context):
+        super().__init__(context)
+        try:
+            import httpx
+        except ImportError:
+            raise ClientException(
+                'The asyncio REST backend requires the httpx package.')
+        self.httpx = httpx
+        self.balancer = self._create_balancer(split_endpoints(self.base_url))
+        options = {
+            'limits': httpx.Limits(
+                max_connections=context.http_pool_size,
+                max_keepalive_connections=(
+                    context.http_pool_size if context.keep_alive else 0)),
+            'timeout': httpx.Timeout(
+                context.read_timeout, connect=context.connect_timeout),
+        }
+        if not context.compression:
+            # httpx offers all the content codings it can decode otherwise.
+            options['headers'] = {'Accept-Encoding': 'identity'}
+        try:
+            self.http = httpx.AsyncClient(http2=True, **options)
+        except ImportError:
+            # The h2 package providing HTTP/2 support is not installed.
+            self.http = httpx.AsyncClient(**options)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def read_stream(self, uuid):
+        try:
+            response = await self._get(f'file/{uuid}/read/', stream=True)
+        except self.httpx.HTTPError as e:
+            self._process_http_error(e)
+        return ReadStream(
+            self._iter_chunks(response),
+            response.headers.get('Content-Disposition'),
+            response.headers.get('Content-Type')
+        )
+
+    async def stat(self, uuid):
+        try:
+            response = await self._get(f'file/{uuid}/stat/')
+            return response.json()
+        except ValueError:
+            raise ClientException('The file returned is not a valid JSON.')
+        except self.httpx.HTTPError as e:
+            self._process_http_error(e)
+
+    async def _get(self, path, stream=False):
+        """
+        Same as ``RESTClient._get``, the retries wait on the event loop.
+        """
+        retry = self.retry_policy.start()
+        tried = []
+        while True:
+            endpoint = self.balancer.acquire(tried)
+            response = None
+            try:
+                request = self.http.build_request(
+                    'GET', sanitize_url(endpoint.target, path),
+                    timeout=self.httpx.Timeout(
+                        retry.remaining(self.read_timeout),
+                        connect=retry.remaining(self.connect_timeout)))
+                response = await self.http.send(request, stream=stream)
+                response.raise_for_status()
+            except self.httpx.HTTPError as e:
+                if response is not None:
+                    await response.aclose()
+                retryable = self._is_retryable(e)
+                self.balancer.release(endpoint, failed=retryable)
+                tried.append(endpoint)
+                delay = retry.next_delay(
+                    retryable, not self.balancer.has_untried(tried))
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            if stream:
+                response.endpoint = endpoint
+            else:
+                self.balancer.release(endpoint)
+            return response
+
+    async def _iter_chunks(self, response):
+        failed = False
+        try:
+            async for chunk in response.aiter_bytes(self.chunk_size):
+                yield chunk
+        except self.httpx.HTTPError as e:
+            failed = self._is_retryable(e)
+            self._process_http_error(e)
+        finally:
+            await self._close_response(response, failed)
+
+    async def _close_response(self, response, failed=False):
+        """
+        Same as ``RESTClient._close_response``.
+        """
+        await response.aclose()
+        endpoint = getattr(response, 'endpoint', None)
+        if endpoint is not None:
+            response.endpoint = None
+            self.balancer.release(endpoint, failed=failed)
+
+    def _is_retryable(self, exception):
+        if isinstance(exception, self.httpx.HTTPStatusError):
+            return exception.response.status_code in RETRYABLE_STATUS_CODES
+        return (isinstance(exception, self.httpx.TransportError)
+                and not isinstance(exception, self.httpx.UnsupportedProtocol))
+
+    def _process_http_error(self, exception):
+        if isinstance(exception, self.httpx.UnsupportedProtocol):
+            raise ClientExceptionInvalidURL(exception)
+        elif self._is_retryable(exception):
+            raise ClientExceptionUnavailable(exception)
+        elif (
+            isinstance(exception, self.httpx.HTTPStatusError)
+            and exception.response.status_code == 404
+        ):
+            raise ClientExceptionFileNotFound()
+        else:
+            raise ClientException(exception)
@@ -1,13 +1,112 @@
+import json
+import os
+import threading
+import time
 from urllib.parse import quote, urljoin
 
 import requests
+import urllib3.response
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
-from ..client import Client
+from ..balancer import split_endpoints
+from ..batch import run_batch
+from ..client import DEFAULT_RANGE_SIZE, Client, ReadStream, window_chunks
 from ..client_exceptions import (ClientException, ClientExceptionFileNotFound,
-                                 ClientExceptionInvalidURL)
+                                 ClientExceptionInvalidURL,
+                                 ClientExceptionUnavailable)
+from ..planner import RANGES
+from ..sink import preallocate, write_at
+
+# HTTP codes of overloaded or unreachable upstream servers, worth retrying.
+RETRYABLE_STATUS_CODES = frozenset([429, 502, 503, 504])
+
+
+def sanitize_url(base_url, path):
+    return quote(urljoin(base_url, path), safe="/:@")
+
+
+def accept_encoding():
+    """
+    Returns the ``Accept-Encoding`` of the content codings urllib3 decodes
+    on the fly, zstd and br need the optional zstandard and brotli packages.
+    """
+    codings = []
+    if getattr(urllib3.response, 'HAS_ZSTD', False):
+        codings.append('zstd')
+    if getattr(urllib3.response, 'brotli', None) is not None:
+        codings.append('br')
+    return ', '.join(codings + ['gzip', 'deflate'])
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    ``HTTPAdapter`` recording the time spent opening new connections (DNS,
+    TCP and TLS) per thread.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.connect_times = threading.local()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        connect_times = self.connect_times
+
+        def timed(connection_class):
+            def connect(connection):
+                started = time.perf_counter()
+                try:
+                    connection_class.connect(connection)
+                finally:
+                    connect_times.value = (
+                        (getattr(connect_times, 'value', None) or 0.0)
+                        + time.perf_counter() - started
+                    )
+            return type(connection_class.__name__, (connection_class, ),
+                        {'connect': connect})
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('HTTPConnectionPool', (HTTPConnectionPool, ), {
+                'ConnectionCls': timed(HTTPConnection)}),
+            'https': type('HTTPSConnectionPool', (HTTPSConnectionPool, ), {
+                'ConnectionCls': timed(HTTPSConnection)}),
+        }
+
+    def pop_connect_time(self):
+        connect_time = getattr(self.connect_times, 'value', None)
+        self.connect_times.value = None
+        return connect_time
 
 
 class RESTClient(Client):
+    """
+    All the requests of a client go through one ``requests.Session``, so
+    the connections (and their TLS sessions) are kept alive and reused.
+
+    The ``base_url`` is a comma-separated list of servers, the requests are
+    spread over them by the balancer and fail over to another one when a
+    server is unavailable.
+    """
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.timeout = (context.connect_timeout, context.read_timeout)
+        self.session = requests.Session()
+        self.adapter = TimedHTTPAdapter(pool_maxsize=context.http_pool_size)
+        self.balancer = self._create_balancer(split_endpoints(self.base_url))
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        if not context.keep_alive:
+            self.session.headers['Connection'] = 'close'
+        # The content is decoded while it is streamed, chunk by chunk.
+        self.session.headers['Accept-Encoding'] = (
+            accept_encoding() if context.compression else 'identity')
+
+    def close(self):
+        super().close()
+        self.session.close()
 
     def read(self, uuid):
         """
@@ -21,10 +120,7 @@ class RESTClient(Client):
         If a file is not found, HTTP code 404 is returned.
         """
         try:
-            with requests.get(
-                self._sanitize_url(self.base_url, f'file/{uuid}/read/')
-            ) as response:
-                response.raise_for_status()
+            with self._get(f'file/{uuid}/read/') as response:
                 return (
                     response.content,
                     response.headers.get('Content-Disposition'),
@@ -33,6 +129,123 @@ class RESTClient(Client):
         except (requests.exceptions.RequestException) as e:
             self._process_http_error(e)
 
+    def read_stream(self, uuid):
+        """
+        Same as ``read``, but the response body is not loaded into memory.
+        It is downloaded lazily in chunks of at most ``chunk_size`` bytes
+        while the returned ``chunks`` iterator is being consumed.
+        """
+        return self._stream_response(self._get_read_response(uuid))
+
+    def read_window_stream(self, uuid, offset=0, length=None):
+        """
+        Asks for the window only with a ``Range`` request, a negative
+        ``offset`` as a suffix range. A server ignoring the range answers
+        with HTTP code 200 and the whole content, the bytes before the
+        window are then skipped and the response closed once it is
+        complete. An ``offset`` past the end of the file reads nothing.
+        """
+        if length == 0:
+            return ReadStream(iter(()))
+        if offset < 0:
+            byte_range = f'bytes={offset}'
+        elif length is None:
+            byte_range = f'bytes={offset}-'
+        else:
+            byte_range = f'bytes={offset}-{offset + length - 1}'
+        try:
+            # The offsets refer to the stored bytes, so no content encoding.
+            response = self._get(f'file/{uuid}/read/', {
+                'Range': byte_range,
+                'Accept-Encoding': 'identity',
+            }, stream=True)
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code != 416:
+                self._process_http_error(e)
+            return ReadStream(iter(()))
+        except (requests.exceptions.RequestException) as e:
+            self._process_http_error(e)
+        stream = self._stream_response(response)
+        if response.status_code == 206:
+            offset = 0
+        elif offset < 0:
+            size = response.headers.get('Content-Length')
+            size = int(size) if size else self.cached_stat(uuid)['size']
+            offset = max(0, size + offset)
+        return stream._replace(
+            chunks=window_chunks(stream.chunks, offset, length))
+
+    def read_stream_if_modified(self, uuid, validators=None):
+        """
+        Revalidates a cached copy with a conditional request using its
+        ``ETag`` and ``Last-Modified`` validators, the server answers with
+        HTTP code 304 and no body if the content has not changed.
+        """
+        headers = {}
+        if validators and validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators and validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        response = self._get_read_response(uuid, headers)
+        if response.status_code == 304:
+            self._close_response(response)
+            return None, validators
+        return self._stream_response(response), {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+
+    def read_ranges_to_file(self, uuid, path, connections=1,
+                            range_size=DEFAULT_RANGE_SIZE, size=None):
+        """
+        Downloads the file in ``range_size`` byte ranges fetched by up to
+        ``connections`` concurrent ``Range`` requests, each written in place
+        at its offset of a ``<path>.part`` file preallocated to the ``size``,
+        which is taken from ``stat`` unless it is given.
+
+        Finished ranges are recorded in a ``<path>.part.ranges`` journal, so
+        a failed download run again with the same ``path`` only fetches the
+        missing ranges. The ``.part`` file is renamed to ``path`` when all
+        the ranges are there.
+        """
+        if size is None:
+            size = self.cached_stat(uuid).get('size')
+        if not size:
+            return self.read_to_file(uuid, path)
+        part_path = f'{path}.part'
+        journal_path = f'{part_path}.ranges'
+        done = self._load_range_journal(journal_path, part_path, size,
+                                        range_size)
+        missing = [
+            (start, min(start + range_size, size) - 1)
+            for start in range(0, size, range_size)
+            if start not in done
+        ]
+        journal_lock = threading.Lock()
+        fd = os.open(part_path, os.O_WRONLY | os.O_CREAT, 0o666)
+        try:
+            preallocate(fd, size)
+
+            def fetch(byte_range):
+                self._fetch_range(uuid, fd, *byte_range)
+                with journal_lock:
+                    done.add(byte_range[0])
+                    self._save_range_journal(journal_path, size, range_size,
+                                             done)
+
+            errors = [
+                exception for _, _, exception in run_batch(
+                    fetch, missing, connections)
+                if exception is not None
+            ]
+        finally:
+            os.close(fd)
+        if errors:
+            raise errors[0]
+        os.replace(part_path, path)
+        os.remove(journal_path)
+        return path
+
     def stat(self, uuid):
         """
         ``file/<uuid>/stat/``
@@ -49,19 +262,154 @@ class RESTClient(Client):
         If a file is not found, HTTP code 404 is returned.
         """
         try:
-            with requests.get(
-                self._sanitize_url(self.base_url, f'file/{uuid}/stat/')
-            ) as response:
-                response.raise_for_status()
+            with self._get(f'file/{uuid}/stat/') as response:
                 return response.json()
         except requests.exceptions.JSONDecodeError:
             raise ClientException('The file returned is not a valid JSON.')
         except (requests.exceptions.RequestException) as e:
             self._process_http_error(e)
 
+    def _fetch_range(self, uuid, fd, start, end):
+        with self._measure('read_range', uuid) as metrics:
+            metrics.strategy = RANGES
+            # The offsets refer to the stored bytes, so no content encoding.
+            response = self._get_read_response(uuid, {
+                'Range': f'bytes={start}-{end}',
+                'Accept-Encoding': 'identity',
+            })
+            if response.status_code != 206:
+                self._close_response(response)
+                raise ClientException(
+                    'The server does not support range requests.')
+            offset = start
+            for chunk in self._iter_chunks(response):
+                if metrics.time_to_first_byte is None:
+                    metrics.time_to_first_byte = (
+                        time.perf_counter() - metrics.started)
+                offset = write_at(fd, chunk, offset)
+                metrics.chunks += 1
+            metrics.bytes = offset - start
+        if offset != end + 1:
+            raise ClientException(
+                f'Incomplete range {start}-{end}, got {offset - start} bytes.')
+
+    def _load_range_journal(self, journal_path, part_path, size,
+                            range_size):
+        try:
+            with open(journal_path, 'rt') as file:
+                journal = json.load(file)
+            if (
+                journal['size'] == size
+                and journal['range_size'] == range_size
+                and os.path.getsize(part_path) == size
+            ):
+                return set(journal['done'])
+        except (OSError, ValueError, KeyError):
+            pass
+        return set()
+
+    def _save_range_journal(self, journal_path, size, range_size, done):
+        with open(f'{journal_path}.tmp', 'wt') as file:
+            json.dump({
+                'size': size,
+                'range_size': range_size,
+                'done': sorted(done),
+            }, file)
+        os.replace(f'{journal_path}.tmp', journal_path)
+
+    def _pop_connect_time(self):
+        return self.adapter.pop_connect_time()
+
+    def _get(self, path, headers=None, stream=False):
+        """
+        Sends a ``GET`` request to the ``path`` of a server. Connection
+        errors, timeouts and HTTP codes 429, 502, 503 and 504 are retried
+        on another server right away, or with a jittered backoff if there
+        is none left. Each attempt times out at the deadline at the latest.
+
+        A ``stream`` response holds its server as outstanding until it is
+        closed by ``_close_response``.
+        """
+        retry = self.retry_policy.start()
+        tried = []
+        while True:
+            endpoint = self.balancer.acquire(tried)
+            try:
+                response = self.session.get(
+                    self._sanitize_url(endpoint.target, path),
+                    headers=headers,
+                    stream=stream,
+                    timeout=tuple(
+                        retry.remaining(timeout) for timeout in self.timeout)
+                )
+                response.raise_for_status()
+                if stream:
+                    response.endpoint = endpoint
+                else:
+                    self.balancer.release(endpoint)
+                return response
+            except (requests.exceptions.RequestException) as e:
+                if e.response is not None:
+                    e.response.close()
+                retryable = self._is_retryable(e)
+                self.balancer.release(endpoint, failed=retryable)
+                tried.append(endpoint)
+                if not retry.backoff(
+                        retryable, not self.balancer.has_untried(tried)):
+                    raise
+                self._count_retry()
+
+    def _get_read_response(self, uuid, headers=None):
+        try:
+            return self._get(f'file/{uuid}/read/', headers, stream=True)
+        except (requests.exceptions.RequestException) as e:
+            self._process_http_error(e)
+
+    def _stream_response(self, response):
+        return ReadStream(
+            self._iter_chunks(response),
+            response.headers.get('Content-Disposition'),
+            response.headers.get('Content-Type')
+        )
+
+    def _iter_chunks(self, response):
+        failed = False
+        try:
+            yield from response.iter_content(self.chunk_size)
+        except (requests.exceptions.RequestException) as e:
+            failed = self._is_retryable(e)
+            self._process_http_error(e)
+        finally:
+            self._close_response(response, failed)
+
+    def _close_response(self, response, failed=False):
+        """
+        Closes a streamed response and gives its server back to the
+        balancer, ``failed`` if the body was cut off.
+        """
+        response.close()
+        endpoint = getattr(response, 'endpoint', None)
+        if endpoint is not None:
+            response.endpoint = None
+            self.balancer.release(endpoint, failed=failed)
+
+    def _is_retryable(self, exception):
+        if isinstance(exception, requests.exceptions.HTTPError):
+            return exception.response.status_code in RETRYABLE_STATUS_CODES
+        elif isinstance(exception, requests.exceptions.SSLError):
+            return False
+        return isinstance(exception, (requests.exceptions.ConnectionError,
+                                      requests.exceptions.Timeout))
+
     def _process_http_error(self, exception):
         if isinstance(exception, requests.exceptions.MissingSchema):
             raise ClientExceptionInvalidURL(exception)
+        elif isinstance(exception, (requests.exceptions.ConnectionError,
+                                    requests.exceptions.Timeout)) or (
+            isinstance(exception, requests.exceptions.HTTPError)
+            and exception.response.status_code in RETRYABLE_STATUS_CODES
+        ):
+            raise ClientExceptionUnavailable(exception)
         elif (
             isinstance(exception, requests.exceptions.HTTPError)
             and exception.response.status_code == 404
@@ -71,4 +419,4 @@ class RESTClient(Client):
             raise ClientException(exception)
 
     def _sanitize_url(self, base_url, path):
-        return quote(urljoin(base_url, path), safe="/:@")
+        return sanitize_url(base_url, path)
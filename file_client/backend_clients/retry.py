@@ -0,0 +1,142 @@
+import collections
+import random
+import threading
+import time
+
+
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 0.1
+MAX_RETRY_BACKOFF = 5.0
+HEDGE_MIN_SAMPLES = 20
+HEDGE_PERCENTILE = 0.95
+
+
+class RetryPolicy(object):
+    """
+    Retries of failed calls with a full jitter exponential backoff. The
+    ``deadline`` in seconds limits a whole call including its retries.
+    """
+
+    def __init__(self, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_RETRY_BACKOFF, deadline=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.deadline = deadline
+
+    def start(self):
+        """
+        Returns the retry state of a new call.
+        """
+        return RetryState(self)
+
+
+class RetryState(object):
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.attempt = 0
+        self.deadline = None
+        if policy.deadline is not None:
+            self.deadline = time.monotonic() + policy.deadline
+
+    def remaining(self, timeout=None):
+        """
+        Returns the ``timeout`` cut to the time left until the deadline.
+        """
+        if self.deadline is None:
+            return timeout
+        remaining = max(self.deadline - time.monotonic(), 0.001)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def backoff(self, retryable, wait=True):
+        """
+        Sleeps before another attempt and returns ``True``, or returns
+        ``False`` if the failure is not ``retryable``, the retries are used
+        up or the deadline would pass before another attempt. A failover to
+        another server does not ``wait`` and does not use up a retry, only
+        the deadline limits it.
+        """
+        delay = self.next_delay(retryable, wait)
+        if delay is None:
+            return False
+        if delay:
+            time.sleep(delay)
+        return True
+
+    def next_delay(self, retryable, wait=True):
+        """
+        Same as ``backoff``, but returns the seconds to sleep before another
+        attempt instead, or ``None`` if there is none, for the callers which
+        cannot block, e.g. on an event loop.
+        """
+        if not retryable:
+            return None
+        delay = 0.0
+        if wait:
+            if self.attempt >= self.policy.retries:
+                return None
+            delay = random.uniform(0, min(
+                MAX_RETRY_BACKOFF, self.policy.backoff * 2 ** self.attempt))
+        if (
+            self.deadline is not None
+            and time.monotonic() + delay >= self.deadline
+        ):
+            return None
+        if wait:
+            self.attempt += 1
+        return delay
+
+
+class Hedger(object):
+    """
+    Runs idempotent calls on a thread pool. If a call has not finished after
+    the hedging delay, the same call is started once more and the first
+    successful result wins. The delay is either fixed, or the 95th
+    percentile of the recent call latencies once there are enough of them.
+    """
+
+    def __init__(self, delay=None, workers=32):
+        self.fixed_delay = delay
+        self.workers = workers
+        self.latencies = collections.deque(maxlen=1000)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def delay(self):
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        latencies = list(self.latencies)
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return sorted(latencies)[int(len(latencies) * HEDGE_PERCENTILE)]
+
+    def call(self, function, *args):
+        # Imported on use, like in run_batch, hedging is off by default.
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        started = time.monotonic()
+        futures = [self._get_executor().submit(function, *args)]
+        done, _ = wait(futures, timeout=self.delay())
+        if not done:
+            futures.append(self._get_executor().submit(function, *args))
+        while True:
+            done, pending = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.latencies.append(time.monotonic() - started)
+                    return future.result()
+            if not pending:
+                raise done.pop().exception()
+            futures = list(pending)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers)
+            return self._executor
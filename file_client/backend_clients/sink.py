@@ -0,0 +1,136 @@
+import errno
+import os
+import sys
+from contextlib import contextmanager
+
+
+DEFAULT_WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class BinarySink(object):
+    """
+    Writes bytes-like objects (``bytes``, ``bytearray``, ``memoryview``) to
+    a binary file unchanged. Small writes are gathered into a buffer of
+    ``buffer_size`` bytes, so the file gets few large writes, while larger
+    ones are handed over to the file as they are, without a copy.
+    """
+
+    def __init__(self, file, buffer_size=DEFAULT_WRITE_BUFFER_SIZE):
+        self.file = file
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.bytes_written = 0
+
+    def write(self, data):
+        view = memoryview(data).cast('B')
+        if len(self.buffer) + len(view) > self.buffer_size:
+            self._flush_buffer()
+        if len(view) >= self.buffer_size:
+            self._write_all(view)
+        else:
+            self.buffer += view
+        self.bytes_written += len(view)
+        return len(view)
+
+    def flush(self):
+        self._flush_buffer()
+        self.file.flush()
+
+    def _flush_buffer(self):
+        if self.buffer:
+            self._write_all(self.buffer)
+            self.buffer = bytearray()
+
+    def _write_all(self, data):
+        view = memoryview(data)
+        while view:
+            written = self.file.write(view)
+            if written is None or written >= len(view):
+                return
+            view = view[written:]
+
+
+@contextmanager
+def open_sink(output, buffer_size=DEFAULT_WRITE_BUFFER_SIZE):
+    """
+    Opens a ``BinarySink`` on the ``output``, which is either ``-`` for the
+    stdout, a file object opened by click or a path. Text file objects are
+    written through their underlying binary buffer, so nothing is encoded
+    nor decoded on the way.
+    """
+    with _open_binary_file(output) as file:
+        sink = BinarySink(file, buffer_size)
+        try:
+            yield sink
+        finally:
+            sink.flush()
+
+
+@contextmanager
+def _open_binary_file(output):
+    if output == '-':
+        sys.stdout.flush()
+        yield sys.stdout.buffer
+    elif hasattr(output, 'write'):
+        # click has already opened the file (or stdout) for us.
+        output.flush()
+        yield getattr(output, 'buffer', output)
+    else:
+        # The sink does the buffering, so the file needs none.
+        with open(output, 'wb', buffering=0) as file:
+            yield file
+
+
+def preallocate(fd, size):
+    """
+    Sets the size of the file to ``size`` bytes and reserves the disk space
+    for them at once with ``posix_fallocate``, so the file is laid out in
+    few extents and a full disk fails the transfer before it starts. File
+    systems and platforms without it only get the size set.
+    """
+    os.ftruncate(fd, size)
+    if size <= 0 or not hasattr(os, 'posix_fallocate'):
+        return
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except OSError as e:
+        if e.errno not in (errno.EINVAL, errno.EOPNOTSUPP, errno.ENOSYS):
+            raise
+
+
+def write_at(fd, data, offset):
+    """
+    Writes all of the ``data`` at the ``offset`` of the file with
+    ``os.pwrite``, which is safe from concurrent threads. Returns the
+    offset after the data.
+    """
+    view = memoryview(data).cast('B')
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+    return offset
+
+
+@contextmanager
+def atomic_output_file(path, size=None):
+    """
+    Yields the file descriptor of a new ``<path>.part`` file, preallocated
+    to the ``size`` if it is known, to be filled by ``write_at``. The file
+    is renamed to ``path`` when the block completes and removed if it
+    fails, so ``path`` never holds a partial file.
+    """
+    part_path = f'{path}.part'
+    fd = os.open(part_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        try:
+            if size is not None:
+                preallocate(fd, size)
+            yield fd
+        finally:
+            os.close(fd)
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
@@ -1,25 +1,110 @@
+import copy
+import os
+
 import click
 
+from . import backend_clients
+from .backend_clients.balancer import (BALANCING_POLICIES,
+                                       DEFAULT_EJECT_AFTER, DEFAULT_EJECT_FOR,
+                                       ROUND_ROBIN)
+from .backend_clients.formats import OUTPUT_FORMATS, TEXT
+from .backend_clients.integrity import (CHECKSUM_ALGORITHMS,
+                                        DEFAULT_CHECKSUM_ALGORITHM)
+from .backend_clients.limiter import DEFAULT_MAX_LIMIT
+from .backend_clients.metrics import MetricsRecorder
+from .backend_clients.planner import (AUTO, BUFFERED,
+                                      DEFAULT_BUFFERED_MAX_SIZE,
+                                      DEFAULT_RANGE_CONNECTIONS,
+                                      DEFAULT_RANGES_MIN_SIZE, RANGES, STREAM,
+                                      TRANSFER_STRATEGIES)
 from .backend_clients import (
-    GRPCClient, RESTClient, DEFAULT_STDOUT_PRINT_MARKER)
+    DEFAULT_BATCH_WORKERS, DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL,
+    DEFAULT_CONNECT_TIMEOUT, DEFAULT_CONTENT_CACHE_SIZE,
+    DEFAULT_HTTP_POOL_SIZE, DEFAULT_READ_CHUNK_SIZE, DEFAULT_READ_TIMEOUT,
+    DEFAULT_RETRIES, DEFAULT_STDOUT_PRINT_MARKER)
 
 
 class Context(object):
 
     def __init__(self):
-        pass
+        self.chunk_size = DEFAULT_READ_CHUNK_SIZE
+        self.strategy = STREAM
+        self.buffered_max_size = DEFAULT_BUFFERED_MAX_SIZE
+        self.ranges_min_size = DEFAULT_RANGES_MIN_SIZE
+        self.range_connections = DEFAULT_RANGE_CONNECTIONS
+        self.output_path = None
+        self.balance = ROUND_ROBIN
+        self.eject_after = DEFAULT_EJECT_AFTER
+        self.eject_for = DEFAULT_EJECT_FOR
+        self.http_pool_size = DEFAULT_HTTP_POOL_SIZE
+        self.keep_alive = True
+        self.compression = True
+        self.connect_timeout = DEFAULT_CONNECT_TIMEOUT
+        self.read_timeout = DEFAULT_READ_TIMEOUT
+        self.deadline = None
+        self.retries = DEFAULT_RETRIES
+        self.hedge = False
+        self.hedge_after = None
+        self.grpc_keepalive_ms = None
+        self.grpc_max_message_size = None
+        self.grpc_initial_window = None
+        self.grpc_compression = 'none'
+        self.grpc_wait_for_ready = False
+        self.grpc_channels = 1
+        self.cache = False
+        self.refresh_cache = False
+        self.cache_ttl = DEFAULT_CACHE_TTL
+        self.cache_size = DEFAULT_CACHE_SIZE
+        self.content_cache_size = DEFAULT_CONTENT_CACHE_SIZE
+        self.metrics = None
+        self.socket = None
 
 
 pass_context = click.make_pass_decorator(Context, ensure=True)
 
 
-def get_client(context):
-    if context.backend == 'grpc':
-        return GRPCClient(context)
-    elif context.backend == 'rest':
-        return RESTClient(context)
-    else:
+# Backend client class names by the --backend choice. They are resolved on
+# first use, so only the dependencies of the chosen backend get imported.
+BACKENDS = {
+    'grpc': 'GRPCClient',
+    'rest': 'RESTClient',
+}
+ASYNC_BACKENDS = {
+    'grpc': 'AsyncGRPCClient',
+    'rest': 'AsyncRESTClient',
+}
+
+
+def get_client_class(registry, backend):
+    if backend not in registry:
         raise ValueError('Backend not supported')
+    return getattr(backend_clients, registry[backend])
+
+
+def get_client(context):
+    client = get_client_class(BACKENDS, context.backend)(context)
+    click_context = click.get_current_context(silent=True)
+    if click_context is not None:
+        click_context.call_on_close(client.close)
+        record_metrics(client, context, click_context)
+    return client
+
+
+def get_async_client(context):
+    # The client is closed by its event loop, when the batch ends.
+    client = get_client_class(ASYNC_BACKENDS, context.backend)(context)
+    click_context = click.get_current_context(silent=True)
+    if click_context is not None:
+        record_metrics(client, context, click_context)
+    return client
+
+
+def record_metrics(client, context, click_context):
+    if context.metrics is not None:
+        recorder = MetricsRecorder()
+        client.add_hook(recorder)
+        click_context.call_on_close(
+            lambda: recorder.write_json(context.metrics))
 
 
 @click.group()
@@ -35,25 +120,214 @@ def get_client(context):
     default='localhost:50051',
     type=click.UNPROCESSED,
     metavar='NETLOC',
-    help='Set a host and port of the gRPC server. Default is localhost:50051',
+    help='Set a host and port of the gRPC server. Default is localhost:50051'
+         '. Separate more servers by commas.',
 )
 @click.option(
     '--base-url',
     default='http://localhost/',
     type=click.UNPROCESSED,
     metavar='URL',
-    help='Set a base URL for a REST server. Default is http://localhost/.',
+    help='Set a base URL for a REST server. Default is http://localhost/.'
+         ' Separate more servers by commas.',
+)
+@click.option(
+    '--balance',
+    default=ROUND_ROBIN,
+    type=click.Choice(BALANCING_POLICIES),
+    help='Set how the calls are spread over more servers. Default is'
+         f' {ROUND_ROBIN}.',
+)
+@click.option(
+    '--eject-after',
+    default=DEFAULT_EJECT_AFTER,
+    type=click.IntRange(min=1),
+    metavar='N',
+    help='Stop sending calls to a server which was unavailable N times in a'
+         f' row. Default is {DEFAULT_EJECT_AFTER}.',
+)
+@click.option(
+    '--eject-for',
+    default=DEFAULT_EJECT_FOR,
+    type=click.FloatRange(min=0),
+    metavar='SEC',
+    help='Send calls to an unavailable server again after SEC seconds.'
+         f' Default is {DEFAULT_EJECT_FOR:g}.',
 )
 @click.option(
     '--output',
     default=DEFAULT_STDOUT_PRINT_MARKER,
-    type=click.File('w'),
+    type=click.File('wb'),
     metavar='OUTPUT',
     help='Set the file where to store the output. Default is -, i.e. the'
          ' stdout.',
 )
+@click.option(
+    '--http-pool-size',
+    default=DEFAULT_HTTP_POOL_SIZE,
+    type=click.IntRange(min=1),
+    metavar='N',
+    help='Set the maximum number of kept-alive connections to the REST'
+         f' server. Default is {DEFAULT_HTTP_POOL_SIZE}.',
+)
+@click.option(
+    '--no-keep-alive',
+    is_flag=True,
+    help='Close the connection to the REST server after every request.',
+)
+@click.option(
+    '--compression/--no-compression',
+    default=True,
+    help='Let the servers compress the file content for the transfer, it is'
+         ' decompressed while streamed. REST servers are offered gzip and'
+         ' deflate, plus zstd and br with the zstandard and brotli packages'
+         ' installed. Default is --compression.',
+)
+@click.option(
+    '--connect-timeout',
+    default=DEFAULT_CONNECT_TIMEOUT,
+    type=click.FloatRange(min=0, min_open=True),
+    metavar='SEC',
+    help='Set the timeout for connecting to the REST server. Default is'
+         f' {DEFAULT_CONNECT_TIMEOUT:g}.',
+)
+@click.option(
+    '--read-timeout',
+    default=DEFAULT_READ_TIMEOUT,
+    type=click.FloatRange(min=0, min_open=True),
+    metavar='SEC',
+    help='Set the timeout for waiting on data from the REST server and for'
+         f' the gRPC stat calls. Default is {DEFAULT_READ_TIMEOUT:g}.',
+)
+@click.option(
+    '--deadline',
+    type=click.FloatRange(min=0, min_open=True),
+    metavar='SEC',
+    help='Give up a backend call, including its retries, after SEC seconds.',
+)
+@click.option(
+    '--retries',
+    default=DEFAULT_RETRIES,
+    type=click.IntRange(min=0),
+    metavar='N',
+    help='Retry a backend call failing on an unavailable or overloaded server'
+         f' up to N times. Default is {DEFAULT_RETRIES}.',
+)
+@click.option(
+    '--hedge',
+    is_flag=True,
+    help='Send a second stat call when the first one takes longer than 95 %'
+         ' of the recent ones and use the first reply.',
+)
+@click.option(
+    '--hedge-after',
+    type=click.FloatRange(min=0),
+    metavar='MS',
+    help='Send the second stat call after MS milliseconds, implies --hedge.',
+)
+@click.option(
+    '--grpc-keepalive-ms',
+    type=click.IntRange(min=1),
+    metavar='MS',
+    help='Send HTTP/2 keepalive pings to the gRPC server every MS'
+         ' milliseconds.',
+)
+@click.option(
+    '--grpc-max-message-size',
+    type=click.IntRange(min=1),
+    metavar='BYTES',
+    help='Set the maximum size of a message received from the gRPC server.',
+)
+@click.option(
+    '--grpc-initial-window',
+    type=click.IntRange(min=1),
+    metavar='BYTES',
+    help='Set a fixed HTTP/2 initial window size of the gRPC streams instead'
+         ' of the automatic one.',
+)
+@click.option(
+    '--grpc-compression',
+    default='none',
+    type=click.Choice(['none', 'deflate', 'gzip']),
+    help='Set a compression of the messages sent to the gRPC server. Default'
+         ' is none.',
+)
+@click.option(
+    '--grpc-wait-for-ready',
+    is_flag=True,
+    help='Wait for the gRPC server to become available instead of failing'
+         ' immediately.',
+)
+@click.option(
+    '--grpc-channels',
+    default=1,
+    type=click.IntRange(min=1),
+    metavar='N',
+    help='Spread the gRPC calls round-robin over N connections. Default'
+         ' is 1.',
+)
+@click.option(
+    '--cache/--no-cache',
+    default=False,
+    envvar='FILE_CLIENT_CACHE',
+    help='Cache the file metadata and content in the user cache directory.'
+         ' Default is --no-cache, unless the FILE_CLIENT_CACHE variable is'
+         ' set.',
+)
+@click.option(
+    '--refresh',
+    is_flag=True,
+    help='Ignore the cached file metadata and content, but cache the fresh'
+         ' ones.',
+)
+@click.option(
+    '--cache-ttl',
+    default=DEFAULT_CACHE_TTL,
+    type=click.IntRange(min=0),
+    metavar='SEC',
+    help='Set for how long the cached file metadata are valid. Default is'
+         f' {DEFAULT_CACHE_TTL}.',
+)
+@click.option(
+    '--cache-size',
+    default=DEFAULT_CACHE_SIZE,
+    type=click.IntRange(min=1),
+    metavar='N',
+    help='Set the number of cached file metadata kept, the least recently'
+         f' used are evicted. Default is {DEFAULT_CACHE_SIZE}.',
+)
+@click.option(
+    '--content-cache-size',
+    default=DEFAULT_CONTENT_CACHE_SIZE,
+    type=click.IntRange(min=0),
+    metavar='BYTES',
+    help='Set the total size of the cached file content, the least recently'
+         f' used are evicted. Default is {DEFAULT_CONTENT_CACHE_SIZE}.',
+)
+@click.option(
+    '--metrics',
+    type=click.File('w'),
+    metavar='FILE',
+    help='Write a JSON summary of the backend calls with connect, time to'
+         ' first byte and total time histograms into the FILE.',
+)
+@click.option(
+    '--socket',
+    envvar='FILE_CLIENT_SOCKET',
+    type=click.Path(dir_okay=False),
+    metavar='PATH',
+    help='Run stat and read of a single file in the daemon listening on the'
+         ' Unix socket PATH, if it serves the same backend endpoint. The'
+         ' daemon command listens on it. Can be set by the FILE_CLIENT_SOCKET'
+         ' variable.',
+)
 @pass_context
-def cli(context, backend, grpc_server, base_url, output):
+def cli(context, backend, grpc_server, base_url, balance, eject_after,
+        eject_for, output, http_pool_size, no_keep_alive, compression,
+        connect_timeout, read_timeout, deadline, retries, hedge, hedge_after,
+        grpc_keepalive_ms, grpc_max_message_size, grpc_initial_window,
+        grpc_compression, grpc_wait_for_ready, grpc_channels, cache, refresh,
+        cache_ttl, cache_size, content_cache_size, metrics, socket):
     """
     CLI application which retrieves and prints data from one of the described
     backends.
@@ -61,26 +335,380 @@ def cli(context, backend, grpc_server, base_url, output):
     context.backend = backend
     context.grpc_server = grpc_server
     context.base_url = base_url
-    context.output = output
+    context.balance = balance
+    context.eject_after = eject_after
+    context.eject_for = eject_for
+    # click opens - as the stdout stream, which the clients would take for
+    # a file, so keep the marker for them to end printed text with a new line.
+    context.output = (output if get_output_path(output) is not None
+                      else DEFAULT_STDOUT_PRINT_MARKER)
+    context.http_pool_size = http_pool_size
+    context.keep_alive = not no_keep_alive
+    context.compression = compression
+    context.connect_timeout = connect_timeout
+    context.read_timeout = read_timeout
+    context.deadline = deadline
+    context.retries = retries
+    context.hedge = hedge or hedge_after is not None
+    if hedge_after is not None:
+        context.hedge_after = hedge_after / 1000
+    context.grpc_keepalive_ms = grpc_keepalive_ms
+    context.grpc_max_message_size = grpc_max_message_size
+    context.grpc_initial_window = grpc_initial_window
+    context.grpc_compression = grpc_compression
+    context.grpc_wait_for_ready = grpc_wait_for_ready
+    context.grpc_channels = grpc_channels
+    context.cache = cache
+    context.refresh_cache = refresh
+    context.cache_ttl = cache_ttl
+    context.cache_size = cache_size
+    context.content_cache_size = content_cache_size
+    context.metrics = metrics
+    context.socket = socket
+
+
+def get_output_path(output):
+    """
+    Returns the path of the output file, or ``None`` for the stdout.
+    """
+    if isinstance(output, click.utils.LazyFile):
+        return output.name
+    elif output == DEFAULT_STDOUT_PRINT_MARKER or hasattr(output, 'write'):
+        return None
+    return os.fspath(output)
+
+
+def iter_uuids(uuids, from_file):
+    """
+    Yields UUIDs given as arguments followed by the non-empty lines of the
+    ``from_file`` file, which is read lazily.
+    """
+    yield from uuids
+    if from_file is not None:
+        for line in from_file:
+            if line.strip():
+                yield line.strip()
+
+
+def get_batch_workers(workers, adaptive):
+    """
+    Returns the ``--workers`` given, or the default for a fixed or an
+    ``--adaptive`` number of them.
+    """
+    if workers is not None:
+        return workers
+    return DEFAULT_MAX_LIMIT if adaptive else DEFAULT_BATCH_WORKERS
+
+
+def run_in_daemon(context, command, uuid):
+    """
+    Runs the ``command`` for the ``uuid`` in the daemon at the ``--socket``.
+    Returns ``False`` if it has to run locally, there is no daemon or it
+    serves another endpoint. Exits with the exit code of a failed command.
+    """
+    if context.socket is None or context.metrics is not None:
+        return False
+    from .daemon import forward
+    exit_code = forward(context.socket, {
+        'command': command,
+        'backend': context.backend,
+        'endpoint': (context.grpc_server if context.backend == 'grpc'
+                     else context.base_url),
+        'uuid': uuid,
+    }, context.output)
+    if exit_code is None:
+        return False
+    elif exit_code:
+        raise SystemExit(exit_code)
+    return True
 
 
 @cli.command(name='stat')
 @click.argument(
-    'UUID'
+    'UUIDS',
+    nargs=-1,
+)
+@click.option(
+    '--from-file',
+    type=click.File('r'),
+    metavar='FILE',
+    help='Read more UUIDs from the FILE, one per line. Use - for the stdin.',
+)
+@click.option(
+    '--workers',
+    default=None,
+    type=click.IntRange(min=1),
+    help='Set the number of concurrent requests for more UUIDs. Default is'
+         f' {DEFAULT_BATCH_WORKERS}.',
+)
+@click.option(
+    '--adaptive',
+    is_flag=True,
+    help='Adapt the number of concurrent requests to the backend, growing it'
+         ' while the latency stays flat and halving it when the backend is'
+         ' overloaded or unavailable. --workers is then the maximum, default'
+         f' is {DEFAULT_MAX_LIMIT}.',
+)
+@click.option(
+    '--asyncio',
+    'use_asyncio',
+    is_flag=True,
+    help='Run the concurrent requests on an asyncio event loop instead of'
+         ' threads, which scales to thousands of requests in flight.',
+)
+@click.option(
+    '--format',
+    'output_format',
+    default=TEXT,
+    type=click.Choice(OUTPUT_FORMATS),
+    help='Set the output format, human-readable text, a JSON object per line'
+         ' or CSV with a header row. Default is text.',
 )
 @pass_context
-def stat(context, uuid):
-    'Prints the file metadata in a human-readable manner.'
-    client = get_client(context)
-    client.stat_and_output(uuid)
+def stat(context, uuids, from_file, workers, adaptive, use_asyncio,
+         output_format):
+    """
+    Prints the file metadata in a human-readable manner.
+
+    More UUIDs are processed concurrently, their results are printed in the
+    order they finish. Failures are reported on the stderr without stopping
+    the run.
+    """
+    if not uuids and from_file is None:
+        raise click.UsageError('Missing argument \'UUIDS...\'.')
+    if use_asyncio and context.hedge:
+        raise click.UsageError(
+            '--hedge and --hedge-after cannot be combined with --asyncio.')
+    if len(uuids) == 1 and from_file is None and output_format == TEXT:
+        # The daemon prints for the stdout, output files are written here.
+        if (
+            get_output_path(context.output) is not None
+            or not run_in_daemon(context, 'stat', uuids[0])
+        ):
+            get_client(context).stat_and_output(uuids[0])
+        return
+    workers = get_batch_workers(workers, adaptive)
+    context.http_pool_size = max(context.http_pool_size, workers)
+    client = get_async_client(context) if use_asyncio else get_client(context)
+    report = client.stat_many_and_output(
+        iter_uuids(uuids, from_file), workers, output_format=output_format,
+        adaptive=adaptive)
+    if report.failed:
+        raise SystemExit(1)
 
 
 @cli.command(name='read')
 @click.argument(
     'UUID'
 )
+@click.option(
+    '--chunk-size',
+    default=DEFAULT_READ_CHUNK_SIZE,
+    type=click.IntRange(min=1),
+    metavar='BYTES',
+    help='Set the maximum size of a content chunk requested from the'
+         f' backend. Default is {DEFAULT_READ_CHUNK_SIZE}.',
+)
+@click.option(
+    '--parallel',
+    default=1,
+    type=click.IntRange(min=1),
+    metavar='N',
+    help='Download the file over N connections at once as byte ranges. An'
+         ' interrupted download run again resumes the missing ranges.'
+         ' Requires --output to be a file. With --strategy auto, the number'
+         ' of connections of the files it downloads as ranges, default is'
+         f' {DEFAULT_RANGE_CONNECTIONS}.',
+)
+@click.option(
+    '--strategy',
+    default=STREAM,
+    type=click.Choice(TRANSFER_STRATEGIES),
+    help='Set how to transfer the file. auto chooses by the file metadata, a'
+         ' cached copy if there is one, a single buffered request for small'
+         ' files, byte ranges over more connections for large ones written'
+         ' to --output and a stream otherwise. Default is stream.',
+)
+@click.option(
+    '--buffered-max-size',
+    default=DEFAULT_BUFFERED_MAX_SIZE,
+    type=click.IntRange(min=0),
+    metavar='BYTES',
+    help='Set the largest file --strategy auto reads in a single buffered'
+         f' request. Default is {DEFAULT_BUFFERED_MAX_SIZE}.',
+)
+@click.option(
+    '--ranges-min-size',
+    default=DEFAULT_RANGES_MIN_SIZE,
+    type=click.IntRange(min=1),
+    metavar='BYTES',
+    help='Set the smallest file --strategy auto downloads as byte ranges.'
+         f' Default is {DEFAULT_RANGES_MIN_SIZE}.',
+)
+@click.option(
+    '--checksum',
+    type=click.Choice(CHECKSUM_ALGORITHMS),
+    help='Hash the content while it is downloaded, check its size against'
+         ' the file metadata and print the digest on the stderr.',
+)
+@click.option(
+    '--verify',
+    metavar='HEX',
+    help='Fail unless the content has this digest, computed by the'
+         f' --checksum algorithm, {DEFAULT_CHECKSUM_ALGORITHM} by default.',
+)
+@click.option(
+    '--offset',
+    default=0,
+    type=int,
+    metavar='BYTES',
+    help='Output the content from this offset on, a negative one counts from'
+         ' the end of the file.',
+)
+@click.option(
+    '--length',
+    type=click.IntRange(min=0),
+    metavar='BYTES',
+    help='Output at most this many bytes, the transfer stops as soon as they'
+         ' have arrived.',
+)
+@click.option(
+    '--head',
+    type=click.IntRange(min=0),
+    metavar='BYTES',
+    help='Output the first BYTES bytes only, same as --offset 0 --length'
+         ' BYTES.',
+)
 @pass_context
-def read(context, uuid):
+def read(context, uuid, chunk_size, parallel, strategy, buffered_max_size,
+         ranges_min_size, checksum, verify, offset, length, head):
     'Outputs the file content.'
+    context.chunk_size = chunk_size
+    verifying = checksum is not None or verify is not None
+    if head is not None:
+        if offset or length is not None:
+            raise click.UsageError(
+                '--head cannot be combined with --offset and --length.')
+        length = head
+    windowed = offset != 0 or length is not None
+    if parallel > 1 and strategy == BUFFERED:
+        raise click.UsageError(
+            '--parallel cannot be combined with --strategy buffered.')
+    ranges = strategy == RANGES or (parallel > 1 and strategy == STREAM)
+    if ranges and verifying:
+        raise click.UsageError(
+            '--checksum and --verify cannot be combined with --parallel.')
+    if windowed and (verifying or ranges):
+        raise click.UsageError(
+            '--offset, --length and --head cannot be combined with'
+            ' --checksum, --verify and --parallel.')
+    connections = parallel if parallel > 1 else DEFAULT_RANGE_CONNECTIONS
+    if ranges:
+        path = get_output_path(context.output)
+        if path is None:
+            option = '--parallel' if parallel > 1 else '--strategy ranges'
+            raise click.UsageError(
+                f'{option} requires --output to be a file.')
+        context.http_pool_size = max(context.http_pool_size, connections)
+        get_client(context).read_ranges_to_file(uuid, path, connections)
+        return
+    # Output files are written in place by the client, not the daemon.
+    context.output_path = get_output_path(context.output)
+    if (
+        strategy == STREAM and not verifying and not windowed
+        and context.output_path is None
+        and run_in_daemon(context, 'read', uuid)
+    ):
+        return
+    context.strategy = strategy
+    context.buffered_max_size = buffered_max_size
+    context.ranges_min_size = ranges_min_size
+    if strategy == AUTO:
+        context.range_connections = connections
+        context.http_pool_size = max(context.http_pool_size, connections)
     client = get_client(context)
-    client.read_and_output(uuid)
+    client.read_and_output(uuid, checksum, verify, offset, length)
+
+
+@cli.command(name='mirror')
+@click.argument(
+    'UUIDS',
+    nargs=-1,
+)
+@click.option(
+    '--from-file',
+    type=click.File('r'),
+    metavar='FILE',
+    help='Read more UUIDs from the FILE, one per line. Use - for the stdin.',
+)
+@click.option(
+    '--directory',
+    default='.',
+    type=click.Path(file_okay=False, dir_okay=True, writable=True),
+    metavar='DIRECTORY',
+    help='Set the directory to store the files into, each file is named by'
+         ' its UUID. Default is the current directory.',
+)
+@click.option(
+    '--workers',
+    default=None,
+    type=click.IntRange(min=1),
+    help='Set the number of concurrent transfers. Default is'
+         f' {DEFAULT_BATCH_WORKERS}.',
+)
+@click.option(
+    '--adaptive',
+    is_flag=True,
+    help='Adapt the number of concurrent transfers to the backend, growing it'
+         ' while the latency stays flat and halving it when the backend is'
+         ' overloaded or unavailable. --workers is then the maximum, default'
+         f' is {DEFAULT_MAX_LIMIT}.',
+)
+@click.option(
+    '--chunk-size',
+    default=DEFAULT_READ_CHUNK_SIZE,
+    type=click.IntRange(min=1),
+    metavar='BYTES',
+    help='Set the maximum size of a content chunk requested from the'
+         f' backend. Default is {DEFAULT_READ_CHUNK_SIZE}.',
+)
+@pass_context
+def mirror(context, uuids, from_file, directory, workers, adaptive,
+           chunk_size):
+    """
+    Downloads the content of many files into a directory.
+
+    The transfers run concurrently over a single backend client. Failures
+    are reported on the stderr without stopping the run.
+    """
+    if not uuids and from_file is None:
+        raise click.UsageError('Missing argument \'UUIDS...\'.')
+    os.makedirs(directory, exist_ok=True)
+    context.chunk_size = chunk_size
+    workers = get_batch_workers(workers, adaptive)
+    context.http_pool_size = max(context.http_pool_size, workers)
+    client = get_client(context)
+    report = client.read_many_to_directory(
+        iter_uuids(uuids, from_file), directory, workers, adaptive=adaptive)
+    if report.failed:
+        raise SystemExit(1)
+
+
+@cli.command(name='daemon')
+@pass_context
+def daemon(context):
+    """
+    Serves stat and read calls of other invocations over a Unix socket.
+
+    The gRPC channels and the HTTP connection pool are kept open between
+    the calls. The socket is the --socket, by default file-client.sock in
+    the XDG_RUNTIME_DIR. The calls use the backend options of the daemon.
+    """
+    from .daemon import default_socket_path, serve
+
+    clients = {}
+    for backend in BACKENDS:
+        backend_context = copy.copy(context)
+        backend_context.backend = backend
+        clients[backend] = get_client(backend_context)
+    serve(context.socket or default_socket_path(), clients)
@@ -0,0 +1,188 @@
+"""
+A long-lived process keeping the backend clients, their gRPC channels and
+HTTP connection pools, open and serving ``stat`` and ``read`` calls of thin
+CLI invocations over a Unix socket.
+
+A thin client sends one request per connection as a JSON line and receives
+frames of a one byte type and a four byte big-endian length, followed by the
+payload:
+
+* ``D`` - output data, written to the ``--output``
+* ``M`` - a message the CLI prints to the stdout
+* ``E`` - a message for the stderr
+* ``X`` - the exit code as ASCII digits, the last frame
+* ``L`` - the request is not served by the daemon, run it locally
+"""
+import json
+import os
+import struct
+import sys
+
+
+FRAME_HEADER = struct.Struct('>cI')
+
+
+def default_socket_path():
+    """
+    Returns the socket path in the ``$XDG_RUNTIME_DIR``, or a per user one
+    in the temporary directory.
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'file-client.sock')
+    import tempfile
+    return os.path.join(tempfile.gettempdir(),
+                        f'file-client-{os.getuid()}.sock')
+
+
+def send_frame(connection, frame_type, payload=b''):
+    connection.sendall(FRAME_HEADER.pack(frame_type, len(payload)))
+    if payload:
+        connection.sendall(payload)
+
+
+def recv_exactly(connection, size):
+    data = bytearray(size)
+    view = memoryview(data)
+    while view:
+        received = connection.recv_into(view)
+        if not received:
+            raise ConnectionError('The daemon closed the connection.')
+        view = view[received:]
+    return data
+
+
+def handle_request(connection, clients, request):
+    """
+    Serves a single request on the ``connection`` with the client of the
+    requested backend, if it talks to the same endpoint.
+    """
+    from .backend_clients import ClientException
+    from .backend_clients.batch import describe_exception
+
+    client = clients.get(request.get('backend'))
+    if (
+        client is None
+        or client.endpoint != request.get('endpoint')
+        or request.get('command') not in ('stat', 'read')
+    ):
+        send_frame(connection, b'L')
+        return
+    uuid = request['uuid']
+    try:
+        if request['command'] == 'stat':
+            text = client._process_dict_for_display(client.cached_stat(uuid))
+            send_frame(connection, b'D', f'{text}\n'.encode())
+        else:
+            for chunk in client.measured_read_stream(uuid).chunks:
+                send_frame(connection, b'D', chunk)
+    except (ConnectionError, BrokenPipeError):
+        return
+    except Exception as e:
+        if isinstance(e, ClientException):
+            send_frame(connection, b'M',
+                       f'{e.header_message} {e.args[0]}\n'.encode())
+        send_frame(connection, b'E', f'{describe_exception(e)}\n'.encode())
+        send_frame(connection, b'X', b'1')
+        return
+    send_frame(connection, b'X', b'0')
+
+
+def create_server(path, clients):
+    """
+    Creates a server of the requests on the Unix socket at ``path`` with
+    the ``clients`` by their backend name, every connection is handled on
+    its own thread. A stale socket file of a dead daemon is replaced.
+    """
+    import socket
+    import socketserver
+
+    class RequestHandler(socketserver.BaseRequestHandler):
+
+        def handle(self):
+            with self.request.makefile('rb') as file:
+                line = file.readline()
+            try:
+                request = json.loads(line)
+            except ValueError:
+                return
+            handle_request(self.request, clients, request)
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.remove(path)
+        else:
+            raise RuntimeError(f'A daemon is already listening on {path}.')
+        finally:
+            probe.close()
+    # Only the user running the daemon may connect to it.
+    umask = os.umask(0o177)
+    try:
+        return Server(path, RequestHandler)
+    finally:
+        os.umask(umask)
+
+
+def serve(path, clients):
+    """
+    Runs the server of ``create_server`` until the process is interrupted
+    or terminated, then removes the socket.
+    """
+    import signal
+
+    server = create_server(path, clients)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        print(f'Listening on {path}', file=sys.stderr)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(path)
+
+
+def forward(path, request, output):
+    """
+    Sends the ``request`` to the daemon listening at ``path`` and writes its
+    output to the ``output``. Returns the exit code, or ``None`` if there is
+    no daemon or it does not serve the request, so it has to run locally.
+    """
+    import socket
+
+    from .backend_clients.sink import open_sink
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            connection.connect(path)
+            connection.sendall(json.dumps(request).encode() + b'\n')
+            frame_type, size = FRAME_HEADER.unpack(
+                recv_exactly(connection, FRAME_HEADER.size))
+        except OSError:
+            return None
+        if frame_type == b'L':
+            return None
+        with open_sink(output) as sink:
+            while True:
+                payload = recv_exactly(connection, size)
+                if frame_type == b'D':
+                    sink.write(payload)
+                elif frame_type in (b'M', b'E'):
+                    sink.flush()
+                    stream = sys.stdout if frame_type == b'M' else sys.stderr
+                    stream.flush()
+                    stream.buffer.write(payload)
+                    stream.buffer.flush()
+                elif frame_type == b'X':
+                    return int(payload)
+                frame_type, size = FRAME_HEADER.unpack(
+                    recv_exactly(connection, FRAME_HEADER.size))
+    finally:
+        connection.close()
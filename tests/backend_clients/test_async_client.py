@@ -0,0 +1,334 @@
+import asyncio
+import importlib.util
+import threading
+
+import grpc
+import pytest
+from unittest.mock import MagicMock
+from file_client.backend_clients.async_client import AsyncClient
+from file_client.backend_clients.client_exceptions import (
+    ClientException, ClientExceptionFileNotFound, ClientExceptionUnavailable)
+from file_client.backend_clients.grpc_client.async_grpc_client import (
+    AsyncGRPCClient)
+from file_client.backend_clients.grpc_client.service_file_pb2 import (
+    ReadReply, StatReply)
+from file_client.backend_clients.grpc_client.service_file_pb2_grpc import (
+    FileServicer, add_FileServicer_to_server)
+from file_client.backend_clients.rest_client.async_rest_client import (
+    AsyncRESTClient)
+from tests.helpers.fixtures import context  # noqa: F401
+
+
+requires_httpx = pytest.mark.skipif(
+    importlib.util.find_spec('httpx') is None,
+    reason='The asyncio REST backend requires httpx.')
+
+
+class DummyAsyncClient(AsyncClient):
+
+    async def read_stream(self, uuid):
+        raise NotImplementedError
+
+    async def stat(self, uuid):
+        await asyncio.sleep(0.01 if uuid == 'slow' else 0)
+        if uuid == 'missing':
+            raise ValueError('not here')
+        return {'name': uuid}
+
+
+class InMemoryFileServicer(FileServicer):
+
+    def __init__(self):
+        self.flaky_calls = 0
+
+    async def stat(self, request, context):
+        if request.uuid.value == 'missing':
+            await context.abort(grpc.StatusCode.NOT_FOUND, 'not found')
+        if request.uuid.value == 'flaky':
+            self.flaky_calls += 1
+            if self.flaky_calls == 1:
+                await context.abort(grpc.StatusCode.UNAVAILABLE, 'busy')
+        if request.uuid.value == 'slow':
+            await asyncio.sleep(1)
+        return StatReply(data=StatReply.Data(
+            size=7, mimetype='text/plain', name=request.uuid.value))
+
+    async def read(self, request, context):
+        content = b'content'
+        for offset in range(0, len(content), request.size):
+            yield ReadReply(data=ReadReply.Data(
+                data=content[offset:offset + request.size]))
+
+
+def with_grpc_server(test):
+    async def run(context):
+        server = grpc.aio.server()
+        add_FileServicer_to_server(InMemoryFileServicer(), server)
+        port = server.add_insecure_port('localhost:0')
+        await server.start()
+        context.grpc_server = f'localhost:{port}'
+        client = AsyncGRPCClient(context)
+        await client.open()
+        try:
+            await test(client)
+        finally:
+            await client.aclose()
+            await server.stop(None)
+    return run
+
+
+def test_async_client_stat_many_should_yield_results_as_they_finish(
+        context):
+    async def collect():
+        client = DummyAsyncClient(context)
+        return [result async for result in client.stat_many(
+            ['slow', 'missing', 'fast'], concurrency=3)]
+
+    results = asyncio.run(collect())
+    assert results[-1] == ('slow', {'name': 'slow'}, None)
+    results = {uuid: (result, exception)
+               for uuid, result, exception in results}
+    assert str(results['missing'][1]) == 'not here'
+    assert results['fast'] == ({'name': 'fast'}, None)
+
+
+def test_async_client_stat_many_should_not_wait_for_slow_input(context):
+    release = threading.Event()
+
+    def uuids():
+        yield 'first'
+        release.wait()
+        yield 'second'
+
+    async def collect():
+        results = DummyAsyncClient(context).stat_many(uuids())
+        first = await results.__anext__()
+        release.set()
+        return [first] + [result async for result in results]
+
+    assert asyncio.run(collect()) == [
+        ('first', {'name': 'first'}, None),
+        ('second', {'name': 'second'}, None),
+    ]
+
+
+def test_async_client_stat_many_and_output_should_report_failures(
+        context, capfd):
+    client = DummyAsyncClient(context)
+    report = client.stat_many_and_output(['first', 'missing'])
+    out, err = capfd.readouterr()
+    assert (report.succeeded, report.failed) == (1, 1)
+    assert out == 'uuid: first\nname: first\n\n'
+    assert 'missing: ValueError not here\n' in err
+
+
+def test_async_grpc_client_should_stat_and_read_files(context):
+    context.chunk_size = 3
+
+    @with_grpc_server
+    async def test(client):
+        attributes = await client.stat('file.txt')
+        assert attributes['name'] == 'file.txt'
+        assert attributes['size'] == 7
+        stream = await client.read_stream('file.txt')
+        assert [chunk async for chunk in stream.chunks] == [
+            b'con', b'ten', b't']
+        with pytest.raises(ClientExceptionFileNotFound):
+            await client.stat('missing')
+
+    asyncio.run(test(context))
+
+
+def test_async_grpc_client_should_cancel_stream_closed_early(context):
+    call = MagicMock()
+    call.__aiter__.return_value = [
+        ReadReply(data=ReadReply.Data(data=data)) for data in (b'a', b'b')]
+    stub = MagicMock()
+    stub.read.return_value = call
+
+    async def read_first_chunk():
+        client = AsyncGRPCClient(context)
+        client.balancer = client._create_balancer([stub])
+        stream = await client.read_stream('file.txt')
+        chunk = await stream.chunks.__anext__()
+        await stream.chunks.aclose()
+        return chunk, client.balancer.endpoints[0].outstanding
+
+    assert asyncio.run(read_first_chunk()) == (b'a', 0)
+    assert call.cancel.call_count == 1
+
+
+def test_async_grpc_client_should_retry_unavailable_stat(context):
+    @with_grpc_server
+    async def test(client):
+        client.retry_policy.backoff = 0
+        attributes = await client.stat('flaky')
+        assert attributes['name'] == 'flaky'
+
+    asyncio.run(test(context))
+
+
+def test_async_grpc_client_should_give_up_at_deadline(context, capfd):
+    context.deadline = 0.05
+
+    @with_grpc_server
+    async def test(client):
+        with pytest.raises(ClientException):
+            await client.stat('slow')
+
+    asyncio.run(test(context))
+
+
+def test_async_grpc_client_should_fail_over_from_stuck_server(context):
+    class StuckFileServicer(FileServicer):
+
+        async def stat(self, request, context):
+            await asyncio.sleep(5)
+
+    async def test():
+        servers = []
+        targets = []
+        for servicer in (StuckFileServicer(), InMemoryFileServicer()):
+            server = grpc.aio.server()
+            add_FileServicer_to_server(servicer, server)
+            port = server.add_insecure_port('localhost:0')
+            targets.append(f'localhost:{port}')
+            await server.start()
+            servers.append(server)
+        context.grpc_server = ','.join(targets)
+        context.read_timeout = 0.2
+        client = AsyncGRPCClient(context)
+        await client.open()
+        try:
+            return await client.stat('file.txt')
+        finally:
+            await client.aclose()
+            for server in servers:
+                await server.stop(None)
+
+    assert asyncio.run(test())['name'] == 'file.txt'
+
+
+def test_async_client_stat_many_should_share_duplicates_in_flight(context):
+    calls = []
+
+    class CountingAsyncClient(DummyAsyncClient):
+
+        async def stat(self, uuid):
+            calls.append(uuid)
+            return await super().stat(uuid)
+
+    async def collect():
+        client = CountingAsyncClient(context)
+        return [result async for result in client.stat_many(
+            ['slow', 'slow', 'fast', 'slow'], concurrency=4)]
+
+    results = asyncio.run(collect())
+    assert sorted(uuid for uuid, _, _ in results) == [
+        'fast', 'slow', 'slow', 'slow']
+    assert sorted(calls) == ['fast', 'slow']
+
+
+def mocked_async_rest_client(context, handler):
+    import httpx
+
+    client = AsyncRESTClient(context)
+    client.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client.retry_policy.backoff = 0
+    return client
+
+
+@requires_httpx
+@pytest.mark.parametrize('status', [429, 502, 503, 504])
+def test_async_rest_client_should_raise_unavailable_on_overload(
+        context, status, capfd):
+    import httpx
+
+    requests = []
+
+    def overloaded(request):
+        requests.append(request)
+        return httpx.Response(status)
+
+    client = mocked_async_rest_client(context, overloaded)
+    with pytest.raises(ClientExceptionUnavailable):
+        asyncio.run(client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o'))
+    assert len(requests) == 3
+
+
+@requires_httpx
+def test_async_rest_client_should_retry_unavailable_server(context):
+    import httpx
+
+    replies = [httpx.Response(503), httpx.Response(200, json={'size': 3})]
+    client = mocked_async_rest_client(
+        context, lambda request: replies.pop(0))
+    assert asyncio.run(
+        client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')) == {'size': 3}
+    assert client.balancer.endpoints[0].failures == 0
+
+
+@requires_httpx
+def test_async_rest_client_should_hold_server_until_stream_is_closed(
+        context):
+    import httpx
+
+    client = mocked_async_rest_client(
+        context, lambda request: httpx.Response(200, content=b'content'))
+    endpoint = client.balancer.endpoints[0]
+
+    async def read():
+        stream = await client.read_stream(
+            '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+        outstanding = endpoint.outstanding
+        content = b''.join([chunk async for chunk in stream.chunks])
+        return outstanding, content
+
+    assert asyncio.run(read()) == (1, b'content')
+    assert endpoint.outstanding == 0
+
+
+@requires_httpx
+def test_async_rest_client_should_raise_unavailable_on_transport_error(
+        context, capfd):
+    import httpx
+
+    def refuse(request):
+        raise httpx.ConnectError('refused')
+
+    client = mocked_async_rest_client(context, refuse)
+    with pytest.raises(ClientExceptionUnavailable):
+        asyncio.run(client.read_stream('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o'))
+    out, _ = capfd.readouterr()
+    assert out == 'The remote service is unavailable. refused\n'
+
+
+@requires_httpx
+def test_async_rest_client_should_raise_file_not_found(context, capfd):
+    import httpx
+
+    client = mocked_async_rest_client(
+        context, lambda request: httpx.Response(404))
+    with pytest.raises(ClientExceptionFileNotFound):
+        asyncio.run(client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o'))
+    assert client.balancer.endpoints[0].failures == 0
+
+
+def test_async_client_stat_many_should_use_stat_cache(
+        context, monkeypatch, tmp_path, capfd):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    context.cache = True
+    calls = []
+
+    class CountingAsyncClient(DummyAsyncClient):
+
+        async def stat(self, uuid):
+            calls.append(uuid)
+            return await super().stat(uuid)
+
+    for _ in range(2):
+        report = CountingAsyncClient(context).stat_many_and_output(
+            ['first', 'second'])
+        assert report.succeeded == 2
+    assert sorted(calls) == ['first', 'second']
+    assert (tmp_path / 'file-client' / 'stat.sqlite3').exists()
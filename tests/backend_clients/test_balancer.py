@@ -0,0 +1,71 @@
+import pytest
+from file_client.backend_clients.balancer import (LEAST_OUTSTANDING,
+                                                  EndpointBalancer,
+                                                  split_endpoints)
+from unittest.mock import patch
+
+
+def test_split_endpoints_should_split_by_commas():
+    assert split_endpoints('a:1, b:2,,') == ['a:1', 'b:2']
+    assert split_endpoints('http://localhost/') == ['http://localhost/']
+
+
+def test_balancer_should_spread_calls_round_robin():
+    balancer = EndpointBalancer(['a', 'b', 'c'])
+    targets = []
+    for _ in range(6):
+        endpoint = balancer.acquire()
+        targets.append(endpoint.target)
+        balancer.release(endpoint)
+    assert targets == ['a', 'b', 'c', 'a', 'b', 'c']
+
+
+def test_balancer_should_prefer_least_outstanding_endpoint():
+    balancer = EndpointBalancer(['a', 'b'], policy=LEAST_OUTSTANDING)
+    busy = balancer.acquire()
+    assert [balancer.acquire().target for _ in range(3)].count(
+        busy.target) == 1
+    assert busy.outstanding == 2
+
+
+def test_balancer_should_reject_unknown_policy():
+    with pytest.raises(ValueError):
+        EndpointBalancer(['a'], policy='random')
+
+
+def test_balancer_should_eject_failing_endpoint_for_a_while():
+    balancer = EndpointBalancer(['a', 'b'], eject_after=2, eject_for=10)
+    failing = balancer.endpoints[0]
+    for _ in range(2):
+        balancer.release(balancer.acquire([balancer.endpoints[1]]), True)
+    assert failing.ejected_until > 0
+    assert {balancer.acquire().target for _ in range(4)} == {'b'}
+    with patch('time.monotonic', return_value=failing.ejected_until):
+        assert {balancer.acquire().target for _ in range(4)} == {'a', 'b'}
+
+
+def test_balancer_should_reset_failures_on_success():
+    balancer = EndpointBalancer(['a'], eject_after=2)
+    endpoint = balancer.acquire()
+    balancer.release(endpoint, failed=True)
+    balancer.release(balancer.acquire())
+    balancer.release(balancer.acquire(), failed=True)
+    assert endpoint.ejected_until == 0
+
+
+def test_balancer_should_fail_over_to_untried_endpoint():
+    balancer = EndpointBalancer(['a', 'b', 'c'])
+    tried = [balancer.acquire()]
+    tried.append(balancer.acquire(tried))
+    assert balancer.has_untried(tried)
+    last = balancer.acquire(tried)
+    assert last not in tried
+    assert not balancer.has_untried(tried + [last])
+
+
+def test_balancer_should_use_soonest_back_endpoint_if_all_ejected():
+    balancer = EndpointBalancer(['a', 'b'], eject_after=1)
+    later, sooner = balancer.endpoints
+    later.ejected_until = 10 ** 9 + 2
+    sooner.ejected_until = 10 ** 9 + 1
+    assert balancer.acquire().target == 'b'
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+from file_client.backend_clients.batch import (BatchReport,
+                                               describe_exception, run_batch)
+from file_client.backend_clients.client_exceptions import (
+    ClientExceptionFileNotFound, ClientExceptionUnavailable)
+from file_client.backend_clients.limiter import AdaptiveLimiter
+
+
+def test_run_batch_should_yield_result_for_every_item():
+    results = run_batch(lambda item: item * 2, range(100), workers=4)
+    assert sorted(result for _, result, _ in results) == list(
+        range(0, 200, 2))
+
+
+def test_run_batch_should_not_stop_on_failing_item():
+    def function(item):
+        if item == 3:
+            raise ValueError('broken item')
+        return item
+
+    results = {item: (result, exception)
+               for item, result, exception in run_batch(function, range(6))}
+    assert len(results) == 6
+    assert results[3][0] is None
+    assert str(results[3][1]) == 'broken item'
+    assert results[5] == (5, None)
+
+
+def test_run_batch_should_consume_items_lazily():
+    consumed = []
+    release = threading.Event()
+
+    def items():
+        for item in range(1000):
+            consumed.append(item)
+            yield item
+
+    results = run_batch(lambda item: release.wait(), items(), workers=2)
+    release.set()
+    next(results)
+    assert len(consumed) < 10
+    results.close()
+
+
+def test_run_batch_should_not_wait_for_slow_input():
+    release = threading.Event()
+
+    def items():
+        yield 'first'
+        release.wait()
+        yield 'second'
+
+    results = run_batch(lambda item: item, items(), workers=2)
+    assert next(results) == ('first', 'first', None)
+    release.set()
+    assert list(results) == [('second', 'second', None)]
+
+
+def test_batch_report_should_count_items():
+    report = BatchReport()
+    report.record()
+    report.record(ValueError())
+    report.record()
+    assert (report.total, report.succeeded, report.failed) == (3, 2, 1)
+    assert report.summary().startswith('Processed 3 files in ')
+    assert report.summary().endswith(' 1 failed.')
+
+
+def test_describe_exception_should_contain_header_message():
+    with pytest.raises(ClientExceptionFileNotFound) as exception_info:
+        ClientExceptionFileNotFound()
+    assert describe_exception(exception_info.value) == (
+        'File was not found on the remote server.')
+    assert describe_exception(ValueError('oops')) == 'ValueError oops'
+
+
+def test_run_batch_should_keep_calls_in_flight_within_limiter_limit():
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def function(item):
+        with lock:
+            in_flight.append(item)
+            peak.append(len(in_flight))
+        time.sleep(0.001)
+        with lock:
+            in_flight.remove(item)
+        if item % 10 == 0:
+            ClientExceptionUnavailable()
+        return item
+
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=8)
+    results = list(run_batch(function, range(100), workers=8,
+                             limiter=limiter))
+    assert len(results) == 100
+    assert max(peak) <= 8
+    assert not limiter.slow_start
+    assert BatchReport(limiter).summary().endswith(
+        f' Concurrency ended at {limiter.limit} (peak {int(limiter.peak)}).')
@@ -0,0 +1,161 @@
+import os
+import time
+
+import pytest
+from file_client.backend_clients.cache import (NOT_FOUND, ContentCache,
+                                               StatCache,
+                                               default_cache_dir)
+from file_client.backend_clients.client_exceptions import (
+    ClientExceptionFileNotFound)
+from tests.helpers.fixtures import (  # noqa: F401
+    context, concrete_client_without_context)
+from unittest.mock import MagicMock
+
+
+@pytest.fixture
+def stat_cache(tmp_path):
+    return StatCache(str(tmp_path / 'stat.sqlite3'))
+
+
+def test_default_cache_dir_should_follow_xdg(monkeypatch, tmp_path):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    assert default_cache_dir() == os.path.join(str(tmp_path), 'file-client')
+
+
+def test_stat_cache_should_return_stored_attributes(stat_cache, tmp_path):
+    assert stat_cache.get('grpc:localhost:50051:uuid') is None
+    stat_cache.set('grpc:localhost:50051:uuid', {'name': 'file.txt'})
+    assert stat_cache.get('grpc:localhost:50051:uuid') == {
+        'name': 'file.txt'}
+    other_process_cache = StatCache(str(tmp_path / 'stat.sqlite3'))
+    assert other_process_cache.get('grpc:localhost:50051:uuid') == {
+        'name': 'file.txt'}
+
+
+def test_stat_cache_should_store_not_found_files(stat_cache):
+    stat_cache.set_not_found('uuid')
+    assert stat_cache.get('uuid') is NOT_FOUND
+
+
+def test_stat_cache_should_expire_entries(stat_cache):
+    stat_cache.ttl = -1
+    stat_cache.set('uuid', {'name': 'file.txt'})
+    assert stat_cache.get('uuid') is None
+
+
+def test_stat_cache_should_evict_least_recently_used_entries(stat_cache):
+    stat_cache.max_entries = 2
+    for key in ('first', 'second', 'third'):
+        stat_cache.set(key, {'name': key})
+        time.sleep(0.01)
+    stat_cache.get('first')
+    stat_cache.evict()
+    assert stat_cache.get('second') is None
+    assert stat_cache.get('first') == {'name': 'first'}
+    assert stat_cache.get('third') == {'name': 'third'}
+
+
+@pytest.fixture
+def cached_client(context, concrete_client_without_context, monkeypatch,
+                  tmp_path):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    context.cache = True
+    client = concrete_client_without_context(context)
+    client.stat = MagicMock(return_value={'name': 'file.txt'})
+    return client
+
+
+def test_cached_stat_should_ask_backend_once(cached_client):
+    assert cached_client.cached_stat('uuid') == {'name': 'file.txt'}
+    assert cached_client.cached_stat('uuid') == {'name': 'file.txt'}
+    assert cached_client.stat.call_count == 1
+
+
+def test_cached_stat_should_ask_backend_on_refresh(cached_client):
+    cached_client.cached_stat('uuid')
+    cached_client.refresh_cache = True
+    cached_client.cached_stat('uuid')
+    assert cached_client.stat.call_count == 2
+
+
+def test_cached_stat_should_cache_not_found_files(cached_client):
+    def not_found(uuid):
+        raise ClientExceptionFileNotFound()
+
+    cached_client.stat.side_effect = not_found
+    for _ in range(2):
+        with pytest.raises(ClientExceptionFileNotFound):
+            cached_client.cached_stat('uuid')
+    assert cached_client.stat.call_count == 1
+
+
+def test_cached_stat_should_not_cache_without_cache_enabled(
+        context, concrete_client_without_context):
+    client = concrete_client_without_context(context)
+    client.stat = MagicMock(return_value={'name': 'file.txt'})
+    client.cached_stat('uuid')
+    client.cached_stat('uuid')
+    assert client.stat_cache is None
+    assert client.stat.call_count == 2
+
+
+@pytest.fixture
+def content_cache(tmp_path):
+    return ContentCache(str(tmp_path / 'content'), max_size=10)
+
+
+def test_content_cache_should_store_streamed_chunks(content_cache):
+    chunks = content_cache.store_chunks(
+        'uuid', iter((b'con', b'tent')), {'validators': {'etag': '"1"'}})
+    assert content_cache.get('uuid') is None
+    assert list(chunks) == [b'con', b'tent']
+    assert content_cache.get('uuid') == {
+        'validators': {'etag': '"1"'}, 'size': 7}
+    assert list(content_cache.iter_chunks('uuid', 4)) == [b'cont', b'ent']
+
+
+def test_content_cache_should_not_store_interrupted_stream(content_cache):
+    def chunks():
+        yield b'partial'
+        raise ValueError('connection lost')
+
+    with pytest.raises(ValueError):
+        list(content_cache.store_chunks('uuid', chunks(), {}))
+    assert content_cache.get('uuid') is None
+    assert os.listdir(content_cache.path) == []
+
+
+def test_content_cache_should_skip_content_over_max_size(content_cache):
+    chunks = [b'0123456789', b'0']
+    assert list(content_cache.store_chunks('uuid', iter(chunks), {})) == (
+        chunks)
+    assert content_cache.get('uuid') is None
+
+
+def test_content_cache_should_evict_least_recently_used(content_cache):
+    for key in ('first', 'second', 'third'):
+        list(content_cache.store_chunks(key, iter((b'1234', )), {}))
+        time.sleep(0.01)
+    assert content_cache.get('first') is None
+    assert content_cache.get('second') is not None
+    assert content_cache.get('third') is not None
+
+
+def test_cached_read_stream_should_serve_unchanged_content_from_cache(
+        cached_client):
+    cached_client.stat.return_value = {
+        'size': 7, 'create_datetime': '2020-01-01T00:00:00Z'}
+    cached_client.read = MagicMock(
+        return_value=(b'content', None, 'text/plain'))
+    first = cached_client.cached_read_stream('uuid')
+    assert b''.join(first.chunks) == b'content'
+    second = cached_client.cached_read_stream('uuid')
+    assert b''.join(second.chunks) == b'content'
+    assert second.content_type == 'text/plain'
+    assert cached_client.read.call_count == 1
+    cached_client.stat.return_value = {
+        'size': 8, 'create_datetime': '2020-01-01T00:00:00Z'}
+    cached_client.read.return_value = (b'content2', None, 'text/plain')
+    third = cached_client.cached_read_stream('uuid')
+    assert b''.join(third.chunks) == b'content2'
+    assert cached_client.read.call_count == 2
@@ -1,7 +1,13 @@
+import threading
+import time
+
 import pytest
 from tests.helpers.fixtures import (
     context, concrete_client_without_context, concrete_client, tmp_file)  # noqa 401
 from unittest.mock import MagicMock
+from file_client.backend_clients.client import ReadStream, window_chunks
+from file_client.backend_clients.client_exceptions import (
+    ClientExceptionFileNotFound, ClientExceptionIntegrity)
 
 
 def test_abstract_client_read_method_should_return_not_implemented(
@@ -16,15 +22,32 @@ def test_abstract_client_stat_method_should_return_not_implemented(
         concrete_client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
 
 
-def test_abstract_client_read_and_output_should_call_read_and_output_result(
+def test_abstract_client_read_and_output_should_call_read_and_output_stream(
         concrete_client):
     mocked_read = MagicMock(return_value=(b'content read', 'str1', 'str2'))
-    mocked_output_result = MagicMock()
+    mocked_output_stream = MagicMock()
     concrete_client.read = mocked_read
-    concrete_client.output_result = mocked_output_result
+    concrete_client.output_stream = mocked_output_stream
     concrete_client.read_and_output('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
     assert mocked_read.call_count == 1
-    assert mocked_output_result.call_count == 1
+    assert mocked_output_stream.call_count == 1
+    assert list(mocked_output_stream.call_args.args[0]) == [b'content read']
+
+
+def test_abstract_client_output_stream_should_write_chunks_to_stdout(
+        concrete_client, capfd):
+    concrete_client.output_stream(iter((b'first ', b'second')))
+    out, _ = capfd.readouterr()
+    assert out == 'first second'
+
+
+def test_abstract_client_output_stream_should_write_chunks_to_file(
+        context, concrete_client_without_context, tmp_file):
+    context.output = tmp_file
+    client = concrete_client_without_context(context)
+    client.output_stream(iter((b'\x00\x01', b'\xff')))
+    with open(tmp_file, 'rb') as file:
+        assert file.read() == b'\x00\x01\xff'
 
 
 def test_abstract_client_stat_and_output_should_call_stat_and_output_result(
@@ -74,3 +97,253 @@ def test_process_dict_for_display_should_join_dict_in_a_correct_way(
         concrete_client._process_dict_for_display(attributes)
         == expected_result
     )
+
+
+def test_abstract_client_stat_many_and_output_should_report_failures(
+        concrete_client, capfd):
+    def stat(uuid):
+        if uuid == 'missing':
+            raise ValueError('not here')
+        return {'name': uuid}
+
+    concrete_client.stat = stat
+    report = concrete_client.stat_many_and_output(
+        ['first', 'missing', 'second'], workers=1)
+    out, err = capfd.readouterr()
+    assert (report.succeeded, report.failed) == (2, 1)
+    assert 'uuid: first\nname: first\n\n' in out
+    assert 'uuid: second\nname: second\n\n' in out
+    assert 'missing: ValueError not here\n' in err
+    assert 'Processed 3 files in ' in err
+
+
+def test_abstract_client_stat_many_and_output_should_keep_stdout_to_records(
+        concrete_client, capfd):
+    def stat(uuid):
+        if uuid == 'missing':
+            ClientExceptionFileNotFound()
+        return {'name': uuid}
+
+    concrete_client.stat = stat
+    concrete_client.stat_many_and_output(
+        ['first', 'missing', 'second'], workers=1, output_format='csv')
+    out, err = capfd.readouterr()
+    assert out == (
+        'uuid,name,size,mimetype,create_datetime\n'
+        'first,first,,,\n'
+        'second,second,,,\n'
+    )
+    assert 'missing: File was not found on the remote server.\n' in err
+    with pytest.raises(ClientExceptionFileNotFound):
+        ClientExceptionFileNotFound()
+    assert capfd.readouterr().out == (
+        'File was not found on the remote server. \n')
+
+
+def test_abstract_client_stat_many_and_output_should_flush_every_record(
+        concrete_client, tmp_path, capfd):
+    path = tmp_path / 'records'
+    written = []
+
+    def uuids():
+        yield 'first'
+        deadline = time.monotonic() + 5
+        while not path.read_bytes() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        written.append(path.read_bytes())
+        yield 'second'
+
+    concrete_client.stat = lambda uuid: {'name': uuid}
+    concrete_client.output = str(path)
+    concrete_client.stat_many_and_output(uuids(), output_format='ndjson')
+    assert written == [b'{"uuid":"first","name":"first"}\n']
+
+
+def test_abstract_client_read_many_to_directory_should_write_files(
+        concrete_client, tmp_path, capfd):
+    def read(uuid):
+        if uuid == 'missing':
+            raise ValueError('not here')
+        return (f'content of {uuid}'.encode(), None, None)
+
+    concrete_client.read = read
+    report = concrete_client.read_many_to_directory(
+        ['first', 'missing', 'second', '../escaped'], tmp_path, workers=2)
+    _, err = capfd.readouterr()
+    assert (report.succeeded, report.failed) == (2, 2)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'first', 'second']
+    assert (tmp_path / 'first').read_bytes() == b'content of first'
+    assert 'missing: ValueError not here\n' in err
+    assert '../escaped: Invalid UUID entered. ../escaped\n' in err
+
+
+def test_abstract_client_read_to_file_should_not_leave_partial_file(
+        concrete_client, tmp_path):
+    def chunks():
+        yield b'partial'
+        raise ValueError('connection lost')
+
+    concrete_client.read_stream = MagicMock(return_value=ReadStream(chunks()))
+    with pytest.raises(ValueError):
+        concrete_client.read_to_file('uuid', str(tmp_path / 'uuid'))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_abstract_client_write_to_file_should_fail_short_stream(
+        concrete_client, tmp_path, capfd):
+    path = str(tmp_path / 'out')
+    with pytest.raises(ClientExceptionIntegrity):
+        concrete_client.write_to_file(iter([b'x' * 500]), path, 1000)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_abstract_client_read_and_output_should_write_output_file_in_place(
+        context, concrete_client_without_context, tmp_path):
+    context.output_path = str(tmp_path / 'file')
+    client = concrete_client_without_context(context)
+    client.stat = MagicMock(return_value={'size': 7})
+    client.read_stream = MagicMock(
+        return_value=ReadStream(iter((b'con', b'tent'))))
+    client.read_and_output('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert list(tmp_path.iterdir()) == [tmp_path / 'file']
+    assert (tmp_path / 'file').read_bytes() == b'content'
+
+
+def test_abstract_client_read_and_output_should_not_replace_file_unverified(
+        context, concrete_client_without_context, tmp_path):
+    (tmp_path / 'file').write_bytes(b'old')
+    context.output_path = str(tmp_path / 'file')
+    client = concrete_client_without_context(context)
+    client.stat = MagicMock(return_value={'size': 7})
+    client.read_stream = MagicMock(
+        return_value=ReadStream(iter((b'con', b'tent'))))
+    with pytest.raises(ClientExceptionIntegrity):
+        client.read_and_output(
+            '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', verify='0' * 64)
+    assert list(tmp_path.iterdir()) == [tmp_path / 'file']
+    assert (tmp_path / 'file').read_bytes() == b'old'
+
+
+@pytest.mark.parametrize(
+    'offset, length, expected_chunks', [
+        (0, None, [b'012', b'345', b'678']),
+        (4, None, [b'45', b'678']),
+        (2, 3, [b'2', b'34']),
+        (0, 0, []),
+        (20, None, []),
+    ]
+)
+def test_window_chunks_should_cut_the_window(offset, length,
+                                             expected_chunks):
+    assert list(window_chunks(
+        iter([b'012', b'345', b'678']), offset, length)) == expected_chunks
+
+
+def test_window_chunks_should_close_the_stream_once_complete():
+    pulled = []
+
+    def chunks():
+        for chunk in (b'012', b'345', b'678'):
+            pulled.append(chunk)
+            yield chunk
+
+    assert list(window_chunks(chunks(), 1, 3)) == [b'12', b'3']
+    assert pulled == [b'012', b'345']
+
+
+def test_abstract_client_read_window_stream_should_count_from_the_end(
+        concrete_client):
+    concrete_client.read = MagicMock(return_value=(b'0123456789', None, None))
+    concrete_client.stat = MagicMock(return_value={'size': 10})
+    stream = concrete_client.read_window_stream(
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', -3)
+    assert b''.join(stream.chunks) == b'789'
+
+
+def test_abstract_client_read_and_output_should_not_stat_for_stream(
+        concrete_client):
+    concrete_client.stat = MagicMock()
+    concrete_client.read = MagicMock(return_value=(b'content', None, None))
+    concrete_client.output_stream = MagicMock()
+    concrete_client.read_and_output('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert concrete_client.stat.call_count == 0
+
+
+def test_abstract_client_read_and_output_should_buffer_small_files(
+        context, concrete_client_without_context):
+    context.strategy = 'auto'
+    client = concrete_client_without_context(context)
+    client.stat = MagicMock(return_value={'size': 7})
+    client.read = MagicMock(return_value=(b'content', None, None))
+    client.read_stream = MagicMock()
+    client.output_stream = MagicMock()
+    client.read_and_output('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert client.read_stream.call_count == 0
+    assert list(client.output_stream.call_args.args[0]) == [b'content']
+
+
+def test_abstract_client_read_and_output_should_use_ranges_for_large_files(
+        context, concrete_client_without_context, tmp_path):
+    context.strategy = 'auto'
+    context.buffered_max_size = 512
+    context.ranges_min_size = 1024
+    context.range_connections = 3
+    context.output_path = str(tmp_path / 'file')
+    client_class = concrete_client_without_context
+    client_class.read_ranges_to_file = MagicMock()
+    client = client_class(context)
+    client.stat = MagicMock(return_value={'size': 2048})
+    client.read_and_output('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    client_class.read_ranges_to_file.assert_called_once_with(
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', str(tmp_path / 'file'), 3,
+        size=2048)
+
+
+def test_abstract_client_cached_stat_should_share_concurrent_requests(
+        concrete_client):
+    release = threading.Event()
+    calls = []
+
+    def stat(uuid):
+        calls.append(uuid)
+        release.wait()
+        return {'name': uuid}
+
+    concrete_client.stat = stat
+    threads = [
+        threading.Thread(target=concrete_client.cached_stat, args=('same', ))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    while concrete_client.flights.shared < 3:
+        release.wait(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == ['same']
+
+
+def test_abstract_client_read_many_to_directory_should_share_duplicates(
+        concrete_client, tmp_path, capfd):
+    release = threading.Event()
+    calls = []
+
+    def read(uuid):
+        calls.append(uuid)
+        release.wait()
+        return (b'content', None, None)
+
+    def release_once_shared():
+        while concrete_client.flights.shared < 1:
+            release.wait(0.001)
+        release.set()
+
+    concrete_client.read = read
+    threading.Thread(target=release_once_shared, daemon=True).start()
+    report = concrete_client.read_many_to_directory(
+        ['same', 'same'], str(tmp_path), workers=2)
+    assert (report.succeeded, report.failed) == (2, 0)
+    assert calls == ['same']
+    assert (tmp_path / 'same').read_bytes() == b'content'
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+from file_client.backend_clients.coalesce import SingleFlight
+
+
+def run_concurrently(flight, function, callers):
+    started = threading.Barrier(callers + 1)
+    results = []
+
+    def call():
+        started.wait()
+        try:
+            results.append(flight.call('key', function))
+        except ValueError as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return started, threads, results
+
+
+def test_single_flight_should_share_a_call_among_concurrent_callers():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def function():
+        calls.append(1)
+        release.wait()
+        return 'result'
+
+    started, threads, results = run_concurrently(flight, function, 4)
+    started.wait()
+    while flight.shared < 3:
+        release.wait(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == ['result'] * 4
+
+
+def test_single_flight_should_share_the_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def function():
+        release.wait()
+        raise ValueError('broken')
+
+    started, threads, results = run_concurrently(flight, function, 3)
+    started.wait()
+    while flight.shared < 2:
+        release.wait(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert [str(result) for result in results] == ['broken'] * 3
+
+
+def test_single_flight_should_not_share_finished_calls():
+    flight = SingleFlight()
+    calls = []
+    assert flight.call('key', calls.append, 1) is None
+    assert flight.call('key', calls.append, 2) is None
+    assert calls == [1, 2]
+    assert flight.shared == 0
+    with pytest.raises(KeyError):
+        flight.call('key', {}.__getitem__, 'missing')
+    assert flight.call('key', len, 'ok') == 2
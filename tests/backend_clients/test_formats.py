@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from file_client.backend_clients.formats import (CSVFormatter,
+                                                 NDJSONFormatter,
+                                                 TextFormatter, format_text,
+                                                 get_formatter,
+                                                 normalize_datetime)
+
+
+@pytest.mark.parametrize(
+    'value, expected_value', [
+        ('2020-01-01T00:00:00Z', '2020-01-01T00:00:00Z'),
+        ('2020-01-01T00:00:00.123456789Z', '2020-01-01T00:00:00.123456Z'),
+        ('2020-01-01T00:00:00.5Z', '2020-01-01T00:00:00.500000Z'),
+        ('2020-01-01T02:00:00+02:00', '2020-01-01T00:00:00Z'),
+        ('2020-01-01T00:00:00.250', '2020-01-01T00:00:00.250000Z'),
+        ('2020-01-01', '2020-01-01T00:00:00Z'),
+        ('yesterday', 'yesterday'),
+        ('', ''),
+        (None, None),
+    ]
+)
+def test_normalize_datetime_should_return_utc_with_z_suffix(
+        value, expected_value):
+    assert normalize_datetime(value) == expected_value
+
+
+def test_text_formatter_should_prefix_record_with_uuid():
+    assert TextFormatter().record('u', {
+        'name': 'a.txt', 'create_datetime': '2020-01-01'}) == (
+        b'uuid: u\nname: a.txt\ncreate_datetime: 2020-01-01\n\n')
+
+
+def test_format_text_should_keep_backend_values():
+    assert format_text({
+        'create_datetime': '2020-01-01T01:00:00+01:00', 'size': 3}) == (
+        'create_datetime: 2020-01-01T01:00:00+01:00\nsize: 3')
+
+
+def test_ndjson_formatter_should_write_one_object_per_line():
+    formatter = NDJSONFormatter()
+    assert formatter.header() == b''
+    line = formatter.record('u', {
+        'name': 'fïle "a".txt', 'size': 3,
+        'create_datetime': '2020-01-01T00:00:00+00:00'})
+    assert line.endswith(b'\n') and line.count(b'\n') == 1
+    assert json.loads(line) == {
+        'uuid': 'u', 'name': 'fïle "a".txt', 'size': 3,
+        'create_datetime': '2020-01-01T00:00:00Z'}
+
+
+def test_csv_formatter_should_write_header_and_quoted_rows():
+    formatter = CSVFormatter()
+    assert formatter.header() == (
+        b'uuid,name,size,mimetype,create_datetime\n')
+    assert formatter.record('u', {
+        'name': 'a,b.txt', 'size': 3, 'mimetype': 'text/plain',
+        'extra': 'ignored'}) == b'u,"a,b.txt",3,text/plain,\n'
+    assert formatter.record('v', {'size': 1}) == b'v,,1,,\n'
+
+
+def test_get_formatter_should_reject_unknown_format():
+    with pytest.raises(ValueError):
+        get_formatter('xml')
@@ -0,0 +1,267 @@
+import grpc
+import pytest
+from file_client.backend_clients.client_exceptions import (
+    ClientException, ClientExceptionFailedPrecondition,
+    ClientExceptionFileNotFound, ClientExceptionInvalidArgument,
+    ClientExceptionUnavailable)
+from file_client.backend_clients.grpc_client.channel_pool import (
+    ChannelPool, channel_options)
+from file_client.backend_clients.grpc_client.grpc_client import GRPCClient
+from file_client.backend_clients.grpc_client.service_file_pb2 import (
+    ReadReply, StatReply)
+from tests.helpers.fixtures import context  # noqa: F401
+from unittest.mock import MagicMock
+
+
+class MockedRpcError(grpc.RpcError):
+
+    def __init__(self, code, details=''):
+        self._code = code
+        self._details = details
+
+    def code(self):
+        return self._code
+
+    def details(self):
+        return self._details
+
+
+def read_replies(*chunks):
+    return iter([ReadReply(data=ReadReply.Data(data=chunk))
+                 for chunk in chunks])
+
+
+@pytest.fixture
+def grpc_client(context):
+    client = GRPCClient(context)
+    client.stub = MagicMock()
+    client.channel_pools[0].stubs = [client.stub]
+    return client
+
+
+def test_grpc_client_read_should_send_uuid_and_chunk_size(
+        context, grpc_client):
+    grpc_client.stub.read.return_value = read_replies(b'content')
+    grpc_client.read('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    request = grpc_client.stub.read.call_args.args[0]
+    assert request.uuid.value == '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o'
+    assert request.size == context.chunk_size
+
+
+def test_grpc_client_read_should_join_chunks(grpc_client):
+    grpc_client.stub.read.return_value = read_replies(b'con', b'tent')
+    assert grpc_client.read('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o') == (
+        b'content', None, None)
+
+
+def test_grpc_client_read_and_output_should_write_chunks_as_they_arrive(
+        grpc_client):
+    writes_seen_by_server = []
+    grpc_client._open_binary_output = MagicMock()
+    file = grpc_client._open_binary_output.return_value.__enter__.return_value
+
+    def replies():
+        for chunk in (b'first ', b'second'):
+            yield ReadReply(data=ReadReply.Data(data=chunk))
+            writes_seen_by_server.append(file.write.call_count)
+
+    grpc_client.stub.read.return_value = replies()
+    grpc_client.read_and_output('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert writes_seen_by_server == [1, 2]
+
+
+def test_grpc_client_stat_should_return_file_metadata(grpc_client):
+    reply = StatReply(data=StatReply.Data(
+        size=12345, mimetype='text/plain', name='file.txt'))
+    reply.data.create_datetime.FromJsonString('2020-01-01T00:00:00Z')
+    grpc_client.stub.stat.return_value = reply
+    assert grpc_client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o') == {
+        'create_datetime': '2020-01-01T00:00:00Z',
+        'size': 12345,
+        'mimetype': 'text/plain',
+        'name': 'file.txt',
+    }
+
+
+@pytest.mark.parametrize(
+    'code, exception_class', [
+        (grpc.StatusCode.INVALID_ARGUMENT, ClientExceptionInvalidArgument),
+        (grpc.StatusCode.NOT_FOUND, ClientExceptionFileNotFound),
+        (grpc.StatusCode.FAILED_PRECONDITION,
+         ClientExceptionFailedPrecondition),
+        (grpc.StatusCode.INTERNAL, ClientException),
+    ]
+)
+def test_grpc_client_should_map_status_codes_to_client_exceptions(
+        grpc_client, code, exception_class):
+    grpc_client.stub.stat.side_effect = MockedRpcError(code)
+    with pytest.raises(exception_class):
+        grpc_client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+
+    def failing_replies():
+        yield ReadReply(data=ReadReply.Data(data=b'partial'))
+        raise MockedRpcError(code)
+
+    grpc_client.stub.read.return_value = failing_replies()
+    with pytest.raises(exception_class):
+        grpc_client.read('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+
+
+def test_grpc_client_should_pass_call_options(context):
+    context.grpc_wait_for_ready = True
+    client = GRPCClient(context)
+    client.channel_pools[0].stubs = [MagicMock()]
+    client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    call = client.channel_pools[0].stubs[0].stat.call_args
+    assert call.kwargs == {'wait_for_ready': True, 'timeout': 60.0}
+
+
+def test_grpc_client_should_retry_unavailable_stat(grpc_client):
+    grpc_client.retry_policy.backoff = 0
+    grpc_client.stub.stat.side_effect = [
+        MockedRpcError(grpc.StatusCode.UNAVAILABLE),
+        StatReply(data=StatReply.Data(size=3)),
+    ]
+    reply = grpc_client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert reply['size'] == 3
+    assert grpc_client.stub.stat.call_count == 2
+    assert grpc_client._retries.count == 1
+
+
+def test_grpc_client_should_give_up_after_retries(grpc_client):
+    grpc_client.retry_policy.backoff = 0
+    grpc_client.stub.stat.side_effect = MockedRpcError(
+        grpc.StatusCode.UNAVAILABLE)
+    with pytest.raises(ClientExceptionUnavailable):
+        grpc_client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert grpc_client.stub.stat.call_count == 3
+
+
+def test_grpc_client_should_retry_read_before_first_chunk(grpc_client):
+    grpc_client.retry_policy.backoff = 0
+
+    def failing_replies():
+        raise MockedRpcError(grpc.StatusCode.UNAVAILABLE)
+        yield
+
+    grpc_client.stub.read.side_effect = [
+        failing_replies(), read_replies(b'data')]
+    assert grpc_client.read('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')[0] == (
+        b'data')
+    assert grpc_client.stub.read.call_count == 2
+
+
+def test_channel_options_should_map_context_options(context):
+    assert channel_options(context) == []
+    context.grpc_keepalive_ms = 10000
+    context.grpc_max_message_size = 1024
+    context.grpc_initial_window = 2048
+    assert dict(channel_options(context)) == {
+        'grpc.keepalive_time_ms': 10000,
+        'grpc.keepalive_permit_without_calls': 1,
+        'grpc.max_receive_message_length': 1024,
+        'grpc.http2.lookahead_bytes': 2048,
+        'grpc.http2.bdp_probe': 0,
+    }
+
+
+def test_channel_options_should_limit_reply_compression(context):
+    context.compression = False
+    assert channel_options(context) == [
+        ('grpc.compression_enabled_algorithms_bitset', 1)]
+    context.grpc_compression = 'gzip'
+    assert channel_options(context) == [
+        ('grpc.compression_enabled_algorithms_bitset', 5)]
+
+
+def test_channel_pool_should_hand_out_stubs_round_robin():
+    pool = ChannelPool('localhost:50051', size=3)
+    stubs = [pool.next_stub() for _ in range(6)]
+    assert len(pool.channels) == 3
+    assert stubs == pool.stubs * 2
+    pool.close()
+
+
+def test_grpc_client_should_fail_over_to_another_server(context):
+    context.grpc_server = 'first:50051,second:50051'
+    client = GRPCClient(context)
+    first, second = MagicMock(), MagicMock()
+    first.stat.side_effect = MockedRpcError(grpc.StatusCode.UNAVAILABLE)
+    second.stat.return_value = StatReply(data=StatReply.Data(size=3))
+    client.channel_pools[0].stubs = [first]
+    client.channel_pools[1].stubs = [second]
+    reply = client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert reply['size'] == 3
+    assert (first.stat.call_count, second.stat.call_count) == (1, 1)
+    client.close()
+
+
+def test_grpc_client_should_fail_over_from_stuck_server(context):
+    context.grpc_server = 'first:50051,second:50051'
+    context.read_timeout = 0.5
+    client = GRPCClient(context)
+    first, second = MagicMock(), MagicMock()
+    first.stat.side_effect = MockedRpcError(
+        grpc.StatusCode.DEADLINE_EXCEEDED, 'Deadline Exceeded')
+    second.stat.return_value = StatReply(data=StatReply.Data(size=3))
+    client.channel_pools[0].stubs = [first]
+    client.channel_pools[1].stubs = [second]
+    reply = client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert reply['size'] == 3
+    assert first.stat.call_args.kwargs['timeout'] == 0.5
+    assert client.balancer.endpoints[0].failures == 1
+    client.close()
+
+
+def test_grpc_client_should_fail_over_without_retries(context, capfd):
+    context.grpc_server = 'first:50051,second:50051'
+    context.retries = 0
+    client = GRPCClient(context)
+    first, second = MagicMock(), MagicMock()
+    first.stat.side_effect = MockedRpcError(grpc.StatusCode.UNAVAILABLE)
+    second.stat.side_effect = MockedRpcError(grpc.StatusCode.UNAVAILABLE)
+    client.channel_pools[0].stubs = [first]
+    client.channel_pools[1].stubs = [second]
+    with pytest.raises(ClientExceptionUnavailable):
+        client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert (first.stat.call_count, second.stat.call_count) == (1, 1)
+    client.close()
+
+
+def test_grpc_client_read_stream_if_modified_should_measure_stat(
+        grpc_client):
+    reply = StatReply(data=StatReply.Data(size=7))
+    reply.data.create_datetime.FromJsonString('2020-01-01T00:00:00Z')
+    grpc_client.stub.stat.return_value = reply
+    operations = []
+    grpc_client.add_hook(lambda metrics: operations.append(
+        metrics.operation))
+    stream, validators = grpc_client.read_stream_if_modified(
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o',
+        {'size': 7, 'create_datetime': '2020-01-01T00:00:00Z'})
+    assert stream is None
+    assert operations == ['stat']
+    assert grpc_client.stub.read.call_count == 0
+
+
+def test_grpc_client_read_window_stream_should_cancel_the_rest(grpc_client):
+    call = MagicMock()
+    call.__iter__.return_value = read_replies(b'01234', b'56789', b'abcde')
+    grpc_client.stub.read.return_value = call
+    grpc_client.chunk_size = 5
+    stream = grpc_client.read_window_stream(
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', 3, 4)
+    assert b''.join(stream.chunks) == b'3456'
+    assert call.cancel.call_count == 1
+    assert grpc_client.balancer.endpoints[0].outstanding == 0
+
+
+def test_grpc_client_read_window_stream_should_ask_for_one_reply_of_head(
+        grpc_client):
+    call = MagicMock()
+    call.__iter__.return_value = read_replies(b'head')
+    grpc_client.stub.read.return_value = call
+    stream = grpc_client.read_window_stream(
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', 0, 4)
+    assert list(stream.chunks) == [b'head']
+    assert grpc_client.stub.read.call_args.args[0].size == 4
@@ -0,0 +1,59 @@
+import hashlib
+
+import pytest
+from file_client.backend_clients.client import ReadStream
+from file_client.backend_clients.client_exceptions import (
+    ClientExceptionIntegrity)
+from file_client.backend_clients.integrity import (ChunkHasher,
+                                                   check_integrity)
+from tests.helpers.fixtures import context, concrete_client  # noqa: F401
+from tests.helpers.fixtures import concrete_client_without_context  # noqa
+from unittest.mock import MagicMock
+
+
+def test_chunk_hasher_should_hash_chunks_passed_through():
+    chunks = [b'first', b'', b'second' * 10000]
+    hasher = ChunkHasher('sha256', queue_size=1)
+    assert list(hasher.tee(iter(chunks))) == chunks
+    assert hasher.hexdigest() == hashlib.sha256(b''.join(chunks)).hexdigest()
+    assert hasher.size == 60005
+
+
+def test_chunk_hasher_should_stop_worker_if_stream_fails():
+    def failing_chunks():
+        yield b'data'
+        raise ValueError()
+
+    hasher = ChunkHasher('md5')
+    with pytest.raises(ValueError):
+        list(hasher.tee(failing_chunks()))
+    assert not hasher._thread.is_alive()
+
+
+def test_check_integrity_should_raise_on_mismatch(capfd):
+    check_integrity('u', 3, 3, 'ABC', 'abc')
+    check_integrity('u', 3, None, 'abc', None)
+    with pytest.raises(ClientExceptionIntegrity):
+        check_integrity('u', 2, 3, 'abc', None)
+    with pytest.raises(ClientExceptionIntegrity):
+        check_integrity('u', 3, 3, 'abc', 'abd')
+
+
+def test_client_read_and_output_should_print_checksum(concrete_client, capfd):
+    concrete_client.stat = MagicMock(return_value={'size': 7})
+    concrete_client.read_stream = MagicMock(
+        return_value=ReadStream(iter((b'con', b'tent'))))
+    concrete_client.read_and_output('u', checksum='sha1')
+    out, err = capfd.readouterr()
+    assert out == 'content'
+    assert err == f'{hashlib.sha1(b"content").hexdigest()}  u\n'
+
+
+def test_client_read_and_output_should_fail_on_short_content(
+        concrete_client, capfd):
+    concrete_client.stat = MagicMock(return_value={'size': 8})
+    concrete_client.read_stream = MagicMock(
+        return_value=ReadStream(iter((b'content', ))))
+    with pytest.raises(ClientExceptionIntegrity):
+        concrete_client.read_and_output(
+            'u', verify=hashlib.sha256(b'content').hexdigest())
@@ -0,0 +1,97 @@
+import time
+
+import grpc
+import pytest
+import requests
+from file_client.backend_clients.grpc_client.grpc_client import (
+    process_rpc_error)
+from file_client.backend_clients.rest_client.rest_client import RESTClient
+from file_client.backend_clients.client_exceptions import (
+    ClientExceptionFailedPrecondition, ClientExceptionFileNotFound,
+    ClientExceptionUnavailable)
+from file_client.backend_clients.limiter import AdaptiveLimiter, is_overload
+from tests.helpers.fixtures import context  # noqa: F401
+
+
+def test_is_overload_should_match_failed_precondition_and_unavailable():
+    exceptions = []
+    for exception_class in (ClientExceptionFailedPrecondition,
+                            ClientExceptionUnavailable,
+                            ClientExceptionFileNotFound):
+        with pytest.raises(exception_class) as exception_info:
+            exception_class()
+        exceptions.append(exception_info.value)
+    assert [is_overload(exception) for exception in exceptions] == [
+        True, True, False]
+    assert not is_overload(None)
+
+
+class MockedRpcError(grpc.RpcError):
+
+    def __init__(self, code):
+        self._code = code
+
+    def code(self):
+        return self._code
+
+    def details(self):
+        return self._code.name
+
+
+@pytest.mark.parametrize('code', [
+    grpc.StatusCode.RESOURCE_EXHAUSTED, grpc.StatusCode.DEADLINE_EXCEEDED])
+def test_is_overload_should_match_grpc_overload_codes(code, capfd):
+    with pytest.raises(Exception) as exception_info:
+        process_rpc_error(MockedRpcError(code))
+    assert is_overload(exception_info.value)
+
+
+def test_is_overload_should_match_rest_read_timeout(context, capfd):
+    with pytest.raises(Exception) as exception_info:
+        RESTClient(context)._process_http_error(
+            requests.exceptions.ReadTimeout('timed out'))
+    assert is_overload(exception_info.value)
+
+
+def test_adaptive_limiter_should_grow_while_latency_is_flat():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=10)
+    for _ in range(20):
+        limiter.record(time.monotonic(), 0.01)
+    assert limiter.limit == 10
+    assert limiter.peak == 10
+
+
+def test_adaptive_limiter_should_grow_additively_after_backing_off():
+    limiter = AdaptiveLimiter(initial_limit=8, max_limit=100)
+    limiter.record(time.monotonic(), 0.01, overloaded=True)
+    assert limiter.limit == 4
+    for _ in range(4):
+        limiter.record(time.monotonic(), 0.01)
+    assert limiter.limit == 4
+    limiter.record(time.monotonic(), 0.01)
+    assert limiter.limit == 5
+
+
+def test_adaptive_limiter_should_back_off_once_per_round_trip():
+    limiter = AdaptiveLimiter(initial_limit=16)
+    started = time.monotonic()
+    limiter.record(started, 0.01, overloaded=True)
+    limiter.record(started, 0.01, overloaded=True)
+    assert limiter.limit == 8
+    limiter.record(time.monotonic(), 0.01, overloaded=True)
+    assert limiter.limit == 4
+
+
+def test_adaptive_limiter_should_not_go_below_one():
+    limiter = AdaptiveLimiter(initial_limit=1)
+    limiter.record(time.monotonic(), 0.01, overloaded=True)
+    assert limiter.limit == 1
+
+
+def test_adaptive_limiter_should_stop_growing_when_latency_rises():
+    limiter = AdaptiveLimiter(initial_limit=4)
+    limiter.record(time.monotonic(), 0.01)
+    for _ in range(10):
+        limiter.record(time.monotonic(), 1.0)
+    assert limiter.limit == 5
+    assert not limiter.slow_start
@@ -0,0 +1,97 @@
+import io
+import json
+
+import pytest
+from file_client.backend_clients.client import ReadStream
+from file_client.backend_clients.metrics import (CallMetrics, Histogram,
+                                                 MetricsRecorder)
+from tests.helpers.fixtures import context, concrete_client  # noqa: F401
+from tests.helpers.fixtures import concrete_client_without_context  # noqa
+from unittest.mock import MagicMock
+
+
+def test_histogram_should_estimate_percentiles_by_buckets():
+    histogram = Histogram()
+    for milliseconds in [1] * 98 + [50, 1000]:
+        histogram.add(milliseconds / 1000)
+    summary = histogram.as_dict()
+    assert summary['count'] == 100
+    assert summary['min_ms'] == 1
+    assert summary['max_ms'] == 1000
+    assert summary['p50_ms'] == pytest.approx(1.6)
+    assert summary['p99_ms'] == pytest.approx(51.2)
+    assert summary['buckets_ms'] == {'<=1.6': 98, '<=51.2': 1, '<=1638.4': 1}
+
+
+def test_metrics_recorder_should_aggregate_per_operation():
+    recorder = MetricsRecorder()
+    for operation, size, error in (
+            ('read', 10, None), ('read', 5, 'failed'), ('stat', 0, None)):
+        metrics = CallMetrics(operation, 'grpc', 'uuid')
+        metrics.bytes = size
+        metrics.error = error
+        metrics.finish()
+        recorder(metrics)
+    file = io.StringIO()
+    recorder.write_json(file)
+    summary = json.loads(file.getvalue())['operations']
+    assert summary['read']['calls'] == 2
+    assert summary['read']['errors'] == 1
+    assert summary['read']['bytes'] == 15
+    assert summary['read']['total']['count'] == 2
+    assert summary['read']['connect']['count'] == 0
+    assert summary['stat']['calls'] == 1
+
+
+def test_metrics_recorder_should_count_transfer_strategies():
+    recorder = MetricsRecorder()
+    for strategy in ('buffered', 'stream', 'buffered', None):
+        metrics = CallMetrics('read', 'rest', 'uuid')
+        metrics.strategy = strategy
+        metrics.finish()
+        recorder(metrics)
+    assert recorder.summary()['read']['strategies'] == {
+        'buffered': 2, 'stream': 1}
+
+
+def test_client_should_emit_metrics_of_consumed_read(concrete_client):
+    hook = MagicMock()
+    concrete_client.add_hook(hook)
+    concrete_client.read_stream = MagicMock(
+        return_value=ReadStream(iter((b'con', b'tent'))))
+    stream = concrete_client.measured_read_stream('uuid')
+    assert hook.call_count == 0
+    assert list(stream.chunks) == [b'con', b'tent']
+    metrics = hook.call_args.args[0]
+    assert (metrics.operation, metrics.uuid) == ('read', 'uuid')
+    assert (metrics.bytes, metrics.chunks, metrics.error) == (7, 2, None)
+    assert metrics.time_to_first_byte <= metrics.total
+
+
+def test_client_should_emit_metrics_of_failed_stat(concrete_client):
+    hook = MagicMock()
+    concrete_client.add_hook(hook)
+    concrete_client.stat = MagicMock(side_effect=ValueError('broken'))
+    with pytest.raises(ValueError):
+        concrete_client.cached_stat('uuid')
+    metrics = hook.call_args.args[0]
+    assert metrics.operation == 'stat'
+    assert metrics.error == 'ValueError broken'
+
+
+def test_client_should_emit_retries_of_hedged_stat(
+        context, concrete_client_without_context):
+    context.hedge = True
+    context.hedge_after = 1
+    client = concrete_client_without_context(context)
+    hook = MagicMock()
+    client.add_hook(hook)
+
+    def stat(uuid):
+        client._count_retry()
+        return {'size': 1}
+
+    client.stat = stat
+    assert client.cached_stat('uuid') == {'size': 1}
+    assert hook.call_args.args[0].retries == 1
+    client.close()
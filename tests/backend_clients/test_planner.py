@@ -0,0 +1,47 @@
+import pytest
+from file_client.backend_clients.planner import (AUTO, BUFFERED, CACHED,
+                                                 RANGES, STREAM,
+                                                 TransferPlanner,
+                                                 is_compressible)
+
+
+@pytest.mark.parametrize(
+    'mimetype, expected', [
+        ('text/plain; charset=utf-8', True),
+        ('application/json', True),
+        ('application/ld+json', True),
+        ('application/zip', False),
+        (None, False),
+    ]
+)
+def test_is_compressible_should_match_text(mimetype, expected):
+    assert is_compressible(mimetype) is expected
+
+
+@pytest.mark.parametrize(
+    'attributes, cached, ranges, expected', [
+        ({'size': 200}, False, True, BUFFERED),
+        ({'size': 1024}, False, True, STREAM),
+        ({'size': 4096}, False, True, RANGES),
+        ({'size': 4096}, False, False, STREAM),
+        ({'size': 4096, 'mimetype': 'text/csv'}, False, True, STREAM),
+        ({'size': 200}, True, True, CACHED),
+        ({}, False, True, STREAM),
+    ]
+)
+def test_transfer_planner_should_choose_by_size(attributes, cached, ranges,
+                                                expected):
+    planner = TransferPlanner(AUTO, buffered_max_size=256,
+                              ranges_min_size=4096)
+    assert planner.choose(attributes, cached, ranges,
+                          compression=True) == expected
+
+
+def test_transfer_planner_should_keep_a_given_strategy():
+    planner = TransferPlanner(BUFFERED)
+    assert planner.choose({'size': 10 ** 12}, cached=True) == BUFFERED
+
+
+def test_transfer_planner_should_reject_unknown_strategy():
+    with pytest.raises(ValueError):
+        TransferPlanner('teleport')
@@ -3,12 +3,15 @@ import requests
 import responses
 from click.testing import CliRunner
 from file_client.backend_clients.client_exceptions import (
-    ClientException, ClientExceptionFileNotFound, ClientExceptionInvalidURL)
+    ClientException, ClientExceptionFileNotFound, ClientExceptionInvalidURL,
+    ClientExceptionUnavailable)
 from file_client.backend_clients.rest_client.rest_client import RESTClient
 from file_client.cli import cli
 from tests.helpers.fixtures import context  # noqa: F401
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
+import gzip
 import json
+import os
 
 
 @pytest.fixture
@@ -154,7 +157,8 @@ def test_process_http_error_should_raise_client_exception_if_not_404(
 def test_process_http_error_should_raise_client_exception_if_not_HTTPError(
         context, capfd):
     client = RESTClient(context)
-    exception = requests.exceptions.Timeout(response=requests.Response())
+    exception = requests.exceptions.TooManyRedirects(
+        response=requests.Response())
     exception.response.status_code = 404
     with pytest.raises(ClientException):
         client._process_http_error(exception)
@@ -259,3 +263,378 @@ def test_rest_client_read_should_return_correct_file_content(
     )
     result = client.read('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
     assert result == (file_content, content_disposition, content_type)
+
+
+def test_rest_client_read_stream_should_iterate_body_in_chunks(
+        context, mocked_responses):
+    context.chunk_size = 4
+    client = RESTClient(context)
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/read/',
+        body=b'0123456789',
+        status=200,
+        headers={
+            'Content-Disposition': 'inline; filename="file.txt"',
+            'Content-Type': 'text/plain',
+        },
+    )
+    stream = client.read_stream('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert stream.content_disposition == 'inline; filename="file.txt"'
+    assert stream.content_type == 'text/plain'
+    assert list(stream.chunks) == [b'0123', b'4567', b'89']
+
+
+def test_rest_client_read_stream_should_process_http_errors_before_body(
+        context, mocked_responses):
+    client = RESTClient(context)
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/read/',
+        body='',
+        status=404,
+    )
+    with pytest.raises(ClientExceptionFileNotFound):
+        client.read_stream('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+
+
+def test_rest_client_read_command_should_output_body_unchanged(
+        mocked_responses):
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/read/',
+        body=b'\x00binary\xff',
+        status=200,
+        headers={'Content-Type': 'application/octet-stream'},
+    )
+    result = CliRunner().invoke(
+        cli,
+        '--backend rest read --chunk-size 3 '
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o'
+    )
+    assert result.exit_code == 0
+    assert result.stdout_bytes == b'\x00binary\xff'
+
+
+def test_rest_client_should_reuse_one_session_with_timeouts(
+        context, mocked_responses):
+    context.connect_timeout = 1.5
+    context.read_timeout = 7.0
+    client = RESTClient(context)
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/stat/',
+        body='{}',
+        status=200,
+    )
+    client.session = MagicMock(wraps=client.session)
+    client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert client.session.get.call_count == 2
+    for call in mocked_responses.calls:
+        assert call.request.req_kwargs['timeout'] == (1.5, 7.0)
+        assert call.request.headers['Connection'] == 'keep-alive'
+
+
+def test_rest_client_should_size_the_connection_pool(context):
+    context.http_pool_size = 42
+    client = RESTClient(context)
+    adapter = client.session.get_adapter('https://localhost/')
+    assert adapter._pool_maxsize == 42
+
+
+def test_rest_client_should_close_connections_without_keep_alive(
+        context, mocked_responses):
+    context.keep_alive = False
+    client = RESTClient(context)
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/stat/',
+        body='{}',
+        status=200,
+    )
+    client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert mocked_responses.calls[0].request.headers['Connection'] == 'close'
+
+
+def test_rest_client_read_stream_if_modified_should_revalidate(
+        context, mocked_responses):
+    client = RESTClient(context)
+    url = 'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/read/'
+    mocked_responses.get(
+        url,
+        status=304,
+        match=[responses.matchers.header_matcher({
+            'If-None-Match': '"v1"',
+            'If-Modified-Since': 'Wed, 01 Jan 2020 00:00:00 GMT',
+        })],
+    )
+    mocked_responses.get(
+        url,
+        body=b'content',
+        status=200,
+        headers={'ETag': '"v2"'},
+    )
+    validators = {'etag': '"v1"',
+                  'last_modified': 'Wed, 01 Jan 2020 00:00:00 GMT'}
+    stream, returned_validators = client.read_stream_if_modified(
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', validators)
+    assert stream is None
+    assert returned_validators == validators
+    stream, returned_validators = client.read_stream_if_modified(
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', {'etag': '"v0"'})
+    assert list(stream.chunks) == [b'content']
+    assert returned_validators == {'etag': '"v2"', 'last_modified': None}
+
+
+def mock_range_server(mocked_responses, content, fail_ranges=()):
+    base = 'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/'
+    mocked_responses.get(
+        base + 'stat/',
+        body=json.dumps({'size': len(content)}),
+        status=200,
+    )
+    requested_ranges = []
+
+    def read(request):
+        byte_range = request.headers['Range']
+        requested_ranges.append(byte_range)
+        if byte_range in fail_ranges:
+            return (503, {}, b'')
+        start, end = map(int, byte_range[len('bytes='):].split('-'))
+        return (206, {}, content[start:end + 1])
+
+    mocked_responses.add_callback(responses.GET, base + 'read/', read)
+    return requested_ranges
+
+
+def test_rest_client_read_ranges_to_file_should_download_ranges(
+        context, mocked_responses, tmp_path):
+    content = bytes(range(256)) * 4
+    requested_ranges = mock_range_server(mocked_responses, content)
+    client = RESTClient(context)
+    path = str(tmp_path / 'file')
+    client.read_ranges_to_file(
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', path, connections=3,
+        range_size=300)
+    assert sorted(requested_ranges) == [
+        'bytes=0-299', 'bytes=300-599', 'bytes=600-899', 'bytes=900-1023']
+    assert (tmp_path / 'file').read_bytes() == content
+    assert os.listdir(tmp_path) == ['file']
+
+
+def test_rest_client_read_and_output_should_stat_once_for_ranges(
+        context, mocked_responses, tmp_path):
+    content = bytes(range(256)) * 4
+    mock_range_server(mocked_responses, content)
+    context.strategy = 'auto'
+    context.buffered_max_size = 512
+    context.ranges_min_size = 1024
+    context.output_path = str(tmp_path / 'file')
+    client = RESTClient(context)
+    client.read_and_output('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert (tmp_path / 'file').read_bytes() == content
+    stat_calls = [
+        call for call in mocked_responses.calls
+        if call.request.url.endswith('/stat/')
+    ]
+    assert len(stat_calls) == 1
+
+
+def test_rest_client_read_ranges_to_file_should_resume_missing_ranges(
+        context, mocked_responses, tmp_path, capfd):
+    content = b'0123456789' * 10
+    mock_range_server(mocked_responses, content, fail_ranges=('bytes=40-59', ))
+    client = RESTClient(context)
+    path = str(tmp_path / 'file')
+    with pytest.raises(ClientException):
+        client.read_ranges_to_file(
+            '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', path, connections=2,
+            range_size=20)
+    assert not os.path.exists(path)
+
+    mocked_responses.reset()
+    requested_ranges = mock_range_server(mocked_responses, content)
+    client.read_ranges_to_file(
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', path, connections=2,
+        range_size=20)
+    assert requested_ranges == ['bytes=40-59']
+    assert (tmp_path / 'file').read_bytes() == content
+    assert os.listdir(tmp_path) == ['file']
+
+
+def test_rest_client_read_ranges_to_file_should_require_range_support(
+        context, mocked_responses, tmp_path, capfd):
+    base = 'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/'
+    mocked_responses.get(base + 'stat/', body='{"size": 10}', status=200)
+    mocked_responses.get(base + 'read/', body=b'0123456789', status=200)
+    client = RESTClient(context)
+    with pytest.raises(ClientException) as exception_info:
+        client.read_ranges_to_file(
+            '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', str(tmp_path / 'file'))
+    assert str(exception_info.value) == (
+        'The server does not support range requests.')
+
+
+def test_rest_client_should_retry_unavailable_server(
+        context, mocked_responses):
+    client = RESTClient(context)
+    client.retry_policy.backoff = 0
+    url = 'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/stat/'
+    mocked_responses.get(url, status=503)
+    mocked_responses.get(url, json={'size': 3}, status=200)
+    assert client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o') == {'size': 3}
+    assert len(mocked_responses.calls) == 2
+
+
+def test_rest_client_should_raise_unavailable_after_retries(
+        context, mocked_responses, capfd):
+    client = RESTClient(context)
+    client.retry_policy.backoff = 0
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/read/',
+        body=requests.exceptions.ConnectionError('refused'),
+    )
+    with pytest.raises(ClientExceptionUnavailable):
+        client.read_stream('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert len(mocked_responses.calls) == 3
+    out, _ = capfd.readouterr()
+    assert out == 'The remote service is unavailable. refused\n'
+
+
+def test_rest_client_should_not_retry_missing_file(context, mocked_responses):
+    client = RESTClient(context)
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/stat/',
+        status=404,
+    )
+    with pytest.raises(ClientExceptionFileNotFound):
+        client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert len(mocked_responses.calls) == 1
+
+
+def test_rest_client_should_fail_over_to_another_server(
+        context, mocked_responses):
+    context.base_url = 'http://first/,http://second/'
+    client = RESTClient(context)
+    mocked_responses.get(
+        'http://first/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/stat/',
+        status=503)
+    mocked_responses.get(
+        'http://second/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/stat/',
+        json={'size': 3})
+    with patch('time.sleep') as sleep:
+        assert client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o') == {
+            'size': 3}
+    assert sleep.call_count == 0
+    assert client.balancer.endpoints[0].failures == 1
+
+
+def test_rest_client_should_fail_over_without_retries(
+        context, mocked_responses):
+    context.base_url = 'http://first/,http://second/'
+    context.retries = 0
+    client = RESTClient(context)
+    mocked_responses.get(
+        'http://first/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/stat/',
+        status=503)
+    mocked_responses.get(
+        'http://second/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/stat/',
+        json={'size': 3})
+    assert client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o') == {'size': 3}
+    assert len(mocked_responses.calls) == 2
+
+
+def test_rest_client_should_hold_server_until_stream_is_closed(
+        context, mocked_responses):
+    client = RESTClient(context)
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/read/',
+        body=b'content')
+    endpoint = client.balancer.endpoints[0]
+    stream = client.read_stream('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    assert endpoint.outstanding == 1
+    assert next(stream.chunks) == b'content'
+    assert endpoint.outstanding == 1
+    stream.chunks.close()
+    assert endpoint.outstanding == 0
+
+
+def test_rest_client_should_decompress_content_while_streaming(
+        context, mocked_responses):
+    client = RESTClient(context)
+    content = b'{"compressible": true}\n' * 10000
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/read/',
+        body=gzip.compress(content),
+        headers={'Content-Encoding': 'gzip'},
+    )
+    chunks = list(
+        client.read_stream('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o').chunks)
+    assert b''.join(chunks) == content
+    assert len(chunks) > 1
+    request = mocked_responses.calls[0].request
+    assert 'gzip' in request.headers['Accept-Encoding']
+
+
+def test_rest_client_should_ask_for_identity_without_compression(
+        context, mocked_responses):
+    context.compression = False
+    client = RESTClient(context)
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/stat/',
+        json={})
+    client.stat('1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o')
+    request = mocked_responses.calls[0].request
+    assert request.headers['Accept-Encoding'] == 'identity'
+
+
+@pytest.mark.parametrize(
+    'offset, length, expected_range', [
+        (10, 5, 'bytes=10-14'),
+        (10, None, 'bytes=10-'),
+        (-5, None, 'bytes=-5'),
+    ]
+)
+def test_rest_client_read_window_stream_should_send_range(
+        context, mocked_responses, offset, length, expected_range):
+    client = RESTClient(context)
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/read/',
+        body=b'window',
+        status=206,
+    )
+    stream = client.read_window_stream(
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', offset, length)
+    assert b''.join(stream.chunks) == b'window'[:length]
+    request = mocked_responses.calls[0].request
+    assert request.headers['Range'] == expected_range
+    assert request.headers['Accept-Encoding'] == 'identity'
+
+
+@pytest.mark.parametrize(
+    'offset, length, expected_content', [
+        (2, 3, b'234'),
+        (-3, None, b'789'),
+        (20, None, b''),
+    ]
+)
+def test_rest_client_read_window_stream_should_cut_whole_content(
+        context, mocked_responses, offset, length, expected_content):
+    client = RESTClient(context)
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/read/',
+        body=b'0123456789',
+        status=200,
+        headers={'Content-Length': '10'},
+    )
+    stream = client.read_window_stream(
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', offset, length)
+    assert b''.join(stream.chunks) == expected_content
+
+
+def test_rest_client_read_window_stream_should_read_nothing_past_the_end(
+        context, mocked_responses):
+    client = RESTClient(context)
+    mocked_responses.get(
+        'http://localhost/file/1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o/read/',
+        status=416,
+    )
+    stream = client.read_window_stream(
+        '1f2b5c6e-3d4e-5f6g-7h8i-9j0k1l2m3n4o', 100)
+    assert list(stream.chunks) == []
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+from file_client.backend_clients.retry import (HEDGE_MIN_SAMPLES, Hedger,
+                                               RetryPolicy)
+from unittest.mock import patch
+
+
+def test_retry_state_should_stop_after_retries():
+    retry = RetryPolicy(retries=2, backoff=0).start()
+    assert retry.backoff(True)
+    assert retry.backoff(True)
+    assert not retry.backoff(True)
+    assert retry.attempt == 2
+
+
+def test_retry_state_should_fail_over_without_using_retries():
+    retry = RetryPolicy(retries=0, backoff=0).start()
+    assert retry.backoff(True, wait=False)
+    assert retry.backoff(True, wait=False)
+    assert not retry.backoff(True)
+    assert retry.attempt == 0
+
+
+def test_retry_state_should_not_retry_unretryable_failures():
+    assert not RetryPolicy(retries=2, backoff=0).start().backoff(False)
+
+
+def test_retry_state_should_sleep_with_jittered_exponential_backoff():
+    retry = RetryPolicy(retries=3, backoff=0.1).start()
+    with patch('time.sleep') as sleep, \
+            patch('random.uniform', side_effect=lambda a, b: b) as uniform:
+        for _ in range(3):
+            retry.backoff(True)
+    assert [call.args for call in uniform.call_args_list] == [
+        (0, 0.1), (0, 0.2), (0, 0.4)]
+    assert sleep.call_count == 3
+
+
+def test_retry_state_should_respect_deadline():
+    retry = RetryPolicy(retries=5, backoff=10, deadline=0.05).start()
+    assert retry.remaining(60) <= 0.05
+    assert retry.remaining() <= 0.05
+    with patch('random.uniform', return_value=1):
+        assert not retry.backoff(True)
+
+
+def test_retry_state_without_deadline_should_keep_timeout():
+    retry = RetryPolicy().start()
+    assert retry.remaining(60) == 60
+    assert retry.remaining() is None
+
+
+def test_hedger_should_return_faster_second_call():
+    hedger = Hedger(delay=0.01)
+    first_call = threading.Event()
+    calls = []
+
+    def stat(uuid):
+        calls.append(uuid)
+        if not first_call.is_set():
+            first_call.set()
+            time.sleep(1)
+            return 'slow'
+        return 'fast'
+
+    started = time.monotonic()
+    assert hedger.call(stat, 'uuid') == 'fast'
+    assert time.monotonic() - started < 0.5
+    assert calls == ['uuid', 'uuid']
+    hedger.close()
+
+
+def test_hedger_should_not_hedge_fast_calls():
+    hedger = Hedger(delay=1)
+    calls = []
+    assert hedger.call(calls.append, 'uuid') is None
+    assert calls == ['uuid']
+    hedger.close()
+
+
+def test_hedger_should_raise_if_all_calls_fail():
+    hedger = Hedger(delay=0)
+
+    def stat(uuid):
+        raise ValueError(uuid)
+
+    with pytest.raises(ValueError):
+        hedger.call(stat, 'uuid')
+    hedger.close()
+
+
+def test_hedger_should_wait_for_enough_samples_for_percentile_delay():
+    hedger = Hedger()
+    assert hedger.delay() is None
+    hedger.latencies.extend([0.001] * (HEDGE_MIN_SAMPLES - 1) + [1.0])
+    assert hedger.delay() == 1.0
+    hedger.latencies.extend([0.001] * 100)
+    assert hedger.delay() == 0.001
@@ -0,0 +1,120 @@
+import io
+import os
+import sys
+
+import pytest
+from file_client.backend_clients.sink import (BinarySink, atomic_output_file,
+                                              open_sink, preallocate,
+                                              write_at)
+from unittest.mock import MagicMock, patch
+
+
+def test_binary_sink_should_gather_small_writes():
+    file = MagicMock()
+    file.write.side_effect = lambda view: len(view)
+    sink = BinarySink(file, buffer_size=8)
+    sink.write(b'abc')
+    sink.write(bytearray(b'def'))
+    assert file.write.call_count == 0
+    sink.write(memoryview(b'ghi'))
+    assert [bytes(call.args[0]) for call in file.write.call_args_list] == [
+        b'abcdef']
+    sink.flush()
+    assert bytes(file.write.call_args.args[0]) == b'ghi'
+    assert sink.bytes_written == 9
+
+
+def test_binary_sink_should_pass_large_writes_without_copy():
+    file = MagicMock()
+    file.write.side_effect = lambda view: len(view)
+    sink = BinarySink(file, buffer_size=4)
+    data = bytearray(b'0123456789')
+    sink.write(data)
+    view = file.write.call_args.args[0]
+    assert view.obj is data
+
+
+def test_binary_sink_should_retry_partial_writes():
+    written = []
+
+    def write(view):
+        written.append(bytes(view[:3]))
+        return 3
+
+    file = MagicMock()
+    file.write.side_effect = write
+    BinarySink(file, buffer_size=1).write(b'0123456')
+    assert written == [b'012', b'345', b'6']
+
+
+def test_open_sink_should_write_bytes_unchanged_to_path(tmp_path):
+    path = tmp_path / 'output'
+    with open_sink(path) as sink:
+        sink.write(b'\x00\xff')
+        sink.write(memoryview(b'\r\n'))
+    assert path.read_bytes() == b'\x00\xff\r\n'
+
+
+def test_open_sink_should_write_through_buffer_of_text_files():
+    buffer = io.BytesIO()
+    output = io.TextIOWrapper(buffer, encoding='ascii')
+    output.write('text ')
+    with open_sink(output) as sink:
+        sink.write('é'.encode())
+    assert buffer.getvalue() == 'text é'.encode()
+
+
+def test_open_sink_should_write_to_stdout(capfdbinary):
+    sys.stdout.write('text ')
+    with open_sink('-') as sink:
+        sink.write(b'\xff')
+    out, _ = capfdbinary.readouterr()
+    assert out == b'text \xff'
+
+
+def test_preallocate_should_set_the_size(tmp_path):
+    path = tmp_path / 'file'
+    with open(path, 'wb', buffering=0) as file:
+        file.write(b'longer than the size')
+        preallocate(file.fileno(), 5)
+    assert path.stat().st_size == 5
+
+
+def test_preallocate_should_fall_back_without_fallocate_support(tmp_path):
+    path = tmp_path / 'file'
+    error = OSError(95, 'Operation not supported')
+    with patch('os.posix_fallocate', side_effect=error, create=True):
+        with open(path, 'wb') as file:
+            preallocate(file.fileno(), 1024)
+    assert path.stat().st_size == 1024
+
+
+def test_write_at_should_finish_partial_writes():
+    written = {}
+
+    def pwrite(fd, data, offset):
+        written[offset] = bytes(data[:2])
+        return len(written[offset])
+
+    with patch('os.pwrite', side_effect=pwrite):
+        assert write_at(3, b'abcde', 10) == 15
+    assert written == {10: b'ab', 12: b'cd', 14: b'e'}
+
+
+def test_atomic_output_file_should_rename_complete_file(tmp_path):
+    path = str(tmp_path / 'file')
+    with atomic_output_file(path, 6) as fd:
+        write_at(fd, b'second', 0)
+        assert os.listdir(tmp_path) == ['file.part']
+    assert os.listdir(tmp_path) == ['file']
+    assert (tmp_path / 'file').read_bytes() == b'second'
+
+
+def test_atomic_output_file_should_keep_old_file_on_failure(tmp_path):
+    (tmp_path / 'file').write_bytes(b'old')
+    with pytest.raises(ValueError):
+        with atomic_output_file(str(tmp_path / 'file'), 1024) as fd:
+            write_at(fd, b'new', 0)
+            raise ValueError('connection lost')
+    assert os.listdir(tmp_path) == ['file']
+    assert (tmp_path / 'file').read_bytes() == b'old'
@@ -1,8 +1,21 @@
+import click
+import grpc
 from click.testing import CliRunner
+from concurrent.futures import ThreadPoolExecutor
 from file_client.cli import cli, get_client
 from .helpers.fixtures import context  # noqa 401
 from file_client.backend_clients import GRPCClient, RESTClient
+from file_client.backend_clients.grpc_client.service_file_pb2 import (
+    StatReply)
+from file_client.backend_clients.grpc_client.service_file_pb2_grpc import (
+    FileServicer, add_FileServicer_to_server)
+from file_client.backend_clients.limiter import DEFAULT_MAX_LIMIT
+import json
 import pytest
+import responses
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
 
 
 def test_version_commend_should_return_version():
@@ -19,22 +32,24 @@ def test_help_command_should_return_help():
         'CLI application which retrieves and prints data from one of the ' \
         'described\n  backends.',
         'Options:',
-        '--version              Show the version and exit.',
-        '--backend [grpc|rest]  Set a backend to be used, choises are grpc ' \
-        'and rest.',
-        'Default is grpc',
-        '--grpc-server NETLOC   Set a host and port of the gRPC server. ' \
+        '--version                       Show the version and exit.',
+        '--backend [grpc|rest]           Set a backend to be used, choises ' \
+        'are grpc and',
+        'rest. Default is grpc',
+        '--grpc-server NETLOC            Set a host and port of the gRPC ' \
+        'server.',
+        'Default is localhost:50051',
+        '--base-url URL                  Set a base URL for a REST server. ' \
         'Default is',
-        'localhost:50051',
-        '--base-url URL         Set a base URL for a REST server. Default is',
         'http://localhost/',
-        '--output OUTPUT        Set the file where to store the output. ' \
-        'Default is -,',
-        'i.e. the stdout.',
-        '--help                 Show this message and exit.',
+        '--output OUTPUT                 Set the file where to store the ' \
+        'output.',
+        'Default is -, i.e. the stdout.',
+        '--help                          Show this message and exit.',
         'Commands:',
-        'read  Outputs the file content.',
-        'stat  Prints the file metadata in a human-readable manner.',
+        'mirror  Downloads the content of many files into a directory.',
+        'read    Outputs the file content.',
+        'stat    Prints the file metadata in a human-readable manner.',
         )
     runner = CliRunner()
     with runner.isolated_filesystem():
@@ -62,3 +77,270 @@ def test_get_client_should_raise_value_error_if_incorrect_client_provided(
     with pytest.raises(ValueError) as error:
         get_client(context)
     assert str(error.value) == 'Backend not supported'
+
+
+def test_stat_command_should_read_uuids_from_stdin(context):
+    client = MagicMock()
+    client.stat_many_and_output.return_value.failed = 0
+    with patch('file_client.cli.get_client', return_value=client):
+        result = CliRunner().invoke(
+            cli, 'stat first --from-file - --workers 3',
+            input='second\n\nthird\n')
+    assert result.exit_code == 0
+    uuids, workers = client.stat_many_and_output.call_args.args
+    assert list(uuids) == ['first', 'second', 'third']
+    assert workers == 3
+
+
+def test_stat_command_should_fail_if_any_batch_item_failed(context):
+    client = MagicMock()
+    client.stat_many_and_output.return_value.failed = 1
+    with patch('file_client.cli.get_client', return_value=client):
+        result = CliRunner().invoke(cli, 'stat first second')
+    assert result.exit_code == 1
+
+
+def test_stat_command_should_require_some_uuid():
+    result = CliRunner().invoke(cli, 'stat')
+    assert result.exit_code == 2
+
+
+def test_mirror_command_should_download_into_directory(tmp_path):
+    client = MagicMock()
+    client.read_many_to_directory.return_value.failed = 0
+    with patch('file_client.cli.get_client', return_value=client):
+        result = CliRunner().invoke(
+            cli, ['mirror', 'first', 'second',
+                  '--directory', str(tmp_path / 'mirror')])
+    assert result.exit_code == 0
+    uuids, directory, workers = client.read_many_to_directory.call_args.args
+    assert list(uuids) == ['first', 'second']
+    assert directory == str(tmp_path / 'mirror')
+    assert (tmp_path / 'mirror').is_dir()
+
+
+def test_stat_command_should_use_async_client_with_asyncio_flag():
+    client = MagicMock()
+    client.stat_many_and_output.return_value.failed = 0
+    with patch('file_client.cli.get_async_client', return_value=client):
+        result = CliRunner().invoke(
+            cli, 'stat first second --asyncio --workers 1000')
+    assert result.exit_code == 0
+    assert client.stat_many_and_output.call_args.args[1] == 1000
+
+
+def test_stat_command_should_reject_hedge_with_asyncio_flag():
+    result = CliRunner().invoke(
+        cli, '--hedge stat first second --asyncio')
+    assert result.exit_code == 2
+    assert '--hedge and --hedge-after cannot be combined with --asyncio.' in (
+        result.output)
+
+
+class StatServicer(FileServicer):
+
+    def stat(self, request, context):
+        return StatReply(data=StatReply.Data(
+            size=7, mimetype='text/plain', name=request.uuid.value))
+
+
+def test_stat_command_should_stat_on_grpc_server_with_asyncio_flag():
+    server = grpc.server(ThreadPoolExecutor(max_workers=2))
+    add_FileServicer_to_server(StatServicer(), server)
+    port = server.add_insecure_port('localhost:0')
+    server.start()
+    try:
+        result = CliRunner().invoke(cli, [
+            '--grpc-server', f'localhost:{port}', 'stat', '--asyncio',
+            '--format', 'ndjson', 'first', 'second'])
+    finally:
+        server.stop(None)
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert sorted(record['name'] for record in records) == [
+        'first', 'second']
+
+
+def test_stat_command_should_write_metrics_with_asyncio_flag(tmp_path):
+    metrics_path = tmp_path / 'metrics.json'
+    server = grpc.server(ThreadPoolExecutor(max_workers=2))
+    add_FileServicer_to_server(StatServicer(), server)
+    port = server.add_insecure_port('localhost:0')
+    server.start()
+    try:
+        result = CliRunner().invoke(cli, [
+            '--grpc-server', f'localhost:{port}', '--metrics',
+            str(metrics_path), 'stat', '--asyncio', 'first', 'second'])
+    finally:
+        server.stop(None)
+    assert result.exit_code == 0
+    summary = json.loads(metrics_path.read_text())
+    assert summary['operations']['stat']['calls'] == 2
+
+
+def test_get_client_should_close_client_with_click_context(context):
+    context.backend = 'rest'
+
+    @click.command()
+    def command():
+        client = get_client(context)
+        client.session = MagicMock()
+        command.client = client
+
+    CliRunner().invoke(command)
+    assert command.client.session.close.call_count == 1
+
+
+def test_read_command_should_download_ranges_into_output_file(tmp_path):
+    client = MagicMock()
+    path = str(tmp_path / 'file')
+    with patch('file_client.cli.get_client', return_value=client):
+        result = CliRunner().invoke(
+            cli, ['--output', path, 'read', 'uuid', '--parallel', '4'])
+    assert result.exit_code == 0
+    client.read_ranges_to_file.assert_called_once_with('uuid', path, 4)
+
+
+def test_read_command_should_require_output_file_for_parallel_download():
+    result = CliRunner().invoke(cli, 'read uuid --parallel 4')
+    assert result.exit_code == 2
+    assert '--parallel requires --output to be a file.' in result.output
+
+
+@pytest.mark.parametrize(
+    'backend, imported, not_imported', [
+        ('rest', 'requests', 'grpc'),
+        ('grpc', 'grpc', 'requests'),
+    ]
+)
+def test_get_client_should_import_only_the_chosen_backend(
+        backend, imported, not_imported):
+    code = (
+        'import sys\n'
+        'from file_client.cli import Context, cli, get_client\n'
+        f'assert {imported!r} not in sys.modules\n'
+        f'assert {not_imported!r} not in sys.modules\n'
+        'context = Context()\n'
+        f'context.backend = {backend!r}\n'
+        'context.grpc_server = "localhost:50051"\n'
+        'context.base_url = "http://localhost/"\n'
+        'context.output = "-"\n'
+        'get_client(context)\n'
+        f'assert {imported!r} in sys.modules\n'
+        f'assert {not_imported!r} not in sys.modules\n'
+    )
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_cli_should_write_metrics_summary(tmp_path):
+    metrics_path = tmp_path / 'metrics.json'
+    with responses.RequestsMock() as mocked_responses:
+        mocked_responses.get(
+            'http://localhost/file/uuid/read/', body=b'content')
+        result = CliRunner().invoke(cli, [
+            '--backend', 'rest', '--metrics', str(metrics_path),
+            'read', 'uuid'])
+    assert result.exit_code == 0
+    summary = json.loads(metrics_path.read_text())
+    assert summary['operations']['read']['calls'] == 1
+    assert summary['operations']['read']['bytes'] == 7
+
+
+def test_stat_command_should_write_single_file_metadata(tmp_path):
+    output_path = tmp_path / 'stat.txt'
+    with responses.RequestsMock() as mocked_responses:
+        mocked_responses.get(
+            'http://localhost/file/uuid/stat/',
+            json={'name': 'fïle.txt', 'size': 7})
+        result = CliRunner().invoke(
+            cli, ['--backend', 'rest', 'stat', 'uuid'])
+        file_result = CliRunner().invoke(cli, [
+            '--backend', 'rest', '--output', str(output_path),
+            'stat', 'uuid'])
+    assert result.exit_code == 0
+    assert result.stdout_bytes == 'name: fïle.txt\nsize: 7\n'.encode()
+    assert file_result.exit_code == 0
+    assert output_path.read_text() == 'name: fïle.txt\nsize: 7'
+
+
+def test_stat_command_should_write_ndjson_records():
+    with responses.RequestsMock() as mocked_responses:
+        for uuid in ('a', 'b'):
+            mocked_responses.get(
+                f'http://localhost/file/{uuid}/stat/',
+                json={'name': f'{uuid}.txt',
+                      'create_datetime': '2020-01-01T01:00:00+01:00'})
+        result = CliRunner().invoke(
+            cli, '--backend rest stat --format ndjson a b')
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert sorted(records, key=lambda record: record['uuid']) == [
+        {'uuid': uuid, 'name': f'{uuid}.txt',
+         'create_datetime': '2020-01-01T00:00:00Z'}
+        for uuid in ('a', 'b')
+    ]
+
+
+def test_read_command_should_verify_checksum():
+    with responses.RequestsMock() as mocked_responses:
+        mocked_responses.get(
+            'http://localhost/file/uuid/stat/', json={'size': 7})
+        mocked_responses.get(
+            'http://localhost/file/uuid/read/', body=b'content')
+        result = CliRunner().invoke(
+            cli, '--backend rest read uuid --verify 0123')
+    assert result.exit_code == 1
+    assert 'failed the integrity check' in result.stdout
+
+
+def test_read_command_should_reject_checksum_with_parallel(tmp_path):
+    result = CliRunner().invoke(cli, [
+        '--output', str(tmp_path / 'file'), 'read', 'uuid', '--parallel',
+        '2', '--checksum', 'sha256'])
+    assert result.exit_code == 2
+
+
+def test_stat_command_should_default_to_more_workers_when_adaptive():
+    client = MagicMock()
+    client.stat_many_and_output.return_value.failed = 0
+    with patch('file_client.cli.get_client', return_value=client):
+        result = CliRunner().invoke(cli, 'stat first second --adaptive')
+    assert result.exit_code == 0
+    call = client.stat_many_and_output.call_args
+    assert call.args[1] == DEFAULT_MAX_LIMIT
+    assert call.kwargs['adaptive'] is True
+
+
+def test_read_command_should_pass_head_as_length():
+    client = MagicMock()
+    with patch('file_client.cli.get_client', return_value=client):
+        result = CliRunner().invoke(cli, 'read first --head 512')
+    assert result.exit_code == 0
+    assert client.read_and_output.call_args.args == (
+        'first', None, None, 0, 512)
+
+
+def test_read_command_should_reject_head_with_offset():
+    result = CliRunner().invoke(cli, 'read first --head 512 --offset 10')
+    assert result.exit_code == 2
+
+
+def test_read_command_should_require_output_file_for_ranges_strategy():
+    result = CliRunner().invoke(cli, 'read uuid --strategy ranges')
+    assert result.exit_code == 2
+    assert '--strategy ranges requires --output to be a file.' in (
+        result.output)
+
+
+def test_read_command_should_plan_the_transfer_with_auto_strategy(tmp_path):
+    client = MagicMock()
+    path = str(tmp_path / 'file')
+    with patch('file_client.cli.get_client', return_value=client) as get:
+        result = CliRunner().invoke(cli, [
+            '--output', path, 'read', 'uuid', '--strategy', 'auto',
+            '--parallel', '6', '--ranges-min-size', '1000'])
+    assert result.exit_code == 0
+    context = get.call_args.args[0]
+    assert (context.strategy, context.range_connections) == ('auto', 6)
+    assert (context.ranges_min_size, context.output_path) == (1000, path)
+    assert client.read_and_output.call_count == 1
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+
+import pytest
+from click.testing import CliRunner
+from file_client.backend_clients import ClientExceptionFileNotFound
+from file_client.backend_clients.client import ReadStream
+from file_client.cli import cli
+from file_client.daemon import create_server, forward
+from .helpers.fixtures import (  # noqa 401
+    context, concrete_client_without_context)
+from unittest.mock import MagicMock
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to about 100 characters.
+    with tempfile.TemporaryDirectory() as directory:
+        yield os.path.join(directory, 'daemon.sock')
+
+
+@pytest.fixture
+def daemon_client(context, concrete_client_without_context, socket_path):
+    client = concrete_client_without_context(context)
+    server = create_server(socket_path, {'grpc': client})
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={'poll_interval': 0.01})
+    thread.start()
+    yield client
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_daemon_should_serve_stat_with_identical_output(
+        daemon_client, socket_path):
+    daemon_client.stat = MagicMock(return_value={'name': 'a.txt', 'size': 3})
+    result = CliRunner().invoke(cli, ['--socket', socket_path, 'stat', 'u'])
+    assert result.exit_code == 0
+    assert result.stdout_bytes == b'name: a.txt\nsize: 3\n'
+    daemon_client.stat.assert_called_once_with('u')
+
+
+def test_daemon_should_serve_read_byte_exact(daemon_client, socket_path):
+    daemon_client.read_stream = MagicMock(
+        return_value=ReadStream(iter((b'\x00\r\n', b'\xff'))))
+    result = CliRunner().invoke(cli, ['--socket', socket_path, 'read', 'u'])
+    assert result.exit_code == 0
+    assert result.stdout_bytes == b'\x00\r\n\xff'
+
+
+def test_daemon_should_forward_client_exception_messages(
+        daemon_client, socket_path, capfd):
+    def stat(uuid):
+        raise ClientExceptionFileNotFound()
+
+    daemon_client.stat = stat
+    result = CliRunner().invoke(cli, ['--socket', socket_path, 'stat', 'u'])
+    assert result.exit_code == 1
+    # The daemon runs in the same process here, so its own copy of the
+    # message is captured too.
+    assert result.stdout_bytes.endswith(
+        b'File was not found on the remote server. \n')
+    assert result.stderr_bytes == (
+        b'File was not found on the remote server.\n')
+
+
+def test_daemon_should_refuse_other_endpoints(daemon_client, socket_path):
+    assert forward(socket_path, {
+        'command': 'stat',
+        'backend': 'grpc',
+        'endpoint': 'elsewhere:50051',
+        'uuid': 'u',
+    }, '-') is None
+    assert forward(socket_path, {
+        'command': 'read',
+        'backend': 'rest',
+        'endpoint': 'http://localhost/',
+        'uuid': 'u',
+    }, '-') is None
+
+
+def test_forward_should_return_none_without_daemon(socket_path):
+    assert forward(socket_path, {'command': 'stat'}, '-') is None
+
+
+def test_create_server_should_refuse_running_daemon(
+        daemon_client, socket_path):
+    with pytest.raises(RuntimeError):
+        create_server(socket_path, {})